@@ -0,0 +1,91 @@
+"""Benchmark and regression check for the yt-dlp -F parser.
+
+Parses every captured table in corpus/formats with the current parser and
+with the old substring-based one, prints lines/sec for both as JSON and
+compares the current results with the *.expected.json files.
+
+    python benchmarks/bench_format_parser.py
+    python benchmarks/bench_format_parser.py --update   # rewrite expectations
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from yt_core import parse_format_lines  # noqa: E402
+import legacy_format_parser  # noqa: E402
+
+CORPUS_DIR = Path(__file__).resolve().parent / 'corpus' / 'formats'
+
+# Fields compared against the expectations
+EXPECTED_FIELDS = ('id', 'ext', 'resolution', 'height', 'fps_value', 'tbr', 'abr_value',
+                   'vcodec', 'acodec', 'filesize_bytes', 'filesize_approx', 'protocol')
+
+
+def load_corpus():
+    return {path.stem: path.read_text(encoding='utf-8').splitlines()
+            for path in sorted(CORPUS_DIR.glob('*.txt'))}
+
+
+def summarize(formats_data):
+    return {kind: [{field: fmt.get(field) for field in EXPECTED_FIELDS} for fmt in formats]
+            for kind, formats in formats_data.items()}
+
+
+def lines_per_second(parse, corpus, min_time):
+    """Run parse over the whole corpus until min_time has passed"""
+    total_lines = sum(len(lines) for lines in corpus.values())
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        for lines in corpus.values():
+            parse(lines)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return total_lines * rounds / elapsed
+
+
+def check(corpus, update):
+    """Compare the parser output with the expectations; return the mismatching names"""
+    mismatches = []
+    for name, lines in corpus.items():
+        expected_path = CORPUS_DIR / f'{name}.expected.json'
+        result = summarize(parse_format_lines(lines))
+        if update:
+            expected_path.write_text(json.dumps(result, indent=1, ensure_ascii=False) + '\n',
+                                     encoding='utf-8')
+        elif not expected_path.exists() or json.loads(expected_path.read_text(encoding='utf-8')) != result:
+            mismatches.append(name)
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--min-time', type=float, default=1.0, metavar='SECONDS',
+                        help="Minimum run time of each parser")
+    parser.add_argument('--update', action='store_true', help="Rewrite the expected results")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus()
+    mismatches = check(corpus, args.update)
+    before = lines_per_second(legacy_format_parser.parse_format_lines, corpus, args.min_time)
+    after = lines_per_second(parse_format_lines, corpus, args.min_time)
+
+    print(json.dumps({
+        'corpus_files': len(corpus),
+        'corpus_lines': sum(len(lines) for lines in corpus.values()),
+        'before_lines_per_sec': round(before),
+        'after_lines_per_sec': round(after),
+        'speedup': round(after / before, 2),
+        'mismatches': mismatches,
+    }, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Start-up benchmark of the GUI.
+
+Runs each measurement in a fresh interpreter and prints the medians as JSON:
+
+- import: time to import yt_downloader and which heavy modules it pulled in
+- first_frame: time from the start of the script until the main window is
+  mapped and idle (needs a display; reported as skipped without one)
+- probe: yt-dlp version detection with an empty and with a warm cache
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ('PIL', 'requests', 'yt_dlp')
+
+IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import yt_downloader
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+''' % (HEAVY_MODULES,)
+
+FIRST_FRAME_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+import tkinter
+try:
+    import yt_downloader
+    app = yt_downloader.ModernYouTubeDownloader()
+except tkinter.TclError as e:
+    print(json.dumps({"error": str(e)}))
+    raise SystemExit
+
+def done():
+    print(json.dumps({"seconds": time.perf_counter() - start}))
+    app.root.destroy()
+
+def on_map(event):
+    if event.widget is app.root:
+        app.root.unbind('<Map>')
+        app.root.after_idle(done)
+
+app.root.bind('<Map>', on_map)
+app.run()
+'''
+
+PROBE_SCRIPT = '''
+import json, sys, tempfile, time
+from pathlib import Path
+import yt_core
+cache_path = Path(tempfile.mkdtemp()) / 'version.json'
+result = {}
+for name in ('subprocess', 'in-process'):
+    engine_class = yt_core.engine_class_for(name)
+    if engine_class.name != name:
+        continue
+    for state in ('cold', 'warm'):
+        start = time.perf_counter()
+        try:
+            yt_core.probe_ytdlp(engine_class, cache_path)
+        except yt_core.EngineError as e:
+            result[name] = {"error": str(e)}
+            break
+        result[f"{name}_{state}"] = time.perf_counter() - start
+print(json.dumps(result))
+'''
+
+
+def run_child(script):
+    result = subprocess.run([sys.executable, '-c', script], cwd=REPO_DIR,
+                            capture_output=True, text=True, timeout=120)
+    lines = result.stdout.strip().splitlines()
+    if not lines:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "no output"}
+    return json.loads(lines[-1])
+
+
+def median_ms(values):
+    return round(statistics.median(values) * 1000, 1) if values else None
+
+
+def measure(runs):
+    """Run every measurement runs times and return the medians"""
+    imports = [run_child(IMPORT_SCRIPT) for _ in range(runs)]
+    import_times = [r['seconds'] for r in imports if 'seconds' in r]
+    report = {
+        "import_ms": median_ms(import_times),
+        "heavy_modules_after_import": imports[-1].get('loaded', imports[-1].get('error')),
+    }
+
+    frame = run_child(FIRST_FRAME_SCRIPT)
+    if 'error' in frame:
+        report["first_frame_ms"] = None
+        report["first_frame_skipped"] = frame['error']
+    else:
+        frames = [frame] + [run_child(FIRST_FRAME_SCRIPT) for _ in range(runs - 1)]
+        report["first_frame_ms"] = median_ms([r['seconds'] for r in frames if 'seconds' in r])
+
+    probes = [run_child(PROBE_SCRIPT) for _ in range(runs)]
+    keys = sorted({key for probe in probes for key in probe})
+    report["probe_ms"] = {
+        key: median_ms([p[key] for p in probes if isinstance(p.get(key), float)]) or probes[-1].get(key)
+        for key in keys
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-frame of the GUI.")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per measurement")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(measure(args.runs), indent=2))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
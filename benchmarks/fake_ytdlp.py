@@ -0,0 +1,377 @@
+"""Stand-in for the yt-dlp executable, used by the offline benchmarks.
+
+Understands the command lines SubprocessEngine builds:
+
+- -F replays a recorded table from corpus/formats
+- -j prints an info dict built from that table, with the media and
+  thumbnail URLs pointing at the host of the page URL (benchmarks/media_server.py)
+- --flat-playlist prints N entries for URLs with ?list=N
+- a download fetches the selected streams from the media server, prints
+  --progress-template lines every FAKE_YTDLP_TICK seconds and reports the
+  post-processors the options ask for; streams already on disk are reused
+  and a missing --ffmpeg-location leaves them unmerged
+
+Behaviour is tuned with environment variables:
+
+    FAKE_YTDLP_FORMATS       corpus table to use (default: youtube)
+    FAKE_YTDLP_LATENCY       seconds every extraction takes (default: 0)
+    FAKE_YTDLP_MEDIA_SIZE    bytes of a video stream; audio is a quarter (default: 1M)
+    FAKE_YTDLP_TICK          seconds between progress lines (default: 0.1; 0 = every block)
+    FAKE_YTDLP_POSTPROCESS   seconds every post-processor takes (default: 0)
+
+Tools take the path of an executable, so write a launcher for it first:
+
+    python yt_server.py --yt-dlp "$(python benchmarks/fake_ytdlp.py --write-launcher /tmp/fake-ytdlp)"
+"""
+
+import argparse
+import json
+import os
+import re
+import stat
+import sys
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import urlopen
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from yt_core import format_bytes, format_duration, parse_format_lines  # noqa: E402
+
+VERSION = '2099.01.01-fake'
+CORPUS_DIR = Path(__file__).resolve().parent / 'corpus' / 'formats'
+BLOCK_SIZE = 16 * 1024
+
+TEMPLATE_FIELDS_RE = re.compile(r'%\((progress|info)\.\{([^}]*)\}\)j')
+TEMPLATE_FIELD_RE = re.compile(r'%\((progress|info)\.(\w+)\)s')
+
+THUMBNAIL_SIZES = ((120, 90), (320, 180), (480, 360), (1280, 720))
+
+
+def env_number(name, default):
+    return float(os.environ.get(name) or default)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='yt-dlp', add_help=False)
+    parser.add_argument('--version', action='store_true')
+    parser.add_argument('-j', '--dump-json', action='store_true')
+    parser.add_argument('-F', '--list-formats', action='store_true')
+    parser.add_argument('--flat-playlist', action='store_true')
+    parser.add_argument('-f', '--format', default='bestvideo+bestaudio/best')
+    parser.add_argument('--progress-template', action='append', default=[])
+    parser.add_argument('--extract-audio', '-x', action='store_true')
+    parser.add_argument('--audio-format', default='best')
+    parser.add_argument('--embed-subs', action='store_true')
+    parser.add_argument('--sub-langs')
+    parser.add_argument('--embed-metadata', action='store_true')
+    parser.add_argument('--embed-thumbnail', action='store_true')
+    parser.add_argument('--limit-rate', type=int)
+    parser.add_argument('--concurrent-fragments', type=int, default=1)
+    parser.add_argument('-o', '--output', default='%(title)s [%(id)s].%(ext)s')
+    parser.add_argument('--load-info-json')
+    parser.add_argument('--ffmpeg-location')
+    parser.add_argument('--fixup')
+    parser.add_argument('url', nargs='?')
+    # Flags that change nothing here
+    for flag in ('--newline', '--no-warnings', '--no-playlist', '--lazy-playlist', '--quiet',
+                 '--no-abort-on-error'):
+        parser.add_argument(flag, action='store_true')
+    return parser.parse_args(argv)
+
+
+def write_launcher(directory):
+    """Write an executable that runs this script with the current interpreter; returns its path"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    script = Path(__file__).resolve()
+    if sys.platform == 'win32':
+        path = directory / 'yt-dlp.cmd'
+        path.write_text(f'@"{sys.executable}" "{script}" %*\r\n', encoding='utf-8')
+    else:
+        path = directory / 'yt-dlp'
+        path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n', encoding='utf-8')
+        path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return str(path)
+
+
+def fail(message):
+    print(f"ERROR: {message}", file=sys.stderr)
+    return 1
+
+
+def video_id(url):
+    query = parse_qs(urlsplit(url).query)
+    if query.get('v'):
+        return query['v'][0]
+    return f"{zlib.crc32(url.encode('utf-8')):08x}"
+
+
+def format_table():
+    name = os.environ.get('FAKE_YTDLP_FORMATS') or 'youtube'
+    return (CORPUS_DIR / f'{name}.txt').read_text(encoding='utf-8').splitlines()
+
+
+def build_info(url):
+    """Build the -j info dict of url from the recorded format table"""
+    parts = urlsplit(url)
+    base = f"{parts.scheme}://{parts.netloc}"
+    vid = video_id(url)
+    media_size = int(env_number('FAKE_YTDLP_MEDIA_SIZE', 1024 * 1024))
+
+    formats = []
+    formats_data = parse_format_lines(format_table())
+    for fmt in formats_data['audio'][::-1] + formats_data['video'][::-1]:
+        audio_only = fmt['vcodec'] == 'none'
+        size = media_size // 4 if audio_only else media_size
+        formats.append({
+            "format_id": fmt['id'],
+            "format": f"{fmt['id']} - {fmt['resolution']}",
+            "ext": fmt['ext'],
+            "url": f"{base}/media/{vid}/{fmt['id']}.{fmt['ext']}?size={size}",
+            "protocol": fmt['protocol'] or 'https',
+            "vcodec": fmt['vcodec'],
+            "acodec": fmt['acodec'],
+            "width": fmt['width'],
+            "height": fmt['height'],
+            "fps": fmt['fps_value'],
+            "abr": fmt['abr_value'],
+            "tbr": fmt['tbr'],
+            "filesize": size,
+        })
+
+    return {
+        "id": vid,
+        "title": f"Synthetic video {vid}",
+        "extractor": "generic",
+        "extractor_key": "Generic",
+        "webpage_url": url,
+        "duration": 212,
+        "uploader": "Benchmark",
+        "thumbnail": f"{base}/thumb/{vid}.jpg?w=480&h=360",
+        "thumbnails": [{"url": f"{base}/thumb/{vid}.jpg?w={w}&h={h}", "width": w, "height": h}
+                       for w, h in THUMBNAIL_SIZES],
+        "formats": formats,
+    }
+
+
+def playlist_entries(url):
+    parts = urlsplit(url)
+    count = int(parse_qs(parts.query).get('list', ['0'])[0] or 0)
+    for index in range(1, count + 1):
+        vid = f"pl{index:08d}"
+        yield {"_type": "url", "ie_key": "Generic", "id": vid, "title": f"Synthetic video {vid}",
+               "url": f"{parts.scheme}://{parts.netloc}/watch?v={vid}"}
+
+
+def select_formats(spec, formats):
+    """Resolve a -f spec such as '137+bestaudio/best' to a list of format dicts"""
+    audio = [f for f in formats if f['vcodec'] == 'none']
+    video = [f for f in formats if f['vcodec'] != 'none' and f['acodec'] == 'none']
+    combined = [f for f in formats if f['vcodec'] != 'none' and f['acodec'] != 'none']
+    named = {
+        'bestaudio': audio[-1:],
+        'bestvideo': video[-1:],
+        'best': combined[-1:] or video[-1:],
+    }
+    by_id = {f['format_id']: [f] for f in formats}
+
+    for alternative in spec.split('/'):
+        selected = [(named.get(part) or by_id.get(part) or [None])[0] for part in alternative.split('+')]
+        if all(selected):
+            return selected
+    return None
+
+
+class TemplateContext(dict):
+    """Output template values; unknown fields render as NA like in yt-dlp"""
+
+    def __missing__(self, key):
+        return 'NA'
+
+
+class Output:
+    """Prints progress the way the given --progress-template options ask for"""
+
+    def __init__(self, templates):
+        self.templates = {}
+        for template in templates:
+            kind, _, text = template.partition(':')
+            if kind in ('download', 'postprocess') and text:
+                self.templates[kind] = text
+            else:
+                self.templates['download'] = template
+
+    def render(self, kind, progress, info):
+        values = {"progress": progress, "info": info}
+
+        def fields(match):
+            source = values[match.group(1)]
+            names = [name.strip() for name in match.group(2).split(',')]
+            return json.dumps({name: source[name] for name in names if source.get(name) is not None})
+
+        text = TEMPLATE_FIELDS_RE.sub(fields, self.templates[kind])
+        return TEMPLATE_FIELD_RE.sub(lambda m: str(values[m.group(1)].get(m.group(2), 'NA')), text)
+
+    def download(self, progress, info):
+        if 'download' in self.templates:
+            print(self.render('download', progress, info), flush=True)
+            return
+        total, done = progress['total_bytes'], progress['downloaded_bytes']
+        if progress['status'] == 'finished':
+            print(f"[download] 100% of {format_bytes(total):>10}", flush=True)
+            return
+        speed = f"{format_bytes(progress['speed'])}/s" if progress.get('speed') else "Unknown B/s"
+        eta = format_duration(progress['eta']) if progress.get('eta') is not None else "Unknown"
+        print(f"[download] {done * 100 / total:5.1f}% of {format_bytes(total):>10} at {speed:>12} ETA {eta}",
+              flush=True)
+
+    def postprocess(self, postprocessor, info):
+        for status in ('started', 'finished'):
+            if 'postprocess' in self.templates:
+                print(self.render('postprocess', {"status": status, "postprocessor": postprocessor}, info),
+                      flush=True)
+            if status == 'started':
+                time.sleep(env_number('FAKE_YTDLP_POSTPROCESS', 0))
+
+
+def fetch(fmt, path, rate_limit, output):
+    """Download one stream to path, printing progress every tick"""
+    tick = env_number('FAKE_YTDLP_TICK', 0.1)
+    total = fmt['filesize']
+    info = {"format_id": fmt['format_id'], "vcodec": fmt['vcodec'], "id": fmt.get('id')}
+    done = 0
+    start = last = time.perf_counter()
+    with urlopen(fmt['url'], timeout=30) as response, open(path, 'wb') as f:
+        for block in iter(lambda: response.read(BLOCK_SIZE), b''):
+            f.write(block)
+            done += len(block)
+            now = time.perf_counter()
+            elapsed = now - start
+            if rate_limit and done / rate_limit > elapsed:
+                time.sleep(done / rate_limit - elapsed)
+                now = time.perf_counter()
+                elapsed = now - start
+            if done < total and now - last >= tick:
+                last = now
+                speed = done / elapsed if elapsed else None
+                output.download({"status": "downloading", "downloaded_bytes": done, "total_bytes": total,
+                                 "speed": speed, "eta": int((total - done) / speed) if speed else None,
+                                 "elapsed": elapsed}, info)
+    output.download({"status": "finished", "downloaded_bytes": done, "total_bytes": done,
+                     "elapsed": time.perf_counter() - start}, info)
+
+
+def download(args, info):
+    selected = select_formats(args.format, info['formats'])
+    if not selected:
+        return fail("Requested format is not available")
+
+    output = Output(args.progress_template)
+    if len(selected) > 1:
+        exts = {fmt['ext'] for fmt in selected}
+        ext = selected[0]['ext'] if exts <= {'mp4', 'm4a'} or exts == {'webm'} else 'mkv'
+    else:
+        ext = selected[0]['ext']
+    context = TemplateContext(info, ext=ext, format_id='+'.join(f['format_id'] for f in selected))
+    target = Path(args.output % context)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    ffmpeg = not args.ffmpeg_location or os.path.exists(args.ffmpeg_location)
+    if not ffmpeg:
+        print(f"WARNING: ffmpeg-location {args.ffmpeg_location} does not exist! Continuing without ffmpeg",
+              flush=True)
+    if args.extract_audio:
+        audio_format = args.audio_format if args.audio_format != 'best' else ext
+        converted = target.with_suffix(f'.{audio_format}')
+    else:
+        converted = target
+
+    # Streams already on disk are reused, like yt-dlp does without --force-overwrites
+    parts = [target] if len(selected) == 1 else [
+        target.with_name(f"{target.stem}.f{fmt['format_id']}.{fmt['ext']}") for fmt in selected]
+    done = next((path for path in (converted, target) if path.exists()), None)
+    if done:
+        print(f"[download] {done} has already been downloaded", flush=True)
+        target = done
+        parts = [done]
+    else:
+        for fmt, part in zip(selected, parts):
+            if part.exists():
+                print(f"[download] {part} has already been downloaded", flush=True)
+                continue
+            print(f"[download] Destination: {part}", flush=True)
+            fetch(dict(fmt, id=info['id']), part, args.limit_rate, output)
+
+    pp_info = {"format_id": context['format_id'], "id": info['id'], "extractor_key": info['extractor_key'],
+               "filepath": str(target)}
+    if len(parts) > 1:
+        if not ffmpeg:
+            print("WARNING: You have requested merging of multiple formats but ffmpeg is not installed. "
+                  "The formats won't be merged", flush=True)
+            output.postprocess('MoveFiles', pp_info)
+            return 0
+        print(f'[Merger] Merging formats into "{target}"', flush=True)
+        output.postprocess('Merger', pp_info)
+        with open(target, 'wb') as f:
+            for part in parts:
+                f.write(part.read_bytes())
+                part.unlink()
+
+    if ffmpeg:
+        if args.extract_audio and target != converted:
+            print(f"[ExtractAudio] Destination: {converted}", flush=True)
+            output.postprocess('ExtractAudio', pp_info)
+            os.replace(target, converted)
+            target = converted
+            pp_info['filepath'] = str(target)
+        if args.embed_subs:
+            output.postprocess('EmbedSubtitle', pp_info)
+        if args.embed_metadata:
+            output.postprocess('Metadata', pp_info)
+        if args.embed_thumbnail:
+            output.postprocess('EmbedThumbnail', pp_info)
+    output.postprocess('MoveFiles', pp_info)
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['--write-launcher'] and len(argv) == 2:
+        print(write_launcher(argv[1]))
+        return 0
+
+    args = parse_args(argv)
+    if args.version:
+        print(VERSION)
+        return 0
+
+    if args.load_info_json:
+        with open(args.load_info_json, encoding='utf-8') as f:
+            return download(args, json.load(f))
+    if not args.url:
+        return fail("You must provide at least one URL.")
+
+    time.sleep(env_number('FAKE_YTDLP_LATENCY', 0))
+    if args.flat_playlist:
+        for entry in playlist_entries(args.url):
+            print(json.dumps(entry), flush=True)
+        return 0
+    if args.list_formats:
+        print('\n'.join(format_table()))
+        return 0
+    if args.dump_json:
+        entries = list(playlist_entries(args.url))
+        if entries:
+            for entry in entries:
+                print(json.dumps(build_info(entry['url'])))
+        else:
+            print(json.dumps(build_info(args.url)))
+        return 0
+    return download(args, build_info(args.url))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
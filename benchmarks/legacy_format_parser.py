@@ -0,0 +1,179 @@
+"""The -F parser as it was before the single-pass rewrite.
+
+Kept only as the "before" baseline of bench_format_parser.py.
+"""
+
+import re
+
+
+def parse_format_lines(lines):
+    """Parse the format output from yt-dlp -F command (fallback when -j has no formats)"""
+    formats_data = {"video": [], "audio": []}
+
+    if not lines:
+        return formats_data
+
+    for line in lines:
+        # Skip header lines and empty lines
+        if not line.strip() or line.startswith("format") or re.match(r"^\s*ID\s+EXT", line) or line.startswith("["):
+            continue
+
+        # Parse the line - yt-dlp format: ID EXT RESOLUTION FPS FILESIZE TBR PROTO VCODEC ACODEC MORE_INFO
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+
+        format_id = parts[0]
+        ext = parts[1]
+
+        # Extract various format details
+        resolution = extract_resolution_from_line(line)
+        filesize = extract_filesize_from_line(line)
+        fps = extract_fps_from_line(line)
+        vcodec = extract_vcodec_from_line(line)
+        acodec = extract_acodec_from_line(line)
+        abr = extract_abr_from_line(line)
+
+        format_info = {
+            "id": format_id,
+            "ext": ext,
+            "resolution": resolution,
+            "filesize": filesize,
+            "fps": fps,
+            "vcodec": vcodec,
+            "acodec": acodec,
+            "abr": abr,
+            "codec": vcodec if vcodec != "none" else acodec,
+            "full": line,
+        }
+
+        # Improved audio/video classification
+        is_audio_only = (
+            vcodec == "none" or 
+            "audio only" in line.lower() or 
+            resolution == "audio only" or
+            ext in ['m4a', 'mp3', 'aac', 'ogg', 'opus', 'wav'] or
+            (resolution == "N/A" and acodec != "none" and acodec != "unknown")
+        )
+
+        is_video_only = (
+            acodec == "none" or 
+            "video only" in line.lower() or
+            (resolution != "audio only" and resolution != "N/A" and acodec == "none")
+        )
+
+        # Classify formats
+        if is_audio_only:
+            formats_data["audio"].append(format_info)
+        elif is_video_only or (resolution != "audio only" and resolution != "N/A"):
+            formats_data["video"].append(format_info)
+        else:
+            # If unclear, check if it has both video and audio
+            if acodec != "none" and vcodec != "none":
+                formats_data["video"].append(format_info)
+            elif acodec != "none":
+                formats_data["audio"].append(format_info)
+
+    # Sort formats
+    formats_data["video"].sort(key=lambda x: get_resolution_sort_key(x["resolution"]), reverse=True)
+    formats_data["audio"].sort(key=lambda x: extract_bitrate_value(x["abr"]), reverse=True)
+    return formats_data
+
+
+def extract_bitrate_value(bitrate_str):
+    """Extract numeric bitrate value for sorting"""
+    if not bitrate_str or bitrate_str == "N/A":
+        return 0
+
+    # Extract numeric value from strings like "128k", "192k", etc.
+    match = re.search(r'(\d+)', bitrate_str)
+    if match:
+        return int(match.group(1))
+
+    return 0
+
+
+def extract_resolution_from_line(line):
+    """Extract resolution from format line"""
+    # Look for patterns like 1920x1080, 720p, etc.
+    resolution_match = re.search(r'\b(\d{3,4}x\d{3,4})\b', line)
+    if resolution_match:
+        return resolution_match.group(1)
+
+    # Look for patterns like 720p, 1080p
+    p_match = re.search(r'\b(\d{3,4}p)\b', line)
+    if p_match:
+        return p_match.group(1)
+
+    # Check if it's audio only
+    if "audio only" in line.lower() or re.search(r'\bvcodec\s*:\s*none\b', line):
+        return "audio only"
+
+    return "N/A"
+
+
+def extract_filesize_from_line(line):
+    """Extract filesize from format line"""
+    # Look for patterns like 123.45MiB, 1.23GiB, etc.
+    size_match = re.search(r'\b(\d+(?:\.\d+)?(?:KiB|MiB|GiB|TiB|KB|MB|GB|TB))\b', line)
+    if size_match:
+        return size_match.group(1)
+
+    # Look for patterns like ~123MB
+    approx_match = re.search(r'~(\d+(?:\.\d+)?(?:KB|MB|GB|TB))', line)
+    if approx_match:
+        return f"~{approx_match.group(1)}"
+
+    return "N/A"
+
+
+def extract_fps_from_line(line):
+    """Extract FPS from format line"""
+    fps_match = re.search(r'\b(\d+(?:\.\d+)?)fps\b', line)
+    if fps_match:
+        return f"{fps_match.group(1)}fps"
+    return "N/A"
+
+
+def extract_vcodec_from_line(line):
+    """Extract video codec from format line"""
+    # Common video codecs
+    codecs = ['h264', 'h265', 'vp9', 'vp8', 'av01', 'avc1', 'hevc', 'none']
+    for codec in codecs:
+        if codec in line.lower():
+            return codec
+    return "unknown"
+
+
+def extract_acodec_from_line(line):
+    """Extract audio codec from format line"""
+    # Common audio codecs
+    codecs = ['aac', 'mp3', 'opus', 'vorbis', 'mp4a', 'none']
+    for codec in codecs:
+        if codec in line.lower():
+            return codec
+    return "unknown"
+
+
+def extract_abr_from_line(line):
+    """Extract audio bitrate from format line"""
+    # Look for patterns like 128k, 192k, etc.
+    abr_match = re.search(r'\b(\d+)k\b', line)
+    if abr_match:
+        return f"{abr_match.group(1)}k"
+    return "N/A"
+
+
+def get_resolution_sort_key(resolution):
+    """Convert resolution to numeric value for sorting"""
+    if resolution == "audio only":
+        return 0
+    if resolution == "N/A":
+        return 1
+
+    # Extract numeric value from resolution
+    match = re.search(r'(\d+)', resolution)
+    if match:
+        return int(match.group(1))
+
+    return 0
@@ -0,0 +1,161 @@
+"""Local HTTP server with synthetic media and thumbnails for offline benchmarks.
+
+Nothing is stored on disk: media bytes are generated from the path, so any
+size can be served, and thumbnails are rendered once per size.
+
+    GET /watch?v=ID                         placeholder video page
+    GET /media/ID/FORMAT.EXT?size=N         N deterministic bytes, with Range support
+    GET /thumb/ID.jpg?w=480&h=360           a JPEG of that size
+
+Every connection can be throttled with --rate (or ?rate= per request) to
+emulate a CDN that limits single connections.
+
+    python benchmarks/media_server.py --port 8800 --rate 2M
+"""
+
+import argparse
+import hashlib
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from yt_core import parse_rate  # noqa: E402
+
+DEFAULT_MEDIA_SIZE = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+def media_bytes(path, start, end):
+    """Return bytes start..end (exclusive) of the synthetic file at path"""
+    block = hashlib.sha256(path.encode('utf-8')).digest() * (CHUNK_SIZE // 32)
+    offset = start % len(block)
+    data = (block[offset:] + block * ((end - start) // len(block) + 1))[:end - start]
+    return data
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Benchmarks would only measure the logging
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        if parts.path == '/watch':
+            self.send_body(b'<html><title>Synthetic video</title></html>', 'text/html')
+        elif parts.path.startswith('/media/'):
+            self.send_media(parts.path, int(query.get('size', DEFAULT_MEDIA_SIZE)),
+                            parse_rate(query.get('rate')) or self.server.rate)
+        elif parts.path.startswith('/thumb/'):
+            self.send_body(self.server.thumbnail(int(query.get('w', 480)), int(query.get('h', 360))),
+                           'image/jpeg')
+        else:
+            self.send_error(404)
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_media(self, path, size, rate):
+        start, end = 0, size
+        match = RANGE_RE.match(self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = min(size, int(match.group(2)) + 1) if match.group(2) else size
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end - 1}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start))
+        self.end_headers()
+
+        began = time.perf_counter()
+        sent = 0
+        try:
+            for offset in range(start, end, CHUNK_SIZE):
+                chunk = media_bytes(path, offset, min(end, offset + CHUNK_SIZE))
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if rate:
+                    delay = sent / rate - (time.perf_counter() - began)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MediaServer(ThreadingHTTPServer):
+    """Serves synthetic media on 127.0.0.1; port 0 picks a free port"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, rate=None):
+        super().__init__(('127.0.0.1', port), MediaRequestHandler)
+        self.rate = rate
+        self.thumbnails = {}
+        self.thumbnail_lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def thumbnail(self, width, height):
+        """Return a JPEG of the given size, rendering it on first use"""
+        with self.thumbnail_lock:
+            if (width, height) not in self.thumbnails:
+                from PIL import Image
+                image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+                buffer = BytesIO()
+                image.save(buffer, 'JPEG', quality=85)
+                self.thumbnails[width, height] = buffer.getvalue()
+            return self.thumbnails[width, height]
+
+    def start(self):
+        """Serve from a background thread"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve synthetic media and thumbnails on 127.0.0.1.")
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--rate', type=parse_rate, metavar='RATE',
+                        help="Limit every connection, e.g. 500K or 2M (bytes/s)")
+    args = parser.parse_args(argv)
+
+    server = MediaServer(args.port, args.rate)
+    print(f"Serving synthetic media on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
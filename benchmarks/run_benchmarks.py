@@ -0,0 +1,358 @@
+"""Offline benchmark suite: no request leaves the machine.
+
+Downloads go through fake_ytdlp.py (a stand-in for the yt-dlp executable)
+against media_server.py (synthetic media and thumbnails on 127.0.0.1).
+Every scenario reports plain numbers and the whole run is printed as JSON:
+
+- metadata: extract_info and -F latency, cache lookups and thumbnail loads
+- parse_formats: lines/sec of the -F parser over corpus/formats
+- ui_events: progress events posted by downloads vs. updates the UI applies
+- queue: wall time and throughput of N downloads at several parallelism levels
+- pipeline: the same downloads with slow post-processors, inline and on a separate pool
+- startup: import time, first frame and yt-dlp probe (see bench_startup.py)
+
+    python benchmarks/run_benchmarks.py --quick --output baseline.json
+    python benchmarks/run_benchmarks.py --compare baseline.json   # exit code 1 on regressions
+
+Metrics ending in _ms or _seconds are better when lower, those ending in
+_per_sec when higher; --compare flags any that got worse by more than
+--tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from yt_core import (  # noqa: E402
+    DEFAULT_POSTPROCESS_WORKERS, UI_DRAIN_INTERVAL_MS, DownloadJob, DownloadQueue, EventCoalescer, MetadataCache, SubprocessEngine,
+    download_options, formats_from_info, log_level_for, parse_format_lines
+)
+import bench_format_parser  # noqa: E402
+import bench_startup  # noqa: E402
+import fake_ytdlp  # noqa: E402
+import legacy_format_parser  # noqa: E402
+from media_server import MediaServer  # noqa: E402
+
+SCENARIOS = ('metadata', 'parse_formats', 'ui_events', 'queue', 'pipeline', 'startup')
+
+# Per-connection rate of the media server in the queue scenario, so that
+# parallel jobs have something to gain like against a real CDN
+QUEUE_CONNECTION_RATE = 4 * 1024 * 1024
+
+# Durations below this are timer noise and never count as regressions
+COMPARE_MIN_MS = 1.0
+
+# Launcher of fake_ytdlp.py, written by main()
+FAKE_YTDLP = None
+
+
+def engine_factory():
+    return SubprocessEngine(FAKE_YTDLP)
+
+
+def summary_ms(values):
+    """mean/p50/p95/max of a list of durations in seconds, in milliseconds"""
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+    return {"mean_ms": round(statistics.mean(values) * 1000, 2),
+            "p50_ms": round(statistics.median(values) * 1000, 2),
+            "p95_ms": round(p95 * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2)}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+@contextmanager
+def fake_env(**values):
+    """Set FAKE_YTDLP_* variables for the fake yt-dlp processes started inside the block"""
+    saved = {name: os.environ.get(name) for name in values}
+    os.environ.update({name: str(value) for name, value in values.items()})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def bench_metadata(server, runs):
+    url = f"{server.base_url}/watch?v=meta{{:04d}}"
+    extract, list_formats = [], []
+    infos = []
+    for index in range(runs):
+        engine = engine_factory()
+        seconds, info = timed(engine.extract_info, url.format(index))
+        extract.append(seconds)
+        infos.append(info)
+        list_formats.append(timed(engine.list_formats, url.format(index))[0])
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = MetadataCache(directory)
+        for index, info in enumerate(infos):
+            cache.put(url.format(index), info, formats_from_info(info))
+        cache_get = [timed(cache.get, url.format(index))[0] for index in range(runs) for _ in range(5)]
+
+    result = {
+        "extract_info": summary_ms(extract),
+        "list_formats": summary_ms(list_formats),
+        "formats_from_info": summary_ms([timed(formats_from_info, info)[0] for info in infos]),
+        "cache_get": summary_ms(cache_get),
+    }
+
+    try:
+        from yt_thumbnails import ThumbnailLoader
+    except ImportError as e:
+        result["thumbnail_skipped"] = str(e)
+        return result
+    with tempfile.TemporaryDirectory() as directory:
+        loader = ThumbnailLoader(directory)
+        result["thumbnail_cold"] = summary_ms([timed(loader.get, info)[0] for info in infos])
+        result["thumbnail_warm"] = summary_ms([timed(loader.get, info)[0] for info in infos])
+        loader.executor.shutdown()
+    return result
+
+
+def bench_parse_formats(min_time):
+    corpus = bench_format_parser.load_corpus()
+    return {
+        "lines": sum(len(lines) for lines in corpus.values()),
+        "lines_per_sec": round(bench_format_parser.lines_per_second(parse_format_lines, corpus, min_time)),
+        "legacy_lines_per_sec": round(bench_format_parser.lines_per_second(
+            legacy_format_parser.parse_format_lines, corpus, min_time)),
+    }
+
+
+def bench_ui_events(server, jobs, tick):
+    """Downloads post to an EventCoalescer drained like the GUI does every UI_DRAIN_INTERVAL_MS"""
+    events = EventCoalescer()
+    counts = {"engine_updates": 0, "engine_lines": 0, "ui_updates": 0, "ui_lines": 0}
+    drain_times = []
+    done = threading.Event()
+
+    def on_update(job):
+        counts["engine_updates"] += 1
+        events.post_update(job.id, job)
+
+    def on_log(job, line):
+        counts["engine_lines"] += 1
+        events.post_log(f"[#{job.id}] {line}", log_level_for(line))
+
+    def drain():
+        while True:
+            finished = done.is_set()
+            start = time.perf_counter()
+            calls, updates, lines = events.drain()
+            drain_times.append(time.perf_counter() - start)
+            counts["ui_updates"] += len(updates)
+            counts["ui_lines"] += len(lines)
+            if finished:
+                return
+            time.sleep(UI_DRAIN_INTERVAL_MS / 1000)
+
+    drainer = threading.Thread(target=drain, daemon=True)
+    server.rate = QUEUE_CONNECTION_RATE
+    with tempfile.TemporaryDirectory() as directory, fake_env(FAKE_YTDLP_TICK=tick,
+                                                              FAKE_YTDLP_MEDIA_SIZE=4 * 1024 * 1024):
+        queue = DownloadQueue(max_workers=jobs, on_update=on_update, on_log=on_log)
+        queue.set_max_per_host(jobs)
+        start = time.perf_counter()
+        drainer.start()
+        for index in range(jobs):
+            queue.submit(DownloadJob(f"{server.base_url}/watch?v=ui{index:04d}",
+                                     download_options("video", "bestvideo", directory),
+                                     engine_factory=engine_factory))
+        queue.wait()
+        wall = time.perf_counter() - start
+        done.set()
+        drainer.join()
+    server.rate = None
+
+    stats = events.stats()
+    return {
+        "jobs": jobs,
+        "failed": sum(job.status != "finished" for job in queue.jobs.values()),
+        "wall_seconds": round(wall, 3),
+        # Rates rather than throughput: neither direction is a regression
+        "engine_updates_rate": round(counts["engine_updates"] / wall, 1),
+        "engine_lines_rate": round(counts["engine_lines"] / wall, 1),
+        "ui_updates_rate": round(counts["ui_updates"] / wall, 1),
+        "coalesced_ratio": round(stats["coalesced"] / stats["posted"], 3) if stats["posted"] else None,
+        "drain": summary_ms(drain_times),
+    }
+
+
+def bench_queue(server, jobs, levels, media_size):
+    result = {"jobs": jobs, "media_bytes_per_job": media_size + media_size // 4}
+    server.rate = QUEUE_CONNECTION_RATE
+    try:
+        for workers in levels:
+            with tempfile.TemporaryDirectory() as directory, fake_env(FAKE_YTDLP_MEDIA_SIZE=media_size):
+                queue = DownloadQueue(max_workers=workers)
+                queue.set_max_per_host(workers)
+                start = time.perf_counter()
+                for index in range(jobs):
+                    queue.submit(DownloadJob(f"{server.base_url}/watch?v=q{workers}x{index:04d}",
+                                             download_options("video", "bestvideo", directory),
+                                             engine_factory=engine_factory))
+                queue.wait()
+                wall = time.perf_counter() - start
+            num_bytes = sum(job.downloaded_bytes for job in queue.jobs.values())
+            result[f"workers_{workers}"] = {
+                "failed": sum(job.status != "finished" for job in queue.jobs.values()),
+                "wall_seconds": round(wall, 3),
+                "jobs_per_sec": round(jobs / wall, 2),
+                "mib_per_sec": round(num_bytes / wall / 1024 / 1024, 2),
+            }
+    finally:
+        server.rate = None
+    return result
+
+
+def bench_pipeline(server, jobs, workers, postprocess_seconds):
+    """Downloads whose post-processors take postprocess_seconds each, with and without a separate pool"""
+    result = {"jobs": jobs, "download_workers": workers, "postprocess_seconds": postprocess_seconds}
+    server.rate = QUEUE_CONNECTION_RATE
+    try:
+        for name, postprocess_workers in (("inline", 0), ("pipelined", DEFAULT_POSTPROCESS_WORKERS)):
+            with tempfile.TemporaryDirectory() as directory, fake_env(FAKE_YTDLP_MEDIA_SIZE=2 * 1024 * 1024,
+                                                                      FAKE_YTDLP_POSTPROCESS=postprocess_seconds):
+                queue = DownloadQueue(max_workers=workers, postprocess_workers=postprocess_workers)
+                queue.set_max_per_host(workers)
+                start = time.perf_counter()
+                for index in range(jobs):
+                    queue.submit(DownloadJob(f"{server.base_url}/watch?v={name}{index:04d}",
+                                             download_options("video", "bestvideo", directory),
+                                             engine_factory=engine_factory))
+                queue.wait()
+                wall = time.perf_counter() - start
+            samples = queue.timings.snapshot()
+            waits = {stage: round(sample["total"] / sample["count"] * 1000, 1)
+                     for stage, sample in samples.items() if stage.startswith("wait.")}
+            result[name] = {
+                "postprocess_workers": postprocess_workers,
+                "failed": sum(job.status != "finished" for job in queue.jobs.values()),
+                "wall_seconds": round(wall, 3),
+                "jobs_per_sec": round(jobs / wall, 2),
+                "mean_wait_ms": waits,
+            }
+    finally:
+        server.rate = None
+    return result
+
+
+def flatten(report, prefix=""):
+    """Map nested metrics to dotted names"""
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, current, tolerance):
+    """Return the metrics of current that are worse than baseline by more than tolerance"""
+    regressions = []
+    old, new = flatten(baseline.get("scenarios", {})), flatten(current["scenarios"])
+    for name in sorted(old.keys() & new.keys()):
+        metric = name.rsplit(".", 1)[-1]
+        if metric.endswith("_ms") and max(old[name], new[name]) < COMPARE_MIN_MS:
+            continue
+        if metric.endswith(("_ms", "_seconds")):
+            change = new[name] / old[name] - 1 if old[name] else 0.0
+        elif metric.endswith("_per_sec"):
+            change = old[name] / new[name] - 1 if new[name] else float("inf")
+        else:
+            continue
+        if change > tolerance:
+            regressions.append({"metric": name, "baseline": old[name], "current": new[name],
+                                "worse_by": round(change, 3)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks and print the results as JSON.")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--quick', action='store_true', help="Fewer runs and smaller downloads")
+    parser.add_argument('--output', metavar='FILE', help="Also write the results to FILE")
+    parser.add_argument('--compare', metavar='BASELINE', help="Report regressions against an earlier --output")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Relative slowdown tolerated by --compare (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    selected = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    runs = 3 if args.quick else 10
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": {},
+    }
+
+    global FAKE_YTDLP
+    launcher_dir = tempfile.TemporaryDirectory()
+    FAKE_YTDLP = fake_ytdlp.write_launcher(launcher_dir.name)
+    server = MediaServer().start()
+    try:
+        for name in selected:
+            print(f"⏱️ {name}...", file=sys.stderr, flush=True)
+            if name == 'metadata':
+                result = bench_metadata(server, runs)
+            elif name == 'parse_formats':
+                result = bench_parse_formats(0.5 if args.quick else 2.0)
+            elif name == 'ui_events':
+                result = bench_ui_events(server, 2 if args.quick else 4, tick=0.005)
+            elif name == 'queue':
+                result = bench_queue(server, 6 if args.quick else 16, (1, 2, 4, 8),
+                                     (2 if args.quick else 8) * 1024 * 1024)
+            elif name == 'pipeline':
+                result = bench_pipeline(server, 6 if args.quick else 16, 2, 0.25)
+            else:
+                result = bench_startup.measure(runs)
+            report["scenarios"][name] = result
+    finally:
+        server.stop()
+        launcher_dir.cleanup()
+
+    regressions = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+    print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import functools
+import shutil
+import subprocess
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DASH_MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT2S" minBufferTime="PT1S"
+     profiles="urn:mpeg:dash:profile:isoff-on-demand:2011">
+ <Period>
+  <AdaptationSet mimeType="video/mp4" contentType="video">
+   <Representation id="v1" bandwidth="50000" codecs="avc1.64000d" width="160" height="120" frameRate="25">
+    <BaseURL>v.mp4</BaseURL>
+   </Representation>
+  </AdaptationSet>
+  <AdaptationSet mimeType="audio/mp4" contentType="audio">
+   <Representation id="a1" bandwidth="70000" codecs="mp4a.40.2" audioSamplingRate="44100">
+    <BaseURL>a.m4a</BaseURL>
+   </Representation>
+  </AdaptationSet>
+ </Period>
+</MPD>
+"""
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='session')
+def dash_url(tmp_path_factory):
+    """URL of a local DASH manifest with one video-only and one audio-only stream"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        pytest.skip("ffmpeg is not installed")
+    directory = tmp_path_factory.mktemp('dash')
+    subprocess.run([ffmpeg, '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=size=160x120:rate=25', '-t', '2',
+                    '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-an', str(directory / 'v.mp4')], check=True)
+    subprocess.run([ffmpeg, '-v', 'error', '-f', 'lavfi', '-i', 'sine=frequency=440:duration=2',
+                    '-c:a', 'aac', '-vn', str(directory / 'a.m4a')], check=True)
+    (directory / 'd.mpd').write_text(DASH_MANIFEST, encoding='utf-8')
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/d.mpd"
+    server.shutdown()
+    server.server_close()
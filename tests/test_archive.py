@@ -0,0 +1,48 @@
+from yt_core import DownloadArchive, download_options
+
+VIDEO_ID = 'dQw4w9WgXcQ'
+
+
+def test_every_url_form_of_a_youtube_video_matches(tmp_path):
+    archive = DownloadArchive(tmp_path / 'archive.db')
+    archive.add(f'youtube:{VIDEO_ID}', download_options('video', '137', str(tmp_path)), output='a.mp4')
+
+    assert archive.find(f'https://youtu.be/{VIDEO_ID}', 'video') == ('137', 'a.mp4')
+    assert archive.find(f'https://www.youtube.com/watch?v={VIDEO_ID}&t=10', 'video', '137') == ('137', 'a.mp4')
+    assert archive.find(f'youtube:{VIDEO_ID}', 'video', '22') is None
+    assert archive.find(f'youtube:{VIDEO_ID}', 'audio') is None
+
+
+def test_other_sites_match_through_the_url_alias(tmp_path):
+    archive = DownloadArchive(tmp_path / 'archive.db')
+    url = 'https://Example.com/videos/42/'
+    assert archive.find(url, 'video') is None
+
+    archive.add('example:42', download_options('video', 'best', str(tmp_path)), output='b.mp4', url=url)
+
+    assert archive.find('https://example.com/videos/42', 'video') == ('best', 'b.mp4')
+    assert archive.find('example:42', 'video') == ('best', 'b.mp4')
+
+
+def test_deleted_files_are_dropped_with_verify_files(tmp_path):
+    archive = DownloadArchive(tmp_path / 'archive.db', verify_files=True)
+    output = tmp_path / 'c.mp4'
+    output.write_bytes(b'data')
+    archive.add(f'youtube:{VIDEO_ID}', download_options('video', '137', str(tmp_path)), output=str(output))
+    assert archive.find(f'youtube:{VIDEO_ID}', 'video') == ('137', str(output))
+
+    output.unlink()
+
+    assert archive.find(f'youtube:{VIDEO_ID}', 'video') is None
+    assert archive.connection.execute('SELECT COUNT(*) FROM downloads').fetchone() == (0,)
+
+
+def test_entries_are_kept_across_runs_and_ignored_after_close(tmp_path):
+    path = tmp_path / 'archive.db'
+    archive = DownloadArchive(path)
+    archive.add(f'youtube:{VIDEO_ID}', download_options('audio', '140', str(tmp_path)), output='d.m4a')
+    archive.close()
+
+    assert archive.find(f'youtube:{VIDEO_ID}', 'audio') is None
+    archive.add(f'youtube:{VIDEO_ID}', download_options('video', '137', str(tmp_path)))
+    assert DownloadArchive(path).find(f'youtube:{VIDEO_ID}', 'audio') == ('140', 'd.m4a')
@@ -0,0 +1,41 @@
+import os
+
+from yt_core import DiskLRU
+
+
+def age(path, seconds_ago):
+    stamp = os.stat(path).st_mtime - seconds_ago
+    os.utime(path, (stamp, stamp))
+
+
+def test_store_drops_the_least_recently_used_files(tmp_path):
+    cache = DiskLRU(tmp_path, 2)
+    cache.store(tmp_path / 'a.jpg', b'a')
+    cache.store(tmp_path / 'b.jpg', b'b')
+    age(tmp_path / 'a.jpg', 20)
+    age(tmp_path / 'b.jpg', 10)
+    cache.touch(tmp_path / 'a.jpg')
+
+    cache.store(tmp_path / 'c.jpg', 'c')
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['a.jpg', 'c.jpg']
+    assert (tmp_path / 'c.jpg').read_text() == 'c'
+
+
+def test_directories_count_as_one_entry(tmp_path):
+    cache = DiskLRU(tmp_path, 1)
+    cache.store(tmp_path / 'video1' / 'en.vtt', b'WEBVTT')
+    cache.store(tmp_path / 'video1' / 'de.vtt', b'WEBVTT')
+    age(tmp_path / 'video1', 10)
+
+    cache.store(tmp_path / 'video2' / 'en.vtt', b'WEBVTT')
+
+    assert [path.name for path in tmp_path.iterdir()] == ['video2']
+
+
+def test_errors_are_ignored(tmp_path):
+    (tmp_path / 'file').write_bytes(b'')
+    cache = DiskLRU(tmp_path / 'file', 1)
+
+    cache.store(tmp_path / 'file' / 'a.jpg', b'a')
+    cache.touch(tmp_path / 'missing.jpg')
@@ -0,0 +1,79 @@
+import shutil
+import sys
+
+import pytest
+
+from yt_core import EngineError, InProcessEngine, SubprocessEngine, download_options
+
+ENGINES = [
+    pytest.param(InProcessEngine, marks=pytest.mark.skipif(not InProcessEngine.is_available(),
+                                                           reason="yt_dlp is not importable")),
+    pytest.param(SubprocessEngine, marks=pytest.mark.skipif(not shutil.which('yt-dlp'),
+                                                            reason="yt-dlp is not installed")),
+]
+
+
+def run_download(engine_class, url, options, info):
+    logs = []
+    ok = engine_class().download(url, options, lambda event: None, logs.append, info=info)
+    return ok, logs
+
+
+def plain_options(download_type, format_id, output_dir, audio_id=None):
+    options = download_options(download_type, format_id, str(output_dir), audio_id, sub_langs=())
+    return dict(options, embed_thumbnail=False)
+
+
+@pytest.mark.parametrize('engine_class', ENGINES)
+def test_stored_info_downloads_only_the_audio_format(engine_class, dash_url, tmp_path):
+    info = engine_class().extract_info(dash_url)
+    ok, logs = run_download(engine_class, dash_url, plain_options('audio', None, tmp_path, 'a1'), info)
+
+    assert ok, logs
+    assert not any('retrying with URL' in line or 'Merging formats' in line for line in logs)
+    assert [path.suffix for path in tmp_path.iterdir()] == ['.mp3']
+
+
+@pytest.mark.parametrize('engine_class', ENGINES)
+def test_stored_info_downloads_a_single_video_format(engine_class, dash_url, tmp_path):
+    info = engine_class().extract_info(dash_url)
+    options = dict(plain_options('video', 'v1', tmp_path), format='v1')
+    ok, logs = run_download(engine_class, dash_url, options, info)
+
+    assert ok, logs
+    assert not any('retrying with URL' in line or 'Merging formats' in line for line in logs)
+    assert [path.name for path in tmp_path.iterdir()] == ['d.mp4']
+
+
+@pytest.mark.parametrize('engine_class', ENGINES)
+def test_expired_stored_info_is_retried_with_the_url(engine_class, dash_url, tmp_path):
+    info = engine_class().extract_info(dash_url)
+    expired = dash_url.rsplit('/', 1)[0] + '/expired'
+    info = dict(info, formats=[dict(fmt, url=expired) for fmt in info['formats']])
+    ok, logs = run_download(engine_class, dash_url, plain_options('audio', None, tmp_path, 'a1'), info)
+
+    assert ok, logs
+    assert any('retrying with URL' in line for line in logs)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="uses a shell script as yt-dlp")
+def test_subprocess_extract_info_without_output_raises_engine_error(tmp_path):
+    executable = tmp_path / 'yt-dlp'
+    executable.write_text('#!/bin/sh\nexit 0\n')
+    executable.chmod(0o755)
+
+    with pytest.raises(EngineError):
+        SubprocessEngine(str(executable)).extract_info('https://example.com/video')
+
+
+@pytest.mark.skipif(not InProcessEngine.is_available(), reason="yt_dlp is not importable")
+def test_in_process_extraction_stops_once_cancelled(dash_url):
+    engine = InProcessEngine()
+    assert engine.extract_info(dash_url)['formats']
+
+    engine.cancel()
+
+    with pytest.raises(EngineError, match='Cancelled'):
+        engine.extract_info(dash_url)
+    with pytest.raises(EngineError, match='Cancelled'):
+        list(engine.iter_playlist(dash_url))
@@ -0,0 +1,60 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from yt_core import parse_format_lines
+
+CORPUS_DIR = Path(__file__).resolve().parent.parent / 'benchmarks' / 'corpus' / 'formats'
+EXPECTED_FIELDS = ('id', 'ext', 'resolution', 'height', 'fps_value', 'tbr', 'abr_value',
+                   'vcodec', 'acodec', 'filesize_bytes', 'filesize_approx', 'protocol')
+
+TABLE = """\
+[info] Available formats for abc:
+ID  EXT  RESOLUTION FPS CH │   FILESIZE   TBR PROTO │ VCODEC        VBR ACODEC      ABR ASR MORE INFO
+────────────────────────────────────────────────────────────────────────────────────────────────────
+140 m4a  audio only      2 │    9.80MiB  130k https │ audio only        mp4a.40.2  130k 44k medium
+91  mp4  256x144     30    │ ≈ 21.94MiB  290k m3u8  │ avc1.64001F       mp4a.40.2           144p
+137 mp4  1920x1080   25    │  112.40MiB 1500k https │ avc1.640028 1500k video only          1080p
+""".splitlines()
+
+
+@pytest.mark.parametrize('name', sorted(path.stem for path in CORPUS_DIR.glob('*.txt')))
+def test_corpus_matches_expectations(name):
+    lines = (CORPUS_DIR / f'{name}.txt').read_text(encoding='utf-8').splitlines()
+    expected = json.loads((CORPUS_DIR / f'{name}.expected.json').read_text(encoding='utf-8'))
+
+    result = parse_format_lines(lines)
+
+    assert {kind: [{field: fmt.get(field) for field in EXPECTED_FIELDS} for fmt in formats]
+            for kind, formats in result.items()} == expected
+
+
+def test_columns_are_located_from_the_header():
+    formats = parse_format_lines(TABLE)
+
+    assert [fmt['id'] for fmt in formats['video']] == ['137', '91']
+    assert [fmt['id'] for fmt in formats['audio']] == ['140']
+    best = formats['video'][0]
+    assert (best['width'], best['height'], best['fps_value'], best['tbr']) == (1920, 1080, 25, 1500)
+    assert (best['vcodec'], best['acodec']) == ('avc1.640028', 'none')
+    assert formats['audio'][0]['abr_value'] == 130
+
+
+def test_approximate_and_exact_sizes_are_kept_apart():
+    formats = parse_format_lines(TABLE)
+    sizes = {fmt['id']: (fmt['filesize_bytes'], fmt['filesize_approx'])
+             for fmt in formats['video'] + formats['audio']}
+
+    assert sizes['91'] == (None, int(21.94 * 1024 ** 2))
+    assert sizes['140'] == (int(9.80 * 1024 ** 2), None)
+
+
+def test_ansi_colours_are_ignored():
+    coloured = [line.replace('mp4a.40.2', '\x1b[0;32mmp4a.40.2\x1b[0m') for line in TABLE]
+
+    assert parse_format_lines(coloured) == parse_format_lines(TABLE)
+
+
+def test_lines_without_a_header_yield_nothing():
+    assert parse_format_lines(['[youtube] abc: Downloading webpage', 'random output']) == {"video": [], "audio": []}
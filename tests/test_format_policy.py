@@ -0,0 +1,87 @@
+from yt_core import FormatPolicy, group_formats, make_format_info
+
+MB = 1024 * 1024
+
+FORMATS = group_formats([
+    make_format_info('137', ext='mp4', vcodec='avc1.640028', acodec='none', width=1920, height=1080, fps=30,
+                     tbr=4000, filesize=80 * MB),
+    make_format_info('248', ext='webm', vcodec='vp9', acodec='none', width=1920, height=1080, fps=30,
+                     tbr=2500, filesize=50 * MB),
+    make_format_info('299', ext='mp4', vcodec='avc1.64002a', acodec='none', width=1920, height=1080, fps=60,
+                     tbr=6000, filesize=120 * MB),
+    make_format_info('136', ext='mp4', vcodec='avc1.4d401f', acodec='none', width=1280, height=720, fps=30,
+                     tbr=2000, filesize=40 * MB),
+    make_format_info('398', ext='mp4', vcodec='av01.0.05M.08', acodec='none', width=1280, height=720, fps=30,
+                     tbr=1000, filesize_approx=20 * MB),
+    make_format_info('140', ext='m4a', vcodec='none', acodec='mp4a.40.2', abr=129, filesize=5 * MB),
+    make_format_info('251', ext='webm', vcodec='none', acodec='opus', abr=140, filesize=5 * MB),
+])
+
+
+def test_without_limits_the_best_formats_win():
+    choice = FormatPolicy().select(FORMATS)
+
+    assert (choice['format_id'], choice['audio_id']) == ('299', '251')
+    assert 'best available' in choice['reason']
+
+
+def test_height_and_fps_are_hard_limits():
+    choice = FormatPolicy(max_height=720).select(FORMATS)
+    assert choice['format_id'] == '136'
+
+    choice = FormatPolicy(max_fps=30).select(FORMATS)
+    assert choice['format_id'] == '137'
+
+
+def test_preferred_codec_wins_over_resolution():
+    choice = FormatPolicy(codecs=('av01', 'opus')).select(FORMATS)
+
+    assert (choice['format_id'], choice['audio_id']) == ('398', '251')
+
+
+def test_container_keeps_streams_mergeable():
+    choice = FormatPolicy(container='webm').select(FORMATS)
+
+    assert (choice['format_id'], choice['audio_id']) == ('248', '251')
+
+    choice = FormatPolicy(container='mp4').select(FORMATS)
+    assert (choice['format_id'], choice['audio_id']) == ('299', '140')
+
+
+def test_filesize_budget_includes_the_audio():
+    # 45 MiB minus 5 MiB of audio leaves 40 MiB for the video; approximate sizes count too
+    choice = FormatPolicy(max_filesize=45 * MB, codecs=('avc1',)).select(FORMATS)
+
+    assert choice['format_id'] == '136'
+
+
+def test_reason_says_when_no_preferred_codec_exists():
+    choice = FormatPolicy(codecs=('hev1',)).select(FORMATS)
+
+    assert choice['format_id'] == '299'
+    assert 'no preferred video codec available' in choice['reason']
+
+
+def test_audio_download_picks_only_audio():
+    choice = FormatPolicy(codecs=('mp4a',)).select(FORMATS, 'audio')
+
+    assert choice['video'] is None
+    assert choice['format_id'] == choice['audio_id'] == '140'
+
+
+def test_audio_is_extracted_from_combined_formats():
+    formats = group_formats([
+        make_format_info('18', ext='mp4', vcodec='avc1.42001E', acodec='mp4a.40.2', height=360, tbr=500),
+        make_format_info('22', ext='mp4', vcodec='avc1.64001F', acodec='mp4a.40.2', height=720, tbr=1500),
+    ])
+
+    choice = FormatPolicy().select(formats, 'audio')
+
+    assert choice['audio_id'] == '22'
+    assert 'no audio-only formats' in choice['reason']
+
+
+def test_none_when_nothing_fits():
+    assert FormatPolicy(max_filesize=1 * MB).select(FORMATS) is None
+    assert FormatPolicy(max_filesize=1 * MB).select(FORMATS, 'audio') is None
+    assert FormatPolicy().select({}) is None
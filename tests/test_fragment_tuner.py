@@ -0,0 +1,58 @@
+from yt_core import DEFAULT_FRAGMENT_LEVEL, FRAGMENT_REPROBE_INTERVAL, FragmentTuner
+
+MB = 1024 * 1024
+
+
+def test_climbs_while_the_climb_pays_off(tmp_path):
+    tuner = FragmentTuner(tmp_path / 'levels.json')
+    assert tuner.level('example.com') == DEFAULT_FRAGMENT_LEVEL
+
+    assert tuner.record('example.com', 2, 10 * MB, 10) == 4
+    assert tuner.record('example.com', 4, 20 * MB, 10) == 8
+
+
+def test_goes_back_when_the_level_is_no_better(tmp_path):
+    tuner = FragmentTuner(tmp_path / 'levels.json')
+    tuner.record('example.com', 2, 10 * MB, 10)
+
+    assert tuner.record('example.com', 4, 10 * MB, 10) == 2
+    # The level above is known to be no faster, so it stays
+    assert tuner.record('example.com', 2, 10 * MB, 10) == 2
+
+
+def test_errors_step_down_and_cap_the_level(tmp_path):
+    tuner = FragmentTuner(tmp_path / 'levels.json')
+    tuner.record('example.com', 2, 10 * MB, 10)
+
+    assert tuner.record('example.com', 4, 0, 10, errors=1) == 2
+    assert tuner.record('example.com', 2, 10 * MB, 10) == 2
+    assert tuner.hosts['example.com']['ceiling'] == 4
+
+
+def test_ceiling_is_probed_again(tmp_path):
+    tuner = FragmentTuner(tmp_path / 'levels.json')
+    tuner.record('example.com', 4, 0, 10, errors=1)
+    for _ in range(FRAGMENT_REPROBE_INTERVAL - 2):
+        assert tuner.record('example.com', 2, 10 * MB, 10) == 2
+
+    assert tuner.record('example.com', 2, 10 * MB, 10) == 4
+    assert tuner.hosts['example.com']['ceiling'] is None
+
+
+def test_hosts_are_tuned_separately_and_kept_on_disk(tmp_path):
+    path = tmp_path / 'levels.json'
+    tuner = FragmentTuner(path)
+    tuner.record('a.example.com', 2, 10 * MB, 10)
+
+    reopened = FragmentTuner(path)
+
+    assert reopened.level('a.example.com') == 4
+    assert reopened.level('b.example.com') == DEFAULT_FRAGMENT_LEVEL
+
+
+def test_fixed_count_is_always_used(tmp_path):
+    tuner = FragmentTuner(tmp_path / 'levels.json', fixed=6)
+
+    assert tuner.record('example.com', 6, 0, 10, errors=3) == 6
+    assert tuner.level('example.com') == 6
+    assert not (tmp_path / 'levels.json').exists()
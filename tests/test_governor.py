@@ -0,0 +1,61 @@
+from yt_core import BandwidthGovernor, DownloadJob, download_options
+
+
+def make_job(url, weight=1.0):
+    return DownloadJob(url, download_options('video', 'bestvideo', '.'), weight=weight)
+
+
+def test_share_splits_the_limit_by_weight():
+    governor = BandwidthGovernor(limit=3000, max_per_host=5)
+    light = make_job('https://a.example.com/1')
+    heavy = make_job('https://b.example.com/2', weight=2.0)
+    assert governor.admit(light)
+    assert governor.admit(heavy)
+
+    assert governor.share(light) == 1000
+    assert governor.share(heavy) == 2000
+
+
+def test_released_share_goes_to_the_remaining_jobs():
+    governor = BandwidthGovernor(limit=3000, max_per_host=5)
+    first = make_job('https://example.com/1')
+    second = make_job('https://example.com/2')
+    governor.admit(first)
+    governor.admit(second)
+
+    governor.release(first)
+
+    assert governor.share(second) == 3000
+    assert governor.share(first) is None
+
+
+def test_share_is_none_when_unlimited():
+    governor = BandwidthGovernor()
+    job = make_job('https://example.com/1')
+    governor.admit(job)
+
+    assert governor.share(job) is None
+
+
+def test_admit_caps_jobs_per_host():
+    governor = BandwidthGovernor(max_per_host=2)
+    jobs = [make_job(f'https://example.com/{n}') for n in range(3)]
+    other = make_job('https://other.example.org/1')
+
+    assert [governor.admit(job) for job in jobs] == [True, True, False]
+    assert governor.admit(other)
+
+    governor.release(jobs[0])
+    assert governor.admit(jobs[2])
+
+
+def test_release_of_a_job_that_was_not_admitted_does_nothing():
+    governor = BandwidthGovernor(max_per_host=1)
+    admitted = make_job('https://example.com/1')
+    refused = make_job('https://example.com/2')
+    governor.admit(admitted)
+    governor.admit(refused)
+
+    governor.release(refused)
+
+    assert governor.hosts == {'example.com': 1}
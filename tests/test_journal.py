@@ -0,0 +1,74 @@
+from yt_core import DownloadJob, JobJournal, download_options
+
+
+def make_job(tmp_path, url, status):
+    job = DownloadJob(url, download_options('video', 'bestvideo', str(tmp_path)))
+    job.status = status
+    return job
+
+
+def test_unfinished_returns_the_newest_state_of_open_jobs(tmp_path):
+    journal = JobJournal(tmp_path / 'journal.db')
+    running = make_job(tmp_path, 'https://example.com/a', 'queued')
+    finished = make_job(tmp_path, 'https://example.com/b', 'queued')
+    journal.record(running)
+    journal.record(finished)
+    running.status = 'running'
+    finished.status = 'finished'
+    journal.record(running)
+    journal.record(finished)
+
+    entries = journal.unfinished()
+
+    assert [(entry['key'], entry['url']) for entry in entries] == [(running.key, 'https://example.com/a')]
+    assert entries[0]['options'] == running.options
+
+
+def test_progress_rows_are_rate_limited(tmp_path):
+    journal = JobJournal(tmp_path / 'journal.db')
+    job = make_job(tmp_path, 'https://example.com/a', 'running')
+    for _ in range(5):
+        journal.record(job)
+
+    assert journal.connection.execute('SELECT COUNT(*) FROM entries').fetchone() == (1,)
+
+
+def test_compact_keeps_only_the_newest_row_of_open_jobs(tmp_path):
+    journal = JobJournal(tmp_path / 'journal.db')
+    open_job = make_job(tmp_path, 'https://example.com/a', 'queued')
+    done_job = make_job(tmp_path, 'https://example.com/b', 'queued')
+    journal.record(open_job)
+    journal.record(done_job)
+    open_job.status = 'running'
+    done_job.status = 'cancelled'
+    journal.record(open_job)
+    journal.record(done_job)
+
+    journal.compact()
+
+    rows = journal.connection.execute('SELECT job, state FROM entries').fetchall()
+    assert rows == [(open_job.key, 'running')]
+
+
+def test_unfinished_jobs_survive_a_reopen(tmp_path):
+    journal = JobJournal(tmp_path / 'journal.db')
+    job = make_job(tmp_path, 'https://example.com/a', 'running')
+    journal.record(job)
+    journal.close()
+
+    assert [entry['key'] for entry in JobJournal(tmp_path / 'journal.db').unfinished()] == [job.key]
+
+
+def test_a_closed_journal_ignores_every_call(tmp_path):
+    journal = JobJournal(tmp_path / 'journal.db')
+    job = make_job(tmp_path, 'https://example.com/a', 'running')
+    journal.record(job)
+    journal.close()
+
+    job.status = 'cancelled'
+    journal.record(job)
+    assert journal.unfinished() == []
+    journal.compact()
+    journal.close()
+
+    assert [entry['key'] for entry in JobJournal(tmp_path / 'journal.db').unfinished()] == [job.key]
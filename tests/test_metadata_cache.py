@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from yt_core import MetadataCache
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+INFO = {"id": "dQw4w9WgXcQ", "extractor_key": "Youtube", "title": "Video",
+        "formats": [{"format_id": "18", "ext": "mp4", "vcodec": "avc1", "acodec": "mp4a", "height": 360}]}
+
+
+class GatedExtractor:
+    """Extracts once released, counting its calls"""
+
+    def __init__(self, result=INFO):
+        self.result = result
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self, url):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(10)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def fetch_in_thread(cache, url, extract):
+    outcome = {}
+
+    def run():
+        try:
+            outcome['entry'] = cache.fetch(url, extract)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def wait_for_waiters(cache, url, count):
+    for _ in range(1000):
+        if cache.waiters(url) == count:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"expected {count} waiters")
+
+
+def test_concurrent_fetches_share_one_extraction(tmp_path):
+    cache = MetadataCache(tmp_path)
+    extract = GatedExtractor()
+    first, first_outcome = fetch_in_thread(cache, URL, extract)
+    assert extract.started.wait(10)
+    # Another URL form of the same video joins the running extraction
+    second, second_outcome = fetch_in_thread(cache, 'https://youtu.be/dQw4w9WgXcQ', extract)
+    wait_for_waiters(cache, URL, 1)
+
+    extract.release.set()
+    first.join()
+    second.join()
+
+    assert extract.calls == 1
+    assert cache.shared == 1
+    assert first_outcome['entry'] is second_outcome['entry']
+    assert first_outcome['entry']['formats_data']['video'][0]['id'] == '18'
+    assert cache.waiters(URL) == 0 and cache.in_flight == {}
+
+
+def test_waiters_receive_the_error_of_the_extraction(tmp_path):
+    cache = MetadataCache(tmp_path)
+    extract = GatedExtractor(ValueError("extraction failed"))
+    first, first_outcome = fetch_in_thread(cache, URL, extract)
+    assert extract.started.wait(10)
+    second, second_outcome = fetch_in_thread(cache, URL, extract)
+    wait_for_waiters(cache, URL, 1)
+
+    extract.release.set()
+    first.join()
+    second.join()
+
+    assert str(first_outcome['error']) == str(second_outcome['error']) == "extraction failed"
+    assert cache.in_flight == {}
+    # Nothing was cached, so the next fetch extracts again
+    with pytest.raises(ValueError):
+        cache.fetch(URL, extract)
+    assert extract.calls == 2
+
+
+def test_fetched_videos_are_cached_but_playlists_are_not(tmp_path):
+    cache = MetadataCache(tmp_path)
+    calls = []
+
+    def extract(url):
+        calls.append(url)
+        if 'list=' in url:
+            return {"_type": "playlist", "id": "PL1", "extractor_key": "YoutubeTab", "entries": []}
+        return INFO
+
+    cache.fetch(URL, extract)
+    assert cache.fetch(URL, extract)['info']['title'] == "Video"
+    playlist_url = 'https://www.youtube.com/playlist?list=PL1'
+    cache.fetch(playlist_url, extract)
+    cache.fetch(playlist_url, extract)
+
+    assert calls == [URL, playlist_url, playlist_url]
+
+
+def test_disabled_cache_neither_reads_nor_writes(tmp_path):
+    MetadataCache(tmp_path).put(URL, INFO)
+    entries = sorted(tmp_path.iterdir())
+    cache = MetadataCache(tmp_path, enabled=False)
+    calls = []
+
+    cache.fetch(URL, lambda url: calls.append(url) or dict(INFO, title="New"))
+    cache.fetch(URL, lambda url: calls.append(url) or INFO)
+
+    assert len(calls) == 2
+    assert cache.get(URL) is None
+    assert sorted(tmp_path.iterdir()) == entries
+    assert MetadataCache(tmp_path).get(URL)['info']['title'] == "Video"
@@ -0,0 +1,38 @@
+import threading
+
+from yt_core import BandwidthGovernor, DownloadJob, DownloadQueue, download_options
+
+
+class BarrierEngine:
+    """Downloads succeed only once every job of the test downloads at the same time"""
+
+    barrier = None
+    filepath = None
+    video_key = None
+    returncode = 0
+
+    def set_rate_limit(self, rate_limit):
+        pass
+
+    def set_concurrent_fragments(self, count):
+        pass
+
+    def cancel(self):
+        self.barrier.abort()
+
+    def download(self, url, options, on_progress, on_log, info=None):
+        self.barrier.wait()
+        return True
+
+
+def test_every_running_job_gets_a_thread_beyond_the_initial_limit(tmp_path):
+    count = 40
+    BarrierEngine.barrier = threading.Barrier(count, timeout=10)
+    queue = DownloadQueue(max_workers=2, governor=BandwidthGovernor(max_per_host=count))
+    queue.set_max_workers(count)
+    jobs = [queue.submit(DownloadJob(f'https://example.com/{n}', download_options('video', 'best', str(tmp_path)),
+                                     engine_factory=BarrierEngine))
+            for n in range(count)]
+
+    assert queue.wait(timeout=20)
+    assert [job.status for job in jobs] == ['finished'] * count
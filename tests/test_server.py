@@ -0,0 +1,151 @@
+import asyncio
+import functools
+import json
+import sys
+
+import pytest
+
+from yt_core import MetadataCache, SubprocessEngine
+from yt_server import JobServer, handle_connection
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="uses a script as yt-dlp")
+
+# Extracts instantly and fails every download, so jobs end without network access
+FAKE_YTDLP = """#!{python}
+import json, sys
+if '-j' in sys.argv:
+    print(json.dumps({{"id": "abc", "title": "Test video", "extractor_key": "Generic",
+                      "webpage_url": sys.argv[-1]}}))
+else:
+    print("ERROR: downloads are disabled in this test")
+    sys.exit(1)
+"""
+
+
+@pytest.fixture
+def serve(tmp_path, monkeypatch):
+    """Run a JobServer on a free port; yields an async HTTP client for it"""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    executable = tmp_path / 'yt-dlp'
+    executable.write_text(FAKE_YTDLP.format(python=sys.executable))
+    executable.chmod(0o755)
+
+    def run(test, **kwargs):
+        server = JobServer(str(tmp_path), functools.partial(SubprocessEngine, str(executable)),
+                           cache=MetadataCache(enabled=False), sub_langs=(), **kwargs)
+
+        async def main():
+            server.start(asyncio.get_running_loop())
+            listener = await asyncio.start_server(functools.partial(handle_connection, server), '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                await asyncio.wait_for(test(server, functools.partial(http, port)), 30)
+
+        try:
+            asyncio.run(main())
+        finally:
+            server.queue.cancel_all()
+            server.queue.wait(timeout=10)
+
+    return run
+
+
+async def http(port, method, path, body=None, headers=None):
+    """Send one request; returns (status, response body)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    headers = headers if headers is not None else {'Content-Length': str(len(data))}
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(head.encode('latin-1') + b"\r\n" + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), payload
+
+
+def sse_events(payload):
+    return [json.loads(line[len(b'data: '):]) for line in payload.splitlines() if line.startswith(b'data: ')]
+
+
+async def wait_until_ended(server, job_id):
+    while server.jobs[job_id].is_active:
+        await asyncio.sleep(0.05)
+
+
+@pytest.mark.parametrize('length', ['abc', '-5', '1.5'])
+def test_invalid_content_length_is_rejected(serve, length):
+    async def test(server, http):
+        status, payload = await http('POST', '/jobs', headers={'Content-Length': length})
+        assert status == 400
+        assert json.loads(payload) == {"error": "invalid Content-Length"}
+
+    serve(test)
+
+
+def test_submit_validates_the_request(serve):
+    async def test(server, http):
+        status, payload = await http('POST', '/jobs', {"url": "not a url"})
+        assert status == 400
+        status, _ = await http('POST', '/jobs', {"url": "https://example.com/v", "type": "gif"})
+        assert status == 400
+        status, _ = await http('GET', '/jobs/999')
+        assert status == 404
+        assert server.jobs == {}
+
+    serve(test)
+
+
+@pytest.mark.parametrize('policy', [{"codecs": "avc1"}, {"max_height": "720"}, {"max_fps": True},
+                                    {"container": ["mp4"]}, {"max_filesize": "lots"}, {"max_width": 1}])
+def test_invalid_policy_is_rejected_at_submit(serve, policy):
+    async def test(server, http):
+        status, payload = await http('POST', '/jobs', {"url": "https://example.com/v", "policy": policy})
+        assert status == 400
+        assert json.loads(payload)['error'].startswith("invalid policy")
+        assert server.jobs == {}
+
+    serve(test)
+
+
+def test_job_events_stream_until_the_job_ends(serve):
+    async def test(server, http):
+        status, payload = await http('POST', '/jobs', {"url": "https://example.com/v"})
+        assert status == 202
+        job_id = json.loads(payload)['job']
+
+        status, payload = await http('GET', f'/jobs/{job_id}/events')
+
+        assert status == 200
+        events = sse_events(payload)
+        assert {event['job'] for event in events} == {job_id}
+        assert events[-1]['status'] == 'failed'
+        assert events[-1]['title'] == 'Test video'
+
+        status, payload = await http('GET', f'/jobs/{job_id}')
+        assert status == 200
+        assert json.loads(payload)['status'] == 'failed'
+
+    serve(test)
+
+
+def test_ended_jobs_beyond_the_cap_are_forgotten(serve):
+    async def test(server, http):
+        job_ids = []
+        for n in range(3):
+            status, payload = await http('POST', '/jobs', {"url": f"https://example.com/{n}"})
+            job_ids.append(json.loads(payload)['job'])
+            await wait_until_ended(server, job_ids[-1])
+        # The last change is published on the next loop iteration
+        await asyncio.sleep(0.1)
+
+        status, payload = await http('GET', '/jobs')
+
+        assert [job['job'] for job in json.loads(payload)] == job_ids[-2:]
+        assert set(server.snapshots) == set(server.versions) == set(job_ids[-2:])
+        assert set(server.queue.jobs) <= set(job_ids[-2:])
+        status, _ = await http('GET', f'/jobs/{job_ids[0]}/events')
+        assert status == 404
+
+    serve(test, max_finished=2)
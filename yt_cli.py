@@ -0,0 +1,292 @@
+"""Headless batch entry point.
+
+Reads URLs from arguments, a batch file or stdin, downloads them with a
+configurable number of parallel jobs and writes one JSON object per line
+to stdout for every progress update and result. Imports nothing from Tk
+or PIL, so it is suitable for servers without a display.
+
+    python yt_cli.py -j 4 -o ~/Downloads URL [URL ...]
+    python yt_cli.py -a urls.txt -t audio > events.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from yt_core import (
+    DEFAULT_MAX_PER_HOST,
+    DEFAULT_PARALLEL_DOWNLOADS,
+    DEFAULT_POSTPROCESS_WORKERS,
+    DEFAULT_SUBTITLE_LANGUAGES,
+    BandwidthGovernor,
+    DownloadArchive,
+    DownloadJob,
+    DownloadQueue,
+    FormatPolicy,
+    FragmentTuner,
+    MetadataCache,
+    PlaylistResolver,
+    download_options,
+    engine_class_for,
+    entry_video_key,
+    formats_from_info,
+    info_video_key,
+    is_playlist_url,
+    parse_languages,
+    parse_rate,
+    playlist_entry_url,
+    write_file_atomic,
+)
+
+
+class JsonlEmitter:
+    """Writes events as JSON lines; safe to call from any thread"""
+
+    def __init__(self, stream=sys.stdout, progress_interval=1.0):
+        self.stream = stream
+        self.progress_interval = progress_interval
+        self.last_progress = {}  # Job id -> time of the last progress line
+        self.lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps(dict(event=event, time=round(time.time(), 3), **fields))
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def progress(self, job):
+        """Emit a progress line, at most once per interval for each job"""
+        now = time.monotonic()
+        if now - self.last_progress.get(job.id, 0) < self.progress_interval:
+            return
+        self.last_progress[job.id] = now
+        snapshot = job.to_dict()
+        self.emit(
+            "progress",
+            job=job.id,
+            percent=job.progress,
+            downloaded_bytes=snapshot['downloaded_bytes'],
+            total_bytes=snapshot['total_bytes'],
+            speed=snapshot['speed'],
+            eta=job.last_event.get('eta'),
+            streams=snapshot['streams'],
+            text=job.progress_text,
+        )
+
+
+def read_urls(args):
+    """Collect URLs from the command line, the batch file and stdin"""
+    urls = list(args.urls)
+    sources = []
+    if args.batch_file == '-':
+        sources.append(sys.stdin)
+    elif args.batch_file:
+        sources.append(open(args.batch_file, 'r', encoding='utf-8'))
+    elif not urls and not sys.stdin.isatty():
+        sources.append(sys.stdin)
+
+    for source in sources:
+        for line in source:
+            line = line.strip()
+            # Same comment syntax as yt-dlp batch files
+            if line and not line.startswith(('#', ';', ']')):
+                urls.append(line)
+    return urls
+
+
+def fragment_count(value):
+    """argparse type of --concurrent-fragments: 'auto' or a positive number"""
+    if value == 'auto':
+        return value
+    if not value.isdigit() or int(value) < 1:
+        raise argparse.ArgumentTypeError(f"expected 'auto' or a positive number: {value}")
+    return int(value)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Download videos or audio with yt-dlp and report progress as JSON lines."
+    )
+    parser.add_argument('urls', nargs='*', metavar='URL', help="Video, playlist or channel URLs")
+    parser.add_argument('-a', '--batch-file', metavar='FILE',
+                        help="File with one URL per line ('-' for stdin)")
+    parser.add_argument('-t', '--type', choices=['video', 'audio'], default='video',
+                        help="Download video (MP4) or audio (MP3)")
+    parser.add_argument('-f', '--format', metavar='ID',
+                        help="Format id to download (default: picked by the format policy below)")
+    parser.add_argument('--max-height', type=int, metavar='PIXELS', help="Highest video resolution, e.g. 1080")
+    parser.add_argument('--max-fps', type=float, metavar='FPS', help="Highest frame rate")
+    parser.add_argument('--max-filesize', type=parse_rate, metavar='SIZE',
+                        help="Largest download (video + audio), e.g. 500M or 2G")
+    parser.add_argument('--codec', action='append', default=[], metavar='PREFIX',
+                        help="Preferred codec, e.g. avc1 or av01; repeat in order of preference")
+    parser.add_argument('--container', choices=['mp4', 'webm'],
+                        help="Only pick video and audio that merge into this container")
+    parser.add_argument('--sub-langs', type=parse_languages, default=','.join(DEFAULT_SUBTITLE_LANGUAGES), metavar='LANGS',
+                        help="Subtitle languages to embed into videos, e.g. en,pt-BR; 'none' or 'all' "
+                             "(default: %(default)s)")
+    parser.add_argument('-o', '--output-dir', default=str(Path.home() / "Downloads"),
+                        help="Output directory")
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_PARALLEL_DOWNLOADS,
+                        help="Number of parallel downloads")
+    parser.add_argument('-r', '--limit-rate', type=parse_rate, metavar='RATE',
+                        help="Bandwidth budget for all jobs together, e.g. 500K or 4.2M")
+    parser.add_argument('--max-per-host', type=int, default=DEFAULT_MAX_PER_HOST, metavar='N',
+                        help="Maximum number of parallel downloads from one site")
+    parser.add_argument('--postprocess-workers', type=int, nargs='?', const=DEFAULT_POSTPROCESS_WORKERS, default=0,
+                        metavar='N', help="Merge and convert on N separate workers while downloads continue "
+                                          "(without N: one per CPU core, at least 2; 0: inside each download)")
+    parser.add_argument('--concurrent-fragments', type=fragment_count, default='auto', metavar='N|auto',
+                        help="Fragments of DASH/HLS formats fetched at once; 'auto' tunes it per site")
+    parser.add_argument('--engine', choices=['auto', 'in-process', 'subprocess'], default='auto',
+                        help="How yt-dlp is driven")
+    parser.add_argument('--no-cache', action='store_true', help="Do not use the metadata cache")
+    parser.add_argument('--no-archive', action='store_true',
+                        help="Download videos again even if the archive lists them as downloaded")
+    parser.add_argument('--verify-files', action='store_true',
+                        help="Only skip archived videos whose output file still exists")
+    parser.add_argument('--progress-interval', type=float, default=1.0, metavar='SECONDS',
+                        help="Minimum time between progress lines of one job")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="Write per-stage timings and queue metrics in the Prometheus text format at the end")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Also emit yt-dlp output lines")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    urls = read_urls(args)
+    if not urls:
+        build_parser().error("no URLs given")
+    if not os.path.isdir(args.output_dir):
+        build_parser().error(f"output directory does not exist: {args.output_dir}")
+
+    out = JsonlEmitter(progress_interval=args.progress_interval)
+    engine_factory = engine_class_for(args.engine)
+    cache = MetadataCache(enabled=not args.no_cache)
+    archive = None if args.no_archive else DownloadArchive(verify_files=args.verify_files)
+    policy = FormatPolicy(args.max_height, args.max_fps, args.max_filesize,
+                          [codec for value in args.codec for codec in value.split(',') if codec],
+                          args.container)
+    resolver = PlaylistResolver(cache, max_workers=max(1, args.jobs))
+    results = {}
+
+    def on_update(job):
+        if job.is_active:
+            if job.status == "running":
+                out.progress(job)
+            return
+        if job.id not in results:
+            results[job.id] = job.status
+            out.emit(job.status, **job.to_dict())
+
+    def on_log(job, line):
+        if args.verbose:
+            out.emit("log", job=job.id, line=line)
+
+    subtitles = None
+    if args.sub_langs:
+        # Imported here: requests adds a noticeable part to the startup time
+        from yt_subtitles import SubtitleFetcher
+        subtitles = SubtitleFetcher()
+
+    queue = DownloadQueue(
+        max_workers=max(1, args.jobs),
+        on_update=on_update,
+        on_log=on_log,
+        governor=BandwidthGovernor(args.limit_rate, max(1, args.max_per_host)),
+        fragment_tuner=FragmentTuner(fixed=None if args.concurrent_fragments == 'auto' else args.concurrent_fragments),
+        archive=archive,
+        postprocess_workers=max(0, args.postprocess_workers),
+        subtitles=subtitles
+    )
+
+    def archived(key, url, format_id=None):
+        """Report and return True if the archive already has this video"""
+        found = archive.find(key, args.type, format_id) if archive else None
+        if found:
+            results[url] = "skipped"
+            out.emit("skipped", url=url, format=found[0], output=found[1])
+        return found is not None
+
+    def resolve(entry):
+        if archived(entry_video_key(entry), playlist_entry_url(entry), args.format):
+            return None
+        started = time.perf_counter()
+        return resolver.resolve(entry, engine_factory,
+                                lambda entry, info: on_resolved(entry, info, started), on_error)
+
+    def on_resolved(entry, info, started):
+        url = info.get('webpage_url') or playlist_entry_url(entry)
+        format_id, audio_id, reason = args.format, None, None
+        if not format_id:
+            choice = policy.select(formats_from_info(info), args.type)
+            if choice:
+                format_id, audio_id, reason = choice['format_id'], choice['audio_id'], choice['reason']
+            elif info.get('formats'):
+                results[url] = "failed"
+                out.emit("error", url=url, error=f"no format fits the policy ({policy.describe()})")
+                return
+            else:
+                format_id, reason = "bestvideo", "no format list; yt-dlp chooses"
+        # Non-YouTube URLs only map to a video key after extraction
+        if archived(info_video_key(info), url, format_id):
+            return
+        job = DownloadJob(
+            url,
+            download_options(args.type, format_id, args.output_dir, audio_id, args.sub_langs),
+            title=info.get('title'),
+            engine_factory=engine_factory,
+            info=info
+        )
+        # Includes the wait for a free resolver thread
+        job.add_stage("resolve", time.perf_counter() - started)
+        out.emit("queued", job=job.id, url=job.url, title=job.title, format=job.options['format'], reason=reason)
+        queue.submit(job)
+
+    def on_error(entry, error):
+        results[playlist_entry_url(entry)] = "failed"
+        out.emit("error", url=playlist_entry_url(entry), error=str(error))
+
+    pending = []
+    for url in urls:
+        if is_playlist_url(url):
+            try:
+                for entry in engine_factory().iter_playlist(url):
+                    out.emit("entry", playlist=url, id=entry.get('id'), title=entry.get('title'))
+                    pending.append(resolve(entry))
+            except Exception as e:
+                results[url] = "failed"
+                out.emit("error", url=url, error=str(e))
+        else:
+            pending.append(resolve({'url': url}))
+
+    try:
+        for future in pending:
+            if future:
+                future.result()
+        queue.wait()
+    except KeyboardInterrupt:
+        queue.cancel_all()
+        queue.wait(timeout=10)
+
+    if args.metrics_file:
+        write_file_atomic(args.metrics_file, queue.prometheus())
+
+    statuses = list(results.values())
+    out.emit(
+        "summary",
+        finished=statuses.count("finished"),
+        failed=statuses.count("failed"),
+        cancelled=statuses.count("cancelled"),
+        skipped=statuses.count("skipped"),
+    )
+    return 0 if statuses and all(status in ("finished", "skipped") for status in statuses) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2650 @@
+"""GUI-independent core of the downloader: extraction, format parsing,
+download engines, the job queue and playlist resolution.
+
+This module must not import Tk or PIL so that the CLI starts quickly.
+"""
+
+import asyncio
+import atexit
+import locale
+import queue
+import signal
+import subprocess
+import threading
+import warnings
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import re
+import time
+import importlib
+import importlib.util
+import hashlib
+import itertools
+import operator
+import shutil
+import sqlite3
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+# Hide console windows of child processes on Windows
+NO_WINDOW = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+
+# Output of child processes; -j prints a whole info dict, often megabytes, on one line
+CHILD_ENCODING = locale.getpreferredencoding(False)
+CHILD_LINE_LIMIT = 64 * 1024 * 1024
+
+# Seconds a cancelled child process gets to exit cleanly before it is killed
+CANCEL_GRACE_PERIOD = 5.0
+
+# Metadata cache limits. Signed format URLs in the info JSON usually expire
+# after about six hours, so entries older than that are refetched.
+METADATA_CACHE_TTL = 6 * 3600
+METADATA_CACHE_MAX_ENTRIES = 200
+METADATA_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Number of downloads run at the same time by default
+DEFAULT_PARALLEL_DOWNLOADS = 3
+
+# Downloads from one site at the same time, so a CDN does not throttle us
+DEFAULT_MAX_PER_HOST = 3
+
+# A running yt-dlp process is restarted with a new --limit-rate only when
+# its share changes by more than this factor
+RATE_LIMIT_RESTART_RATIO = 1.25
+
+# Concurrent fragment downloads tried for DASH/HLS formats, per host
+FRAGMENT_LEVELS = (1, 2, 4, 8, 16)
+DEFAULT_FRAGMENT_LEVEL = 2
+# A level is only worth it if it is this much faster than the one below
+FRAGMENT_GAIN_THRESHOLD = 1.10
+# Fragmented streams after which levels above the current one are probed again
+FRAGMENT_REPROBE_INTERVAL = 10
+
+# Post-processing workers when merges and transcodes run as their own
+# pipeline stage: one per core for transcodes, but at least two because
+# merges mostly copy streams and wait for the disk
+DEFAULT_POSTPROCESS_WORKERS = max(2, os.cpu_count() or 1)
+
+# ffmpeg location handed to the download stage of a pipelined job. It does
+# not exist, so yt-dlp leaves the streams unmerged for the next stage.
+NO_FFMPEG_LOCATION = os.path.join(tempfile.gettempdir(), 'yt-downloader-no-ffmpeg')
+
+# Subtitle languages embedded into videos; 'all' would fetch every track the video has
+DEFAULT_SUBTITLE_LANGUAGES = ('en',)
+
+# Number of playlist entries fully extracted at the same time
+PLAYLIST_RESOLVE_WORKERS = 4
+
+# How often the UI applies events posted by worker threads (25 Hz)
+UI_DRAIN_INTERVAL_MS = 40
+
+# Minimum time between two journal rows that only record download progress
+JOURNAL_PROGRESS_INTERVAL = 2.0
+
+# Output log limits: lines kept in memory and size of the rotated log file
+LOG_BUFFER_LINES = 2000
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+# Log level of download progress chatter, between DEBUG and INFO
+PROGRESS = 15
+logging.addLevelName(PROGRESS, 'PROGRESS')
+
+RATE_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([KMG]?)(?:i?B)?(?:/s)?$', re.IGNORECASE)
+
+# Output that means the server is pushing back on parallel fragment requests
+FRAGMENT_ERROR_RE = re.compile(r'HTTP Error 429|Too Many Requests|Retrying fragment|fragment \d+ not found')
+
+PROGRESS_LINE_RE = re.compile(r'^\[download\]\s+\d+(?:\.\d+)?%')
+
+# yt-dlp --progress-template output: one JSON object per progress tick, with
+# the hook dict under "progress" and the stream being downloaded under "info"
+PROGRESS_JSON_PREFIX = '[progress-json] '
+DOWNLOAD_PROGRESS_TEMPLATE = (
+    'download:' + PROGRESS_JSON_PREFIX +
+    '{"progress": %(progress.{status,downloaded_bytes,total_bytes,total_bytes_estimate,'
+    'speed,eta,elapsed,fragment_index,fragment_count})j, "info": %(info.{format_id,vcodec})j}'
+)
+POSTPROCESS_PROGRESS_TEMPLATE = (
+    'postprocess:' + PROGRESS_JSON_PREFIX +
+    '{"progress": %(progress.{status,postprocessor})j, "info": %(info.{format_id,id,extractor_key,filepath})j}'
+)
+
+YOUTUBE_ID_RE = re.compile(
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)'
+    r'([0-9A-Za-z_-]{11})'
+)
+
+# Playlist, channel and handle URLs that should be enumerated instead of extracted
+PLAYLIST_URL_RE = re.compile(r'youtube\.com/(?:playlist\?|channel/|c/|user/|@)')
+
+
+class EngineError(Exception):
+    """Raised when a yt-dlp engine operation fails"""
+
+
+def download_options(download_type, format_id, output_dir, audio_id=None, sub_langs=DEFAULT_SUBTITLE_LANGUAGES):
+    """Describe a download independently of the engine that runs it.
+
+    sub_langs are language codes such as 'en' or 'pt-BR'; an empty list
+    embeds no subtitles. MP3 files cannot hold subtitles, so audio
+    downloads never fetch them.
+    """
+    if download_type == "video":
+        # Use selected video format ID + best audio (or the chosen audio format)
+        # This handles cases where format IDs are not numeric
+        format_string = f"{format_id}+{audio_id or 'bestaudio'}/best"
+    else:
+        format_string = f"{audio_id}/bestaudio" if audio_id else "bestaudio"
+
+    return {
+        "download_type": download_type,
+        "format_id": format_id,
+        "format": format_string,
+        "extract_audio": download_type == "audio",
+        "audio_format": "mp3",
+        "embed_subs": download_type == "video" and bool(sub_langs),
+        "sub_langs": list(sub_langs),
+        "embed_metadata": True,
+        "embed_thumbnail": True,
+        "outtmpl": os.path.join(output_dir, '%(title)s.%(ext)s'),
+    }
+
+
+def stage_options(options, stage):
+    """Return options that run only one stage of a pipelined download.
+
+    The 'download' stage fetches the raw streams and stops before ffmpeg
+    would run. The 'postprocess' stage runs yt-dlp again with the full
+    options; it finds the streams on disk, reports them as already
+    downloaded and goes straight to merging and post-processing.
+    """
+    return dict(options, stage=stage)
+
+
+def format_summary(format_info):
+    """One-line description of a format_info row for logs"""
+    if format_info['vcodec'] == "none":
+        return f"{format_info['id']} ({format_info['ext']} {format_info['acodec']} {format_info['abr']})"
+    return (f"{format_info['id']} ({format_info['resolution']} {format_info['vcodec']} "
+            f"{format_info['fps']} {format_info['ext']})")
+
+
+class FormatPolicy:
+    """Declarative format preferences, applied to structured format data.
+
+    max_height, max_fps and max_filesize are hard limits; formats of
+    unknown height, fps or size pass them. codecs is an ordered list of
+    codec prefixes such as ('avc1', 'mp4a') for compatibility or
+    ('av01', 'opus') for size: a preferred codec wins over a higher
+    resolution, other codecs are only used when no preferred one fits.
+    container ('mp4' or 'webm') keeps video and audio mergeable without
+    re-encoding.
+    """
+
+    def __init__(self, max_height=None, max_fps=None, max_filesize=None, codecs=(), container=None):
+        self.max_height = max_height
+        self.max_fps = max_fps
+        self.max_filesize = max_filesize
+        self.codecs = tuple(codec.lower() for codec in codecs)
+        self.container = container
+
+    def describe(self):
+        """Summarise the policy, e.g. '≤1080p, avc1 > mp4a, mp4'"""
+        parts = []
+        if self.max_height:
+            parts.append(f"≤{self.max_height}p")
+        if self.max_fps:
+            parts.append(f"≤{self.max_fps:g}fps")
+        if self.max_filesize:
+            parts.append(f"≤{format_bytes(self.max_filesize)}")
+        if self.codecs:
+            parts.append(" > ".join(self.codecs))
+        if self.container:
+            parts.append(self.container)
+        return ", ".join(parts) or "best available"
+
+    def _codec_rank(self, codec):
+        for rank, prefix in enumerate(self.codecs):
+            if codec.startswith(prefix):
+                return rank
+        return len(self.codecs)
+
+    def _best(self, formats, audio, budget):
+        """Return (best fitting format, number that fit) in one pass"""
+        best, best_key, fitting = None, None, 0
+        for fmt in formats:
+            size = fmt['filesize_bytes'] or fmt['filesize_approx']
+            if budget is not None and size and size > budget:
+                continue
+            if self.container and not self._fits_container(fmt['ext'], audio):
+                continue
+            if not audio:
+                if self.max_height and fmt['height'] and fmt['height'] > self.max_height:
+                    continue
+                if self.max_fps and fmt['fps_value'] and fmt['fps_value'] > self.max_fps:
+                    continue
+            fitting += 1
+            key = (-self._codec_rank(fmt['acodec'] if audio else fmt['vcodec']), fmt['sort_key'])
+            if best_key is None or key > best_key:
+                best, best_key = fmt, key
+        return best, fitting
+
+    def _fits_container(self, ext, audio):
+        if not audio:
+            return ext == self.container
+        return ext in (('m4a', 'mp4') if self.container == 'mp4' else (self.container,))
+
+    def select(self, formats_data, download_type="video"):
+        """Pick the video and audio format to download.
+
+        Returns a dict with the chosen 'video' and 'audio' format_info
+        (either may be None), the 'format_id' and 'audio_id' to pass to
+        download_options() and the 'reason' for the choice; None when no
+        format fits the policy.
+        """
+        formats_data = formats_data or {}
+        audio_formats = formats_data.get('audio') or []
+        video_formats = formats_data.get('video') or []
+
+        audio, audio_fitting = self._best(audio_formats, True, self.max_filesize)
+        if download_type == "audio":
+            if not audio_formats:
+                # Only combined formats: the audio is extracted from the best of them
+                combined, _ = self._best([fmt for fmt in video_formats if fmt['acodec'] != "none"],
+                                         False, self.max_filesize)
+                if combined is None:
+                    return None
+                return {"video": None, "audio": combined, "format_id": combined['id'],
+                        "audio_id": combined['id'],
+                        "reason": f"{format_summary(combined)}: no audio-only formats, "
+                                  f"audio is extracted from the best combined format"}
+            if audio is None:
+                return None
+            return {"video": None, "audio": audio, "format_id": audio['id'], "audio_id": audio['id'],
+                    "reason": f"{format_summary(audio)}: best of {audio_fitting}/{len(audio_formats)} "
+                              f"audio formats within {self.describe()}"}
+
+        budget = self.max_filesize
+        if budget and audio:
+            budget -= audio['filesize_bytes'] or audio['filesize_approx'] or 0
+        video, video_fitting = self._best(video_formats, False, budget)
+        if video is None:
+            return None
+
+        reason = f"best of {video_fitting}/{len(video_formats)} video formats within {self.describe()}"
+        if self.codecs and self._codec_rank(video['vcodec']) == len(self.codecs):
+            reason += "; no preferred video codec available"
+        choice = format_summary(video)
+        if audio:
+            choice += f" + {format_summary(audio)}"
+        return {"video": video, "audio": audio, "format_id": video['id'],
+                "audio_id": audio['id'] if audio else None, "reason": f"{choice}: {reason}"}
+
+
+def parse_rate(text):
+    """Parse a rate such as '500K' or '2.5M' (binary units, like --limit-rate) into bytes/s.
+
+    Returns None for empty input; raises ValueError for anything unparsable.
+    """
+    if not text:
+        return None
+    match = RATE_RE.match(text.strip())
+    if not match:
+        raise ValueError(f"invalid rate: {text}")
+    return int(float(match.group(1)) * 1024 ** ' KMG'.index(match.group(2).upper() or ' '))
+
+
+def parse_languages(text):
+    """Parse a comma-separated list of subtitle languages such as 'en,pt-BR'.
+
+    'none' or empty input means no subtitles.
+    """
+    languages = [lang.strip() for lang in (text or '').split(',') if lang.strip()]
+    return () if languages == ['none'] else tuple(languages)
+
+
+def url_host(url):
+    """Return the host of a URL without a leading www."""
+    host = urlsplit(url).netloc.lower().rsplit('@', 1)[-1].split(':', 1)[0]
+    return host[4:] if host.startswith('www.') else host
+
+
+def describe_progress(event):
+    """Build a one-line progress description from a structured progress event"""
+    parts = []
+    if event.get('percent') is not None:
+        parts.append(f"{event['percent'] * 100:.1f}%")
+    total = event.get('total_bytes')
+    if total:
+        parts.append(f"of {format_bytes(total)}")
+    if event.get('speed'):
+        parts.append(f"at {format_bytes(event['speed'])}/s")
+    if event.get('eta') is not None:
+        parts.append(f"ETA {int(event['eta']) // 60:02d}:{int(event['eta']) % 60:02d}")
+    if event.get('fragment_count'):
+        parts.append(f"(frag {event.get('fragment_index') or 0}/{event['fragment_count']})")
+    if event.get('stream'):
+        parts.append(f"[{event.get('kind')} {event['stream']}]")
+    return " ".join(parts) or event.get('status', '')
+
+
+def progress_event(progress, info):
+    """Build a structured progress event from a yt-dlp progress dict.
+
+    info is the info dict of the stream being downloaded; with -f A+B the
+    video and the audio stream report separately under their format ids.
+    """
+    status = progress.get('status')
+    total = progress.get('total_bytes') or progress.get('total_bytes_estimate')
+    downloaded = progress.get('downloaded_bytes')
+    if status == 'finished' and downloaded is not None:
+        total = total or downloaded
+
+    event = {
+        "status": status,
+        "stream": info.get('format_id'),
+        "kind": "audio" if info.get('vcodec') == 'none' else "video",
+        "downloaded_bytes": downloaded,
+        "total_bytes": total,
+        "speed": progress.get('speed'),
+        "eta": progress.get('eta'),
+        "fragment_index": progress.get('fragment_index'),
+        "fragment_count": progress.get('fragment_count'),
+        "elapsed": progress.get('elapsed'),
+        "percent": downloaded / total if downloaded is not None and total else None,
+    }
+    if status == 'finished':
+        event["percent"] = 1.0
+    event["text"] = describe_progress(event)
+    return event
+
+
+def postprocess_event(postprocessor):
+    """Build the progress event reported while a postprocessor runs"""
+    return {"status": "postprocessing", "postprocessor": postprocessor, "percent": None,
+            "text": f"⚙️ {postprocessor}..."}
+
+
+def format_bytes(num_bytes):
+    """Format a byte count the way yt-dlp -F does (e.g. 12.34MiB)"""
+    size = float(num_bytes)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.2f}{unit}"
+        size /= 1024
+    return f"{size:.2f}TiB"
+
+
+def formats_from_info(info):
+    """Build the formats_data table from the 'formats' array of the -j JSON"""
+    format_infos = []
+    for fmt in info.get('formats') or []:
+        # Skip storyboards and other entries without any media stream
+        if fmt.get('vcodec') == 'none' and fmt.get('acodec') == 'none':
+            continue
+        format_infos.append(format_info_from_json(fmt))
+    return group_formats(format_infos)
+
+
+def format_info_from_json(fmt):
+    """Convert one yt-dlp format dict into the format_info layout used by the UI"""
+    return make_format_info(
+        fmt.get('format_id'),
+        ext=fmt.get('ext'),
+        vcodec=fmt.get('vcodec'),
+        acodec=fmt.get('acodec'),
+        width=fmt.get('width'),
+        height=fmt.get('height'),
+        fps=fmt.get('fps'),
+        abr=fmt.get('abr'),
+        tbr=fmt.get('tbr'),
+        filesize=fmt.get('filesize'),
+        filesize_approx=fmt.get('filesize_approx'),
+        protocol=fmt.get('protocol'),
+        full=fmt.get('format'),
+    )
+
+
+def make_format_info(format_id, ext=None, vcodec=None, acodec=None, width=None, height=None,
+                     fps=None, abr=None, tbr=None, filesize=None, filesize_approx=None,
+                     protocol=None, full=None, resolution=None):
+    """Build the format_info layout used by the UI from typed values.
+
+    Display strings and the sort key are computed here once, so the -j and
+    -F paths produce identical rows and sorting never re-parses text.
+    """
+    vcodec = vcodec or "unknown"
+    acodec = acodec or "unknown"
+
+    if width and height:
+        resolution = f"{width}x{height}"
+    elif height:
+        resolution = f"{height}p"
+    elif vcodec == "none":
+        resolution = "audio only"
+    elif not resolution:
+        resolution = "N/A"
+
+    if filesize:
+        filesize_text = format_bytes(filesize)
+    elif filesize_approx:
+        filesize_text = f"~{format_bytes(filesize_approx)}"
+    else:
+        filesize_text = "N/A"
+
+    if vcodec == "none":
+        sort_key = (abr or tbr or 0,)
+    else:
+        sort_key = (height or 0, fps or 0, tbr or 0)
+
+    return {
+        "id": str(format_id),
+        "ext": ext or "unknown",
+        "resolution": resolution,
+        "filesize": filesize_text,
+        "fps": f"{fps:g}fps" if fps else "N/A",
+        "vcodec": vcodec,
+        "acodec": acodec,
+        "abr": f"{round(abr)}k" if abr else "N/A",
+        "codec": vcodec if vcodec != "none" else acodec,
+        "full": full or "",
+        # Typed values
+        "width": width,
+        "height": height,
+        "fps_value": fps,
+        "abr_value": abr,
+        "tbr": tbr,
+        "filesize_bytes": filesize,
+        "filesize_approx": filesize_approx,
+        "protocol": protocol,
+        "sort_key": sort_key,
+    }
+
+
+def group_formats(format_infos):
+    """Split format_info rows into video and audio lists, best first"""
+    formats_data = {"video": [], "audio": []}
+    for format_info in format_infos:
+        if format_info["vcodec"] == "none":
+            formats_data["audio"].append(format_info)
+        else:
+            formats_data["video"].append(format_info)
+
+    sort_key = operator.itemgetter("sort_key")
+    formats_data["video"].sort(key=sort_key, reverse=True)
+    formats_data["audio"].sort(key=sort_key, reverse=True)
+    return formats_data
+
+
+# yt-dlp -F table columns whose values are right-aligned under their header
+FORMAT_TABLE_RIGHT_ALIGNED = frozenset(('FPS', 'CH', 'FILESIZE', 'TBR', 'VBR', 'ABR', 'ASR'))
+FORMAT_TABLE_DELIMITERS = frozenset(('│', '|'))
+
+FORMAT_TOKEN_RE = re.compile(r'\S+')
+ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;]*m')
+FORMAT_SIZE_RE = re.compile(r'^~?(\d+(?:\.\d+)?)([KMGTP]i?B|B)$')
+FORMAT_NUMBER_RE = re.compile(r'^(\d+(?:\.\d+)?)k?$')
+FORMAT_RESOLUTION_RE = re.compile(r'^(?:(\d+)x(\d+|\?)|(\d+)p\d*)$')
+
+# Old layout printed with --compat-options list-formats:
+#   137  mp4  1920x1080  1080p 3007k , mp4_dash container, avc1.640028, 25fps, video only, 77.13MiB
+LEGACY_FORMAT_LINE_RE = re.compile(r'^(\S+)\s+(\S+)\s+(audio only|unknown|\d+x\d+|\d+p)\s*(.*)$')
+LEGACY_NOTE_RE = re.compile(
+    r'(?P<size>~?\d+(?:\.\d+)?[KMGTP]i?B)\b'
+    r'|(?P<fps>\d+(?:\.\d+)?)fps\b'
+    r'|\b(?P<acodec>(?:mp4a|opus|vorbis|aac|mp3|flac|alac|ac-3|ec-3|eac3|dtse?)[\w.-]*)'
+    r'(?:\s*@\s*(?P<abr>\d+(?:\.\d+)?)k)?'
+    r'|\b(?P<vcodec>(?:avc[1-4]?|h26[45]|hevc|hev1|hvc1|vp0?[89]|av01|theora)[\w.-]*)(?:\s*@\s*\d+k)?'
+    r'|(?P<video_only>video only)'
+    r'|\b(?P<tbr>\d+(?:\.\d+)?)k\b'
+)
+
+SIZE_UNITS = {
+    'B': 1,
+    'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3, 'TiB': 1024 ** 4, 'PiB': 1024 ** 5,
+    'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4, 'PB': 1000 ** 5,
+}
+
+
+def parse_format_lines(lines):
+    """Parse the output of yt-dlp -F (fallback when -j has no formats).
+
+    The table header is used to locate the columns: left-aligned values
+    start where their header starts and right-aligned ones end where it
+    ends, so every cell is found with a single pass over the tokens of a
+    line instead of guessing from substrings.
+    """
+    format_infos = []
+    left = right = None
+    legacy = False
+
+    for line in lines or ():
+        line = line.rstrip()
+        if not line or line[0] == '[':
+            continue
+        if '\x1b' in line:
+            line = ANSI_ESCAPE_RE.sub('', line)
+
+        if line.startswith('ID '):
+            left, right = format_table_columns(line)
+            continue
+        if line.startswith('format code'):
+            legacy = True
+            continue
+
+        if left is not None:
+            if line[0] in '─-':
+                continue
+            format_info = format_info_from_row(split_format_row(line, left, right), line)
+        elif legacy:
+            format_info = format_info_from_legacy_line(line)
+        else:
+            continue
+
+        if format_info:
+            format_infos.append(format_info)
+
+    return group_formats(format_infos)
+
+
+def format_table_columns(header):
+    """Map header positions to column names: start -> left-aligned, end -> right-aligned"""
+    left, right = {}, {}
+    for match in FORMAT_TOKEN_RE.finditer(header):
+        name = match.group()
+        if name in FORMAT_TABLE_DELIMITERS or name == 'INFO':
+            continue
+        if name in FORMAT_TABLE_RIGHT_ALIGNED:
+            right[match.end()] = name
+        else:
+            left[match.start()] = 'MORE INFO' if name == 'MORE' else name
+    return left, right
+
+
+def split_format_row(line, left, right):
+    """Split one -F table row into {column: text}"""
+    cells = {}
+    column = None
+    left_column, right_column = left.get, right.get
+    for match in FORMAT_TOKEN_RE.finditer(line):
+        start, end = match.span()
+        token = line[start:end]
+        name = left_column(start) or right_column(end)
+        if name:
+            column = name
+            if name == 'FILESIZE' and token[0] in '≈~':
+                # Approximate size that fills the whole column, e.g. "≈209.20MiB"
+                cells['approx'] = token[0]
+                token = token[1:]
+            cells[name] = token
+        elif token in FORMAT_TABLE_DELIMITERS:
+            column = None
+        elif token in ('≈', '~'):
+            # Marks an approximate file size; the number follows
+            cells['approx'] = token
+        elif column:
+            # Continuation of a multi-word cell such as "audio only"
+            cells[column] += ' ' + token
+    return cells
+
+
+def format_info_from_row(cells, line):
+    """Convert the cells of one -F table row into format_info, or None"""
+    format_id = cells.get('ID')
+    vcodec = cells.get('VCODEC')
+    if not format_id or vcodec == 'images':
+        # Storyboards have no media stream
+        return None
+
+    acodec = cells.get('ACODEC')
+    if vcodec == 'audio only':
+        vcodec = 'none'
+    if acodec == 'video only' or (not acodec and vcodec == 'none'):
+        acodec = 'none'
+
+    width = height = None
+    resolution = cells.get('RESOLUTION')
+    match = FORMAT_RESOLUTION_RE.match(resolution) if resolution else None
+    if match:
+        if match.group(1):
+            width = int(match.group(1))
+            height = int(match.group(2)) if match.group(2) != '?' else None
+        else:
+            height = int(match.group(3))
+
+    filesize = filesize_approx = None
+    size = parse_size(cells.get('FILESIZE'))
+    if size is not None:
+        if 'approx' in cells:
+            filesize_approx = size
+        else:
+            filesize = size
+
+    return make_format_info(
+        format_id,
+        ext=cells.get('EXT'),
+        vcodec=vcodec,
+        acodec=acodec,
+        width=width if height else None,
+        height=height,
+        fps=parse_number(cells.get('FPS')),
+        abr=parse_number(cells.get('ABR')),
+        tbr=parse_number(cells.get('TBR')),
+        filesize=filesize,
+        filesize_approx=filesize_approx,
+        protocol=cells.get('PROTO'),
+        full=line,
+        resolution=resolution,
+    )
+
+
+def format_info_from_legacy_line(line):
+    """Convert one line of the old -F layout into format_info, or None"""
+    match = LEGACY_FORMAT_LINE_RE.match(line)
+    if not match:
+        return None
+    format_id, ext, resolution, note = match.groups()
+    if note.startswith('storyboard'):
+        return None
+
+    values = {}
+    for item in LEGACY_NOTE_RE.finditer(note):
+        # First occurrence wins, e.g. the total bitrate before "video@ 0k"
+        for name, value in item.groupdict().items():
+            if value is not None:
+                values.setdefault(name, value)
+
+    width = height = None
+    if resolution == 'audio only':
+        vcodec = 'none'
+    else:
+        vcodec = values.get('vcodec')
+        size_match = FORMAT_RESOLUTION_RE.match(resolution)
+        if size_match and size_match.group(1):
+            width, height = int(size_match.group(1)), int(size_match.group(2))
+        elif size_match:
+            height = int(size_match.group(3))
+    acodec = 'none' if 'video_only' in values else values.get('acodec')
+
+    size = values.get('size')
+    return make_format_info(
+        format_id,
+        ext=ext,
+        vcodec=vcodec,
+        acodec=acodec,
+        width=width,
+        height=height,
+        fps=parse_number(values.get('fps')),
+        abr=parse_number(values.get('abr')),
+        tbr=parse_number(values.get('tbr')),
+        filesize=parse_size(size) if size and size[0] != '~' else None,
+        filesize_approx=parse_size(size) if size and size[0] == '~' else None,
+        full=line,
+        resolution=resolution,
+    )
+
+
+def parse_size(text):
+    """Convert '12.34MiB' to a byte count; None for anything else"""
+    match = FORMAT_SIZE_RE.match(text) if text else None
+    if not match:
+        return None
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def parse_number(text):
+    """Convert '30', '29.97' or '128k' to a number; None for anything else"""
+    match = FORMAT_NUMBER_RE.match(text) if text else None
+    if not match:
+        return None
+    value = float(match.group(1))
+    return int(value) if value.is_integer() else value
+
+
+def format_duration(seconds):
+    """Format duration from seconds to readable format"""
+    if not seconds:
+        return "Unknown"
+
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    seconds = int(seconds % 60)
+
+    if hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    else:
+        return f"{minutes:02d}:{seconds:02d}"
+
+
+def log_level_for(line):
+    """Classify a yt-dlp output line as PROGRESS chatter or regular INFO"""
+    return PROGRESS if PROGRESS_LINE_RE.match(line) else logging.INFO
+
+
+def app_cache_dir():
+    """Return the per-user cache directory of the application"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or str(Path.home() / 'AppData' / 'Local')
+    elif sys.platform == 'darwin':
+        base = str(Path.home() / 'Library' / 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or str(Path.home() / '.cache')
+    return Path(base) / 'yt_downloader'
+
+
+def write_file_atomic(path, data):
+    """Replace a file with data (str as UTF-8, or bytes) so readers never see it half written"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per thread, as pools write to the same cache directories
+    tmp_path = path.with_suffix(f'{path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.write_bytes(data.encode('utf-8') if isinstance(data, str) else data)
+    os.replace(tmp_path, path)
+
+
+def canonical_video_key(url):
+    """Map a URL to an 'extractor:id' key without touching the network"""
+    url = url.strip()
+    match = YOUTUBE_ID_RE.search(url)
+    if match:
+        return f"youtube:{match.group(1)}"
+
+    # Unknown site: normalise the URL so trivial variations still match
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/') or '/'
+    return "url:" + urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+def is_video_url(url):
+    """Check whether text looks like a complete http(s) URL that yt-dlp could extract"""
+    parts = urlsplit(url.strip())
+    return parts.scheme in ('http', 'https') and '.' in parts.netloc
+
+
+def is_playlist_url(url):
+    """Check whether a URL points to a playlist or channel rather than one video"""
+    return PLAYLIST_URL_RE.search(url) is not None
+
+
+def playlist_entry_url(entry):
+    """Return the URL to extract a flat playlist entry from"""
+    url = entry.get('url') or entry.get('webpage_url')
+    if url and '://' in url:
+        return url
+    if (entry.get('ie_key') or '').lower() == 'youtube':
+        return f"https://www.youtube.com/watch?v={entry.get('id')}"
+    return url or entry.get('id')
+
+
+def info_video_key(info):
+    """Return the 'extractor:id' key of an extracted info dict"""
+    extractor = info.get('extractor_key') or info.get('extractor') or 'generic'
+    return f"{extractor.lower()}:{info.get('id')}"
+
+
+def entry_video_key(entry):
+    """Return the 'extractor:id' key of a flat playlist entry without extracting it"""
+    if entry.get('ie_key') and entry.get('id'):
+        return f"{entry['ie_key'].lower()}:{entry['id']}"
+    return canonical_video_key(playlist_entry_url(entry))
+
+
+class DiskLRU:
+    """Files or directories kept below one directory, least recently used dropped first.
+
+    Every entry directly below directory counts once, and its mtime is
+    its last use: store() and touch() renew it, and store() drops the
+    oldest entries beyond max_entries. Errors are ignored, as the caches
+    built on this are only an optimisation.
+    """
+
+    def __init__(self, directory, max_entries):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def store(self, path, data):
+        """Write data to path (an entry or a file inside one) and evict beyond the limit"""
+        try:
+            write_file_atomic(path, data)
+            self.evict()
+        except OSError:
+            pass
+
+    def touch(self, path):
+        """Mark an entry as just used"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            for path in self.directory.iterdir():
+                try:
+                    if not path.name.endswith('.tmp'):
+                        entries.append((path.stat().st_mtime, path))
+                except OSError:
+                    pass  # Removed meanwhile
+            entries.sort()
+            for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+
+
+class MetadataCache:
+    """On-disk cache of extracted video info with TTL expiry and LRU eviction.
+
+    Entries are keyed by extractor and video ID, so every URL form of the
+    same video maps to one entry. Each entry is a JSON file whose mtime
+    doubles as the last-access time for LRU eviction. fetch() also
+    deduplicates extractions that are still running.
+
+    A disabled cache neither reads nor writes the disk; fetch() then only
+    deduplicates.
+    """
+
+    def __init__(self, directory=None, ttl=METADATA_CACHE_TTL,
+                 max_entries=METADATA_CACHE_MAX_ENTRIES, max_bytes=METADATA_CACHE_MAX_BYTES, enabled=True):
+        self.directory = Path(directory) if directory else app_cache_dir() / 'metadata'
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared = 0  # Fetches that joined an extraction already in flight
+        self.in_flight = {}  # Canonical key -> {"future", "waiters"} of running extractions
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / (hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, url):
+        """Return the cached entry for a URL, or None on a miss or expiry"""
+        with self.lock:
+            return self._get(url)
+
+    def _get(self, url):
+        if not self.enabled:
+            self.misses += 1
+            return None
+        key = canonical_video_key(url)
+        entry = self._read(key)
+        # Non-YouTube URLs are stored as an alias to the real video key
+        if entry and 'alias' in entry:
+            key = entry['alias']
+            entry = self._read(key)
+
+        if not entry or time.time() - entry.get('stored_at', 0) > self.ttl:
+            if entry:
+                self._remove(self._path(key))
+            self.misses += 1
+            return None
+
+        # Touch the file so it counts as recently used
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        self.hits += 1
+        return entry
+
+    def fetch(self, url, extract):
+        """Return the entry for a URL, calling extract(url) for the info dict on a miss.
+
+        Concurrent fetches of the same video share one extraction: the
+        first caller runs it and the others wait for its result, or its
+        error. Playlist results are returned but not cached.
+        """
+        key = canonical_video_key(url)
+        with self.lock:
+            # Looked up under the lock: an extraction stores its entry before it
+            # leaves in_flight, so a caller sees one or the other, never neither
+            entry = self._get(url)
+            if entry:
+                return entry
+            flight = self.in_flight.get(key)
+            joined = flight is not None
+            if joined:
+                flight["waiters"] += 1
+                self.shared += 1
+            else:
+                flight = self.in_flight[key] = {"future": Future(), "waiters": 0}
+        if joined:
+            try:
+                return flight["future"].result()
+            finally:
+                with self.lock:
+                    flight["waiters"] -= 1
+
+        try:
+            info = extract(url)
+            formats_data = formats_from_info(info) if info.get('formats') else None
+            entry = {"key": info_video_key(info), "stored_at": time.time(), "info": info,
+                     "formats_data": formats_data}
+            if info.get('_type') != 'playlist':
+                self.put(url, info, formats_data)
+            flight["future"].set_result(entry)
+            return entry
+        except BaseException as e:
+            flight["future"].set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def waiters(self, url):
+        """Return how many fetches are waiting for the running extraction of a URL"""
+        with self.lock:
+            flight = self.in_flight.get(canonical_video_key(url))
+            return flight["waiters"] if flight else 0
+
+    def put(self, url, info, formats_data=None):
+        """Store the info dict and format table extracted for a URL"""
+        key = info_video_key(info)
+        entry = {
+            "key": key,
+            "stored_at": time.time(),
+            "info": info,
+            "formats_data": formats_data,
+        }
+        if not self.enabled:
+            return
+        with self.lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._write(key, entry)
+                url_key = canonical_video_key(url)
+                if url_key != key:
+                    self._write(url_key, {"alias": key})
+                self._evict()
+            except OSError:
+                pass
+
+    def _write(self, key, entry):
+        write_file_atomic(self._path(key), json.dumps(entry))
+
+    def _remove(self, path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its limits"""
+        files = []
+        for path in self.directory.glob('*.json'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        while files and (len(files) > self.max_entries or total > self.max_bytes):
+            _, size, path = files.pop(0)
+            self._remove(path)
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self.lock:
+            for path in self.directory.glob('*.json'):
+                self._remove(path)
+
+    def stats(self):
+        """Return the hit/miss/eviction counters"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "shared": self.shared}
+
+
+class ChildProcess:
+    """A child process owned by the ProcessSupervisor loop.
+
+    The loop reads its output; iterating the object yields the lines as
+    they arrive, so the consuming thread only ever waits on a queue.
+    terminate() returns at once and may be called from any thread.
+    """
+
+    def __init__(self, supervisor, cmd, merge_stderr=True):
+        self.supervisor = supervisor
+        self.cmd = cmd
+        self.merge_stderr = merge_stderr
+        self.process = None  # asyncio.subprocess.Process, once started
+        self.lines = queue.Queue()
+        self.stderr = ''  # Collected when stderr is not merged into the lines
+        self.returncode = None
+        self.terminating = False
+        self.future = supervisor.submit(self._run())
+
+    def __iter__(self):
+        while True:
+            line = self.lines.get()
+            if line is None:
+                return
+            yield line
+
+    def wait(self):
+        """Block until the process has exited and return its exit status"""
+        return self.future.result()
+
+    def poll(self):
+        return self.returncode
+
+    async def _run(self):
+        if sys.platform == 'win32':
+            kwargs = {'creationflags': NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            kwargs = {'start_new_session': True}  # Own process group, so ffmpeg goes down with yt-dlp
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *self.cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT if self.merge_stderr else subprocess.PIPE,
+                limit=CHILD_LINE_LIMIT,
+                **kwargs
+            )
+        except BaseException:
+            self.lines.put(None)
+            raise
+
+        self.supervisor.children.add(self)
+        if self.terminating:
+            self._stop()
+        try:
+            readers = [self._read_lines(self.process.stdout)]
+            if not self.merge_stderr:
+                readers.append(self._read_stderr(self.process.stderr))
+            await asyncio.gather(*readers)
+            self.returncode = await self.process.wait()
+        finally:
+            self.supervisor.children.discard(self)
+            self.lines.put(None)
+        return self.returncode
+
+    async def _read_lines(self, stream):
+        async for line in stream:
+            self.lines.put(line.decode(CHILD_ENCODING, 'replace').rstrip('\r\n'))
+
+    async def _read_stderr(self, stream):
+        self.stderr = (await stream.read()).decode(CHILD_ENCODING, 'replace')
+
+    def terminate(self):
+        """Ask the process and its children to exit; they are killed if still running after a grace period"""
+        self.supervisor.call_soon(self._terminate)
+
+    def _terminate(self):
+        if self.terminating:
+            return
+        self.terminating = True
+        if self.process:
+            self._stop()
+
+    def _stop(self):
+        self.signal(signal.SIGTERM)
+        self.supervisor.loop.call_later(CANCEL_GRACE_PERIOD, self.signal, getattr(signal, 'SIGKILL', signal.SIGTERM))
+
+    def signal(self, sig):
+        """Send a signal to the whole process group (Windows: end the process tree)"""
+        if self.returncode is not None or self.process is None:
+            return
+        try:
+            if sys.platform == 'win32':
+                # Windows has no process group signals; taskkill /T also ends the children
+                subprocess.Popen(['taskkill', '/F', '/T', '/PID', str(self.process.pid)],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=NO_WINDOW)
+            else:
+                os.killpg(self.process.pid, sig)
+        except OSError:
+            pass  # Already gone
+
+
+class ProcessSupervisor:
+    """One background asyncio loop that owns every yt-dlp child process.
+
+    Pipes are read with asyncio instead of a thread per process, and
+    cancelling never blocks the caller: the process group gets SIGTERM
+    and, CANCEL_GRACE_PERIOD seconds later, SIGKILL if it is still alive.
+    Children still running when the interpreter exits are terminated.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.children = set()
+        self.thread = threading.Thread(target=self._serve, name='process-supervisor', daemon=True)
+        self.thread.start()
+        atexit.register(self.shutdown)
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+        if sys.version_info < (3, 12) and hasattr(asyncio, 'PidfdChildWatcher') and _pidfd_supported():
+            # Before 3.12 asyncio waits for every child on a thread of its own
+            watcher = asyncio.PidfdChildWatcher()
+            watcher.attach_loop(self.loop)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                asyncio.set_child_watcher(watcher)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Run a coroutine on the loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def spawn(self, cmd, merge_stderr=True):
+        """Start a child process and return its ChildProcess"""
+        return ChildProcess(self, cmd, merge_stderr)
+
+    def shutdown(self):
+        for child in list(self.children):
+            child.signal(signal.SIGTERM)
+
+
+def _pidfd_supported():
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+_supervisor = None
+_supervisor_lock = threading.Lock()
+
+
+def process_supervisor():
+    """Return the ProcessSupervisor shared by all engines, starting it on first use"""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = ProcessSupervisor()
+        return _supervisor
+
+
+class SubprocessEngine:
+    """Runs every operation as a separate yt-dlp process"""
+
+    name = "subprocess"
+
+    def __init__(self, executable='yt-dlp'):
+        self.executable = executable
+        self.process = None
+        self.rate_limit = None
+        self.process_rate_limit = None  # --limit-rate of the running process
+        self.concurrent_fragments = 1
+        self.video_key = None  # 'extractor:id' and final path of the last downloaded video
+        self.filepath = None
+        self.returncode = None  # Exit status of the last download
+        self.downloading = False  # A stream is being downloaded, not post-processed
+        self.restart_requested = False
+        self.cancelled = False
+
+    def run(self, args):
+        """Run yt-dlp to completion and return its stdout"""
+        self.process = process_supervisor().spawn([self.executable] + args, merge_stderr=False)
+        stdout = '\n'.join(self.process)
+        returncode = self.process.wait()
+        if returncode != 0:
+            raise EngineError(self.process.stderr.strip() or f"yt-dlp exited with code {returncode}")
+        return stdout
+
+    def version(self):
+        """Return the yt-dlp version string"""
+        try:
+            return self.run(['--version']).strip()
+        except FileNotFoundError:
+            raise EngineError(f"{self.executable} not found")
+
+    @staticmethod
+    def locate(executable='yt-dlp'):
+        """Return the path of the yt-dlp executable, or None"""
+        return shutil.which(executable)
+
+    def extract_info(self, url):
+        """Return the -j info dict for a URL"""
+        lines = self.run(['-j', '--no-warnings', '--no-playlist', url]).splitlines()
+        if not lines:
+            raise EngineError(f"yt-dlp printed no info for {url}")
+        if len(lines) > 1:
+            # The site resolved the URL as a playlist: one JSON object per entry
+            return {"_type": "playlist", "entries": [json.loads(line) for line in lines if line.strip()]}
+        return json.loads(lines[0])
+
+    def iter_playlist(self, url):
+        """Yield flat playlist entries as yt-dlp enumerates them"""
+        self.process = process_supervisor().spawn(
+            [self.executable, '--flat-playlist', '--lazy-playlist', '-j', '--no-warnings', url],
+            merge_stderr=False
+        )
+        for line in self.process:
+            if line.strip():
+                yield json.loads(line)
+
+        if self.process.wait() != 0:
+            raise EngineError(self.process.stderr.strip() or "Playlist enumeration failed")
+
+    def list_formats(self, url):
+        """Return the lines of the -F format table for a URL"""
+        return self.run(['-F', '--no-warnings', url]).splitlines()
+
+    def build_command(self, url, options):
+        """Translate download options into a yt-dlp command line"""
+        cmd = [self.executable, '-f', options['format'], '--newline',
+               '--progress-template', DOWNLOAD_PROGRESS_TEMPLATE,
+               '--progress-template', POSTPROCESS_PROGRESS_TEMPLATE]
+        stage = options.get('stage')
+        if stage == 'download':
+            # Without ffmpeg yt-dlp warns and keeps the streams as separate files
+            cmd += ['--ffmpeg-location', NO_FFMPEG_LOCATION, '--no-abort-on-error', '--fixup', 'never']
+        else:
+            if options['extract_audio']:
+                cmd += ['--extract-audio', '--audio-format', options['audio_format']]
+            if options['embed_subs']:
+                cmd += ['--embed-subs', '--sub-langs', ','.join(options['sub_langs'])]
+            if options['embed_metadata']:
+                cmd += ['--embed-metadata']
+            if options['embed_thumbnail']:
+                cmd += ['--embed-thumbnail']
+        if stage == 'postprocess':
+            # The streams were downloaded by the previous stage, so fix them up anyway
+            cmd += ['--fixup', 'force']
+        if self.rate_limit:
+            cmd += ['--limit-rate', str(int(self.rate_limit))]
+        if self.concurrent_fragments > 1:
+            cmd += ['--concurrent-fragments', str(self.concurrent_fragments)]
+        cmd += ['-o', options['outtmpl'], url]
+        return cmd
+
+    def download(self, url, options, on_progress, on_log, info=None):
+        """Run a download, reporting log lines and progress; returns True on success.
+
+        When an already extracted info dict is given it is handed to yt-dlp via
+        --load-info-json, so the download does not extract the video again.
+        If that fails, e.g. because its format URLs expired, the download is
+        retried once with the URL.
+        """
+        info_path = None
+        if info:
+            with tempfile.NamedTemporaryFile('w', suffix='.info.json', delete=False, encoding='utf-8') as f:
+                json.dump(info, f)
+                info_path = f.name
+
+        try:
+            while True:
+                self.restart_requested = False
+                self.process_rate_limit = self.rate_limit
+                cmd = self.build_command(url, options)
+                if info_path:
+                    cmd = cmd[:-1] + ['--load-info-json', info_path]
+                ok = self._run_download(cmd, on_progress, on_log)
+                if self.cancelled:
+                    return ok
+                if self.restart_requested:
+                    # yt-dlp continues from the .part file it left behind
+                    limit = f"{format_bytes(self.rate_limit)}/s" if self.rate_limit else "no limit"
+                    on_log(f"🚦 Restarting yt-dlp with the new rate limit ({limit})")
+                    continue
+                if ok or not info_path:
+                    return ok
+                # Format URLs in the info may have expired; extract again
+                on_log("WARNING: Stored info failed to download; retrying with URL")
+                os.unlink(info_path)
+                info_path = None
+        finally:
+            self.downloading = False
+            if info_path:
+                os.unlink(info_path)
+
+    def _run_download(self, cmd, on_progress, on_log):
+        self.process = process_supervisor().spawn(cmd)
+
+        for line in self.process:
+            line = line.strip()
+            if not line.startswith(PROGRESS_JSON_PREFIX):
+                if line:
+                    on_log(line)
+                continue
+
+            try:
+                data = json.loads(line[len(PROGRESS_JSON_PREFIX):])
+            except ValueError:
+                on_log(line)
+                continue
+            progress = data.get('progress') or {}
+            postprocessor = progress.get('postprocessor')
+            self.downloading = not postprocessor and progress.get('status') == 'downloading'
+            if self.downloading:
+                self._apply_rate_limit()
+            if postprocessor:
+                info = data.get('info') or {}
+                if postprocessor == 'MoveFiles':
+                    # Runs last; its input is the final file
+                    self.video_key, self.filepath = info_video_key(info), info.get('filepath')
+                elif progress.get('status') == 'started':
+                    on_progress(postprocess_event(postprocessor))
+            else:
+                event = progress_event(progress, data.get('info') or {})
+                on_log(f"[download] {event['text']}")
+                on_progress(event)
+
+        self.returncode = self.process.wait()
+        return self.returncode == 0
+
+    def set_rate_limit(self, rate_limit):
+        """Set the download rate limit in bytes/s (None for unlimited).
+
+        A yt-dlp process cannot change its --limit-rate, so a download whose
+        share changes a lot is stopped and started again with the new limit.
+        Post-processing is never interrupted.
+        """
+        self.rate_limit = rate_limit
+        if self.downloading:
+            self._apply_rate_limit()
+
+    def set_concurrent_fragments(self, count):
+        """Set how many DASH/HLS fragments are fetched at once by downloads started afterwards"""
+        self.concurrent_fragments = count
+
+    def _apply_rate_limit(self):
+        previous, current = self.process_rate_limit, self.rate_limit
+        if previous == current or self.restart_requested:
+            return
+        if previous and current and max(previous, current) / min(previous, current) < RATE_LIMIT_RESTART_RATIO:
+            return
+        process = self.process
+        if process and process.poll() is None:
+            self.restart_requested = True
+            process.terminate()
+
+    def cancel(self):
+        """Terminate the running yt-dlp process and its children; returns at once"""
+        self.cancelled = True
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+
+class InProcessEngine:
+    """Drives yt_dlp.YoutubeDL inside this interpreter and reports through its hooks"""
+
+    name = "in-process"
+
+    def __init__(self):
+        self.yt_dlp = importlib.import_module('yt_dlp')
+        self.cancelled = threading.Event()
+        self.rate_limit = None
+        self.concurrent_fragments = 1
+        self.video_key = None  # 'extractor:id' and final path of the last downloaded video
+        self.filepath = None
+        self.returncode = None  # Exit status of the last download
+        self.ydl = None  # YoutubeDL of the running download
+
+    @staticmethod
+    def is_available():
+        """Check for the yt_dlp module without importing it"""
+        return importlib.util.find_spec('yt_dlp') is not None
+
+    @staticmethod
+    def locate():
+        """Return the path of the yt_dlp package without importing it, or None"""
+        spec = importlib.util.find_spec('yt_dlp')
+        return spec.origin if spec else None
+
+    def version(self):
+        """Return the yt-dlp version string"""
+        return self.yt_dlp.version.__version__
+
+    def _youtube_dl(self, params):
+        """Create a YoutubeDL that stops at its next HTTP request once the engine is cancelled.
+
+        Extractors make every request through urlopen, so extractions end
+        with DownloadCancelled just like downloads do in the progress hook.
+        """
+        ydl = self.yt_dlp.YoutubeDL(params)
+        urlopen = ydl.urlopen
+
+        def checked_urlopen(req):
+            if self.cancelled.is_set():
+                raise self.yt_dlp.utils.DownloadCancelled("Cancelled by user")
+            return urlopen(req)
+
+        ydl.urlopen = checked_urlopen
+        return ydl
+
+    def extract_info(self, url):
+        """Return the info dict for a URL, in the same shape as yt-dlp -j"""
+        params = {'quiet': True, 'no_warnings': True, 'skip_download': True, 'noplaylist': True}
+        try:
+            with self._youtube_dl(params) as ydl:
+                return ydl.sanitize_info(ydl.extract_info(url, download=False))
+        except self.yt_dlp.utils.YoutubeDLError as e:
+            raise EngineError(str(e))
+
+    def iter_playlist(self, url):
+        """Yield flat playlist entries as the extractor pages through them"""
+        params = {'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist', 'lazy_playlist': True}
+        try:
+            with self._youtube_dl(params) as ydl:
+                result = ydl.extract_info(url, download=False, process=False)
+                if result.get('_type') not in ('playlist', 'multi_video'):
+                    yield ydl.sanitize_info(result)
+                    return
+                for entry in result.get('entries') or []:
+                    if self.cancelled.is_set():
+                        return
+                    if entry:
+                        entry = dict(entry, playlist_title=result.get('title'))
+                        yield ydl.sanitize_info(entry)
+        except self.yt_dlp.utils.YoutubeDLError as e:
+            raise EngineError(str(e))
+
+    def list_formats(self, url):
+        """Return the lines of the format table for a URL"""
+        params = {'quiet': True, 'no_warnings': True, 'skip_download': True}
+        try:
+            with self._youtube_dl(params) as ydl:
+                info = ydl.extract_info(url, download=False)
+                return ydl.render_formats_table(info).splitlines()
+        except self.yt_dlp.utils.YoutubeDLError as e:
+            raise EngineError(str(e))
+
+    def build_params(self, options):
+        """Translate download options into YoutubeDL parameters"""
+        params = {
+            'format': options['format'],
+            'outtmpl': options['outtmpl'],
+            'noprogress': True,
+        }
+        stage = options.get('stage')
+        if stage == 'download':
+            # Without ffmpeg yt-dlp warns and keeps the streams as separate files
+            params.update(ffmpeg_location=NO_FFMPEG_LOCATION, ignoreerrors='only_download', fixup='never',
+                          postprocessors=[])
+            return params
+        if stage == 'postprocess':
+            # The streams were downloaded by the previous stage, so fix them up anyway
+            params['fixup'] = 'force'
+        postprocessors = []
+        if options['extract_audio']:
+            postprocessors.append({'key': 'FFmpegExtractAudio', 'preferredcodec': options['audio_format']})
+        if options['embed_subs']:
+            params['writesubtitles'] = True
+            params['subtitleslangs'] = options['sub_langs']
+            postprocessors.append({'key': 'FFmpegEmbedSubtitle', 'already_have_subtitle': False})
+        if options['embed_metadata']:
+            postprocessors.append({'key': 'FFmpegMetadata', 'add_metadata': True, 'add_chapters': True})
+        if options['embed_thumbnail']:
+            params['writethumbnail'] = True
+            postprocessors.append({'key': 'EmbedThumbnail', 'already_have_thumbnail': False})
+        params['postprocessors'] = postprocessors
+        return params
+
+    def download(self, url, options, on_progress, on_log, info=None):
+        """Run a download, reporting log lines and progress; returns True on success.
+
+        An already extracted info dict is processed directly instead of
+        extracting the URL again; if that fails the URL is extracted after all.
+        """
+        self.cancelled.clear()
+
+        def progress_hook(d):
+            if self.cancelled.is_set():
+                raise self.yt_dlp.utils.DownloadCancelled("Download cancelled by user")
+            on_progress(progress_event(d, d.get('info_dict') or {}))
+
+        reported = []
+
+        def postprocessor_hook(d):
+            # yt-dlp can register the hook twice on a postprocessor; both calls get the same dict
+            if reported and reported[-1] is d:
+                return
+            reported[:] = [d]
+            if d.get('postprocessor') == 'MoveFiles':
+                # Runs last; its input is the final file
+                info = d.get('info_dict') or {}
+                self.video_key, self.filepath = info_video_key(info), info.get('filepath')
+            elif d.get('status') == 'started':
+                on_log(f"[{d.get('postprocessor')}] Post-processing...")
+                on_progress(postprocess_event(d.get('postprocessor')))
+
+        params = self.build_params(options)
+        params['logger'] = _EngineLogger(on_log)
+        params['progress_hooks'] = [progress_hook]
+        params['postprocessor_hooks'] = [postprocessor_hook]
+        params['ratelimit'] = self.rate_limit
+        params['concurrent_fragment_downloads'] = self.concurrent_fragments
+
+        try:
+            with self._youtube_dl(params) as ydl:
+                self.ydl = ydl
+                if info:
+                    try:
+                        # Like --load-info-json: drop the formats selected when the info was
+                        # extracted, or yt-dlp would download those instead of options['format']
+                        ydl.process_ie_result(ydl.sanitize_info(info, remove_private_keys=True), download=True)
+                        self.returncode = ydl._download_retcode
+                        if self.returncode == 0 or not params.get('ignoreerrors'):
+                            return self.returncode == 0
+                        # The download stage only reports errors instead of raising them
+                        on_log("WARNING: Stored info failed to download; retrying with URL")
+                        ydl._download_retcode = 0
+                    except self.yt_dlp.utils.DownloadError as e:
+                        # Format URLs in the info may have expired; extract again
+                        on_log(f"WARNING: Stored info failed to download ({e}); retrying with URL")
+                self.returncode = ydl.download([url])
+                return self.returncode == 0
+        except self.yt_dlp.utils.DownloadCancelled:
+            self.returncode = 1
+            return False
+        except self.yt_dlp.utils.YoutubeDLError as e:
+            on_log(str(e))
+            self.returncode = 1
+            return False
+        finally:
+            self.ydl = None
+
+    def set_rate_limit(self, rate_limit):
+        """Set the download rate limit in bytes/s (None for unlimited).
+
+        The downloaders share the params dict of the YoutubeDL and read
+        'ratelimit' on every throttling check, so this applies at once.
+        """
+        self.rate_limit = rate_limit
+        ydl = self.ydl
+        if ydl is not None:
+            ydl.params['ratelimit'] = rate_limit
+
+    def set_concurrent_fragments(self, count):
+        """Set how many DASH/HLS fragments are fetched at once.
+
+        The fragment downloader reads the setting when a stream starts, so
+        a change applies from the next stream of a running download.
+        """
+        self.concurrent_fragments = count
+        ydl = self.ydl
+        if ydl is not None:
+            ydl.params['concurrent_fragment_downloads'] = count
+
+    def cancel(self):
+        """Ask the running download, extraction or enumeration to stop at its next tick or request"""
+        self.cancelled.set()
+
+
+# Per-stream progress fields reported by DownloadJob.to_dict()
+STREAM_FIELDS = ('kind', 'status', 'downloaded_bytes', 'total_bytes', 'speed', 'eta',
+                 'fragment_index', 'fragment_count')
+
+
+class DownloadJob:
+    """One queued download with its own engine, progress and status"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url, options, title=None, engine_factory=SubprocessEngine, info=None, key=None,
+                 weight=1.0):
+        self.id = next(self._ids)
+        self.key = key or uuid.uuid4().hex  # Identifies the job in the journal across runs
+        self.url = url
+        self.host = url_host(url)
+        self.weight = weight  # Relative share of the bandwidth budget
+        self.options = options
+        self.info = info  # Already extracted info dict, reused by the engine
+        self.title = title or url
+        self.engine_factory = engine_factory
+        self.engine = None
+        self.status = "queued"  # queued, running, finished, failed, cancelled
+        self.progress = 0.0
+        self.progress_text = "Queued"
+        self.last_event = {}  # Latest structured progress event from the engine
+        self.streams = {}  # Format id -> latest progress event of that stream
+        self.fragment_errors = 0  # Throttling and fragment errors since the last finished stream
+        self.filepath = None  # Final file, once finished
+        self.error = None
+        self.returncode = None  # Exit status of the engine
+        self.cancelled = threading.Event()
+        self.stages = []  # Finished stages: {"stage", "seconds", "bytes", "status"}
+        self.stage_starts = {}  # Stream -> perf_counter() of its first progress event
+        self.postprocessor = None  # (name, start) of the running postprocessor
+        self.started_at = None
+        self.queued_at = None  # perf_counter() when the job last entered a queue
+        self.stage = None  # 'download' or 'postprocess' while a worker runs the job
+
+    @property
+    def is_active(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def downloaded_bytes(self):
+        """Bytes downloaded so far over all streams"""
+        return sum(event.get('downloaded_bytes') or 0 for event in list(self.streams.values()))
+
+    @property
+    def total_bytes(self):
+        """Total size of the streams seen so far, or None while any size is unknown"""
+        totals = [event.get('total_bytes') for event in list(self.streams.values())]
+        return sum(totals) if totals and all(totals) else None
+
+    @property
+    def speed(self):
+        """Current download speed over all streams in bytes per second"""
+        return sum(event.get('speed') or 0 for event in list(self.streams.values())
+                   if event.get('status') == 'downloading')
+
+    def add_stage(self, name, seconds, num_bytes=None, status="ok"):
+        """Record a finished stage of the job, e.g. 'resolve', 'download.video' or 'postprocess.Merger'"""
+        self.stages.append({"stage": name, "seconds": round(seconds, 4), "bytes": num_bytes, "status": status})
+
+    def _track_stages(self, event):
+        now = time.perf_counter()
+        stream = event.get('stream')
+        if stream is not None and self.stage == 'postprocess':
+            pass  # Streams the download stage left on disk, reported as already downloaded
+        elif stream is not None:
+            start = self.stage_starts.setdefault(stream, now)
+            if event.get('status') == 'finished':
+                del self.stage_starts[stream]
+                self.add_stage(f"download.{event.get('kind') or 'video'}", now - start,
+                               event.get('downloaded_bytes'))
+        elif event.get('status') == 'postprocessing':
+            self._end_postprocessor(now, "ok")
+            self.postprocessor = (event['postprocessor'], now)
+
+    def _end_postprocessor(self, now, status):
+        if self.postprocessor:
+            name, start = self.postprocessor
+            self.postprocessor = None
+            self.add_stage(f"postprocess.{name}", now - start, status=status)
+
+    def finish_stages(self):
+        """Close the stages still open when the job ended and add the 'job' total"""
+        now = time.perf_counter()
+        status = "ok" if self.status == "finished" else self.status
+        self._end_postprocessor(now, status)
+        for stream, start in list(self.stage_starts.items()):
+            event = self.streams.get(stream) or {}
+            self.add_stage(f"download.{event.get('kind') or 'video'}", now - start,
+                           event.get('downloaded_bytes'), status)
+        self.stage_starts.clear()
+        if self.started_at is not None:
+            self.add_stage("job", now - self.started_at, self.downloaded_bytes, status)
+
+    def summary(self):
+        """Return the per-stage record of a job that has ended"""
+        return {
+            "job": self.id,
+            "url": self.url,
+            "title": self.title,
+            "status": self.status,
+            "exit_code": self.returncode,
+            "error": self.error,
+            "filepath": self.filepath,
+            "stages": list(self.stages),
+        }
+
+    def update_progress(self, event):
+        """Apply a progress event reported by the engine"""
+        self.last_event = event
+        self.progress_text = event.get('text', '')
+        self._track_stages(event)
+        if event.get('stream') is not None:
+            self.streams[event['stream']] = event
+            total = self.total_bytes
+            if total:
+                self.progress = self.downloaded_bytes / total
+                return
+        if event.get('percent') is not None:
+            self.progress = event['percent']
+
+    def cancel(self):
+        """Stop the job whether it is still queued or already running"""
+        self.cancelled.set()
+        engine = self.engine
+        if engine:
+            engine.cancel()
+
+    def to_dict(self):
+        """Return a JSON-serialisable snapshot of the job"""
+        return {
+            "job": self.id,
+            "url": self.url,
+            "title": self.title,
+            "status": self.status,
+            "progress": self.progress,
+            "text": self.progress_text,
+            "error": self.error,
+            "exit_code": self.returncode,
+            "downloaded_bytes": self.downloaded_bytes,
+            "total_bytes": self.total_bytes,
+            "speed": self.speed,
+            "filepath": self.filepath,
+            "stage": self.stage,
+            "stages": list(self.stages),
+            "streams": {
+                stream: {key: event.get(key) for key in STREAM_FIELDS}
+                for stream, event in list(self.streams.items())
+            },
+        }
+
+
+class DownloadQueue:
+    """Runs download jobs on a bounded pool of worker threads.
+
+    Each stage runs on its own ThreadPoolExecutor with as many threads
+    as its worker limit, so every job counted as running has a thread.
+    Raising a limit replaces the pool of that stage with a larger one;
+    lowering it keeps the pool and only starts fewer jobs.
+
+    With postprocess_workers > 0 a job runs as a two-stage pipeline: a
+    download worker fetches the raw streams and moves on to the next job,
+    while merging, audio extraction and embedding run on a separate pool
+    of postprocess_workers. With 0 one yt-dlp run does both in the slot.
+
+    Callbacks are invoked from worker threads: on_update(job) whenever a
+    job changes state or progress, on_log(job, line) for engine output.
+    Progress events are dicts with 'status', 'percent' (0..1 or None) and
+    'text'. Download events also carry 'stream' (the format id), 'kind'
+    ('video' or 'audio'), 'downloaded_bytes', 'total_bytes', 'speed', 'eta',
+    'fragment_index' and 'fragment_count'; the job aggregates its streams.
+    """
+
+    def __init__(self, max_workers=DEFAULT_PARALLEL_DOWNLOADS, on_update=None, on_log=None, journal=None,
+                 governor=None, fragment_tuner=None, archive=None, timings=None, postprocess_workers=0,
+                 subtitles=None):
+        self.max_workers = max_workers
+        self.postprocess_workers = postprocess_workers
+        self.timings = timings or Timings()  # Stages of every job that ended, for metrics
+        self.on_update = on_update or (lambda job: None)
+        self.journal = journal
+        self.archive = archive  # Finished downloads are recorded here
+        self.governor = governor or BandwidthGovernor()
+        self.fragment_tuner = fragment_tuner  # None downloads one fragment at a time
+        self.subtitles = subtitles  # SubtitleFetcher; None lets yt-dlp fetch subtitles itself
+        self.on_log = on_log or (lambda job, line: None)
+        self.jobs = {}
+        self.pending = deque()
+        self.running = 0
+        self.postprocess_pending = deque()  # Jobs whose streams are downloaded
+        self.postprocessing = 0
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.pools = {}  # Stage -> (ThreadPoolExecutor, number of threads)
+
+    def submit(self, job):
+        """Queue a job and start it as soon as a worker slot is free"""
+        with self.lock:
+            self.jobs[job.id] = job
+            job.queued_at = time.perf_counter()
+            self.pending.append(job)
+        self._changed(job)
+        self._dispatch()
+        return job
+
+    def set_max_workers(self, max_workers):
+        """Change the number of parallel workers; extra jobs start immediately"""
+        with self.lock:
+            self.max_workers = max(1, int(max_workers))
+        self._dispatch()
+
+    def set_postprocess_workers(self, postprocess_workers):
+        """Change the size of the post-processing pool; 0 stops pipelining jobs started afterwards"""
+        with self.lock:
+            self.postprocess_workers = max(0, int(postprocess_workers))
+        self._dispatch_postprocess()
+
+    def set_rate_limit(self, rate_limit):
+        """Change the global bandwidth budget in bytes/s (None for unlimited)"""
+        self.governor.limit = rate_limit
+        self._rebalance()
+
+    def set_fragment_tuner(self, fragment_tuner):
+        """Enable (with a FragmentTuner) or disable concurrent fragments for jobs started afterwards"""
+        self.fragment_tuner = fragment_tuner
+
+    def set_subtitle_fetcher(self, subtitles):
+        """Fetch subtitles with a SubtitleFetcher, or let yt-dlp fetch them with None"""
+        self.subtitles = subtitles
+
+    def set_max_per_host(self, max_per_host):
+        """Change how many jobs may download from one host at the same time"""
+        self.governor.max_per_host = max(1, int(max_per_host))
+        self._dispatch()
+
+    def cancel(self, job_id):
+        """Cancel one job by id"""
+        job = self.jobs.get(job_id)
+        if job and job.is_active:
+            job.cancel()
+            waiting = False
+            with self.lock:
+                if job in self.pending:
+                    self.pending.remove(job)
+                    job.status = "cancelled"
+                    job.progress_text = "Cancelled"
+                elif job in self.postprocess_pending:
+                    self.postprocess_pending.remove(job)
+                    waiting = True
+            if waiting:
+                self._finish(job, False)
+            self._changed(job)
+            with self.idle:
+                self.idle.notify_all()
+
+    def cancel_all(self):
+        """Cancel every queued and running job"""
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    def active_jobs(self):
+        return [job for job in self.jobs.values() if job.is_active]
+
+    def throughput(self):
+        """Combined download speed of all running jobs in bytes per second"""
+        return sum(job.speed for job in list(self.jobs.values()) if job.status == "running")
+
+    def pipeline(self):
+        """Return the queue depth, busy workers and pool size of every stage"""
+        with self.lock:
+            return {
+                "download": {"queued": len(self.pending), "active": self.running, "workers": self.max_workers},
+                "postprocess": {"queued": len(self.postprocess_pending), "active": self.postprocessing,
+                                "workers": self.postprocess_workers},
+            }
+
+    def prometheus(self, metric="ytdl"):
+        """Render the queue state and the stage timings of ended jobs in the Prometheus text format"""
+        with self.lock:
+            jobs = list(self.jobs.values())
+            max_workers = self.max_workers
+        pipeline = self.pipeline()
+        lines = [f"# HELP {metric}_jobs Jobs in the queue by status", f"# TYPE {metric}_jobs gauge"]
+        for status in ("queued", "running", "finished", "failed", "cancelled"):
+            lines.append(f'{metric}_jobs{{status="{status}"}} {sum(job.status == status for job in jobs)}')
+        lines += [f"# HELP {metric}_workers Maximum number of parallel downloads",
+                  f"# TYPE {metric}_workers gauge",
+                  f"{metric}_workers {max_workers}",
+                  f"# HELP {metric}_download_speed_bytes Combined speed of the running downloads",
+                  f"# TYPE {metric}_download_speed_bytes gauge",
+                  f"{metric}_download_speed_bytes {self.throughput():.0f}"]
+        for suffix, key, help_text in (("queue_depth", "queued", "Jobs waiting for a worker of each stage"),
+                                       ("active", "active", "Jobs being worked on by each stage")):
+            lines += [f"# HELP {metric}_pipeline_{suffix} {help_text}",
+                      f"# TYPE {metric}_pipeline_{suffix} gauge"]
+            lines += [f'{metric}_pipeline_{suffix}{{stage="{stage}"}} {counts[key]}'
+                      for stage, counts in pipeline.items()]
+        return "\n".join(lines) + "\n" + self.timings.prometheus(f"{metric}_stage")
+
+    def _is_idle(self):
+        return not (self.running or self.pending or self.postprocessing or self.postprocess_pending)
+
+    def is_idle(self):
+        with self.lock:
+            return self._is_idle()
+
+    def wait(self, timeout=None):
+        """Block until no job is queued or running; returns False on timeout"""
+        with self.idle:
+            return self.idle.wait_for(self._is_idle, timeout)
+
+    def remove_finished(self, job_ids=None):
+        """Forget jobs that are no longer queued or running, or only those of job_ids; returns their ids"""
+        with self.lock:
+            done = [job_id for job_id, job in self.jobs.items()
+                    if not job.is_active and (job_ids is None or job_id in job_ids)]
+            for job_id in done:
+                del self.jobs[job_id]
+        return done
+
+    def _changed(self, job):
+        if self.journal:
+            self.journal.record(job)
+        self.on_update(job)
+
+    def _rebalance(self):
+        """Hand every running job its current share of the bandwidth budget"""
+        for job in list(self.jobs.values()):
+            engine = job.engine
+            if engine is not None:
+                engine.set_rate_limit(self.governor.share(job))
+
+    def _dispatch(self):
+        with self.lock:
+            to_start = []
+            # Jobs whose host is at its cap wait without blocking jobs behind them
+            for job in list(self.pending):
+                if self.running >= self.max_workers:
+                    break
+                if self.governor.admit(job):
+                    self.pending.remove(job)
+                    to_start.append(job)
+                    self.running += 1
+            pool = self._pool('download', self.max_workers) if to_start else None
+        for job in to_start:
+            pool.submit(self._run, job)
+        if to_start:
+            self._rebalance()
+
+    def _dispatch_postprocess(self):
+        with self.lock:
+            to_start = []
+            # Jobs split before the pool was turned off still get one worker
+            while self.postprocess_pending and self.postprocessing < (self.postprocess_workers or 1):
+                to_start.append(self.postprocess_pending.popleft())
+                self.postprocessing += 1
+            pool = self._pool('postprocess', self.postprocess_workers or 1) if to_start else None
+        for job in to_start:
+            pool.submit(self._postprocess, job)
+
+    def _pool(self, stage, size):
+        """Return the executor of a stage with at least size threads (called with the lock held)"""
+        pool, threads = self.pools.get(stage, (None, 0))
+        if threads < size:
+            if pool is not None:
+                # Its running jobs finish, then its threads exit
+                pool.shutdown(wait=False)
+            pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix=stage)
+            self.pools[stage] = (pool, size)
+        return pool
+
+    def _callbacks(self, job, tuner):
+        """Return the on_progress and on_log callbacks handed to a job's engine"""
+        def on_progress(event):
+            previous = job.streams.get(event.get('stream'))
+            job.update_progress(event)
+            if (tuner and event.get('status') == 'finished' and event.get('elapsed')
+                    and previous and previous.get('status') == 'downloading' and previous.get('fragment_count')):
+                engine = job.engine
+                level = tuner.record(job.host, engine.concurrent_fragments,
+                                     event.get('downloaded_bytes') or 0, event['elapsed'], job.fragment_errors)
+                job.fragment_errors = 0
+                engine.set_concurrent_fragments(level)
+            self._changed(job)
+
+        def on_log(line):
+            if FRAGMENT_ERROR_RE.search(line):
+                job.fragment_errors += 1
+            self.on_log(job, line)
+
+        return on_progress, on_log
+
+    def _run(self, job):
+        tuner = self.fragment_tuner
+        pipelined = self.postprocess_workers > 0
+        ok = False
+        error = None
+        handed_over = False
+        try:
+            if not job.cancelled.is_set():
+                engine = job.engine_factory()
+                engine.set_rate_limit(self.governor.share(job))
+                if tuner:
+                    engine.set_concurrent_fragments(tuner.level(job.host))
+                job.engine = engine
+                job.started_at = time.perf_counter()
+                job.add_stage("wait.download", job.started_at - job.queued_at)
+                job.stage = "download"
+                job.status = "running"
+                job.progress_text = "Starting download..."
+                self._changed(job)
+                # cancel() may have raced with the engine being created
+                if job.cancelled.is_set():
+                    job.engine.cancel()
+                on_progress, on_log = self._callbacks(job, tuner)
+                if pipelined:
+                    info, options = job.info, stage_options(job.options, 'download')
+                else:
+                    info, options = self._prepare_subtitles(job, on_log)
+                ok = job.engine.download(job.url, options, on_progress, on_log, info=info)
+                handed_over = ok and pipelined and not job.cancelled.is_set()
+        except Exception as e:
+            error = str(e)
+        finally:
+            if handed_over:
+                job.engine = None
+                job.stage = None
+                job.progress_text = "Waiting for post-processing..."
+            else:
+                self._finish(job, ok, error)
+            with self.lock:
+                self.running -= 1
+                self.governor.release(job)
+                if handed_over:
+                    job.queued_at = time.perf_counter()
+                    self.postprocess_pending.append(job)
+            self._changed(job)
+            self._rebalance()
+            self._dispatch()
+            self._dispatch_postprocess()
+            with self.idle:
+                self.idle.notify_all()
+
+    def _postprocess(self, job):
+        ok = False
+        error = None
+        try:
+            if not job.cancelled.is_set():
+                job.add_stage("wait.postprocess", time.perf_counter() - job.queued_at)
+                job.engine = job.engine_factory()
+                job.stage = "postprocess"
+                job.progress_text = "Post-processing..."
+                self._changed(job)
+                if job.cancelled.is_set():
+                    job.engine.cancel()
+                on_progress, on_log = self._callbacks(job, None)
+                info, options = self._prepare_subtitles(job, on_log)
+                ok = job.engine.download(job.url, stage_options(options, 'postprocess'),
+                                         on_progress, on_log, info=info)
+        except Exception as e:
+            error = str(e)
+        finally:
+            self._finish(job, ok, error)
+            with self.lock:
+                self.postprocessing -= 1
+            self._changed(job)
+            self._dispatch_postprocess()
+            with self.idle:
+                self.idle.notify_all()
+
+    def _prepare_subtitles(self, job, on_log):
+        """Return the info and options to download a job with, fetching its subtitles first.
+
+        Only the stage that embeds subtitles needs them, so a pipelined job
+        fetches them on the post-processing pool while other jobs download.
+        """
+        if not (self.subtitles and job.info and job.options['embed_subs']):
+            return job.info, job.options
+        started = time.perf_counter()
+        info, languages, num_bytes = self.subtitles.prepare(job.info, job.options['sub_langs'], on_log)
+        job.add_stage("subtitles", time.perf_counter() - started, num_bytes)
+        return info, dict(job.options, sub_langs=languages, embed_subs=bool(languages))
+
+    def _finish(self, job, ok, error=None):
+        """Settle the status of a job that ended and record its stages"""
+        if ok and error is None and not job.cancelled.is_set():
+            try:
+                job.filepath = job.engine.filepath
+                if self.archive:
+                    self.archive.add(job.engine.video_key or canonical_video_key(job.url), job.options,
+                                     job.filepath, job.url)
+            except Exception as e:
+                error = str(e)
+
+        if error is not None:
+            job.status = "failed"
+            job.error = error
+            job.progress_text = f"Error: {error}"
+        elif job.cancelled.is_set():
+            job.status = "cancelled"
+            job.progress_text = "Cancelled"
+        elif ok:
+            job.status = "finished"
+            job.progress = 1.0
+            job.progress_text = "Completed"
+        else:
+            job.status = "failed"
+            job.progress_text = "Failed"
+
+        if job.engine is not None:
+            job.returncode = job.engine.returncode
+        job.engine = None
+        job.stage = None
+        job.finish_stages()
+        for stage in job.stages:
+            self.timings.record(stage['stage'], stage['seconds'], stage['bytes'] or 0,
+                                stage['status'] == "ok")
+
+
+class BandwidthGovernor:
+    """Splits a global bandwidth budget across running jobs.
+
+    Every running job gets limit * weight / (sum of running weights) as
+    its rate limit, and at most max_per_host jobs download from the same
+    host at a time. The queue asks again whenever a job starts or ends,
+    so the freed share goes to the jobs that are still running.
+    """
+
+    def __init__(self, limit=None, max_per_host=DEFAULT_MAX_PER_HOST):
+        self.limit = limit  # Bytes/s for all jobs together, None for unlimited
+        self.max_per_host = max_per_host
+        self.lock = threading.Lock()
+        self.running = {}  # Job -> weight
+        self.hosts = {}  # Host -> number of running jobs
+
+    def admit(self, job):
+        """Reserve a slot for a job unless its host is at the cap; returns True if admitted"""
+        with self.lock:
+            if self.hosts.get(job.host, 0) >= self.max_per_host:
+                return False
+            self.hosts[job.host] = self.hosts.get(job.host, 0) + 1
+            self.running[job] = max(job.weight, 0.01)
+            return True
+
+    def release(self, job):
+        """Give back the slot of a job that stopped"""
+        with self.lock:
+            if self.running.pop(job, None) is not None:
+                self.hosts[job.host] -= 1
+                if not self.hosts[job.host]:
+                    del self.hosts[job.host]
+
+    def share(self, job):
+        """Return the rate limit of a job in bytes/s, or None when unlimited"""
+        with self.lock:
+            if not self.limit or job not in self.running:
+                return None
+            return max(1, int(self.limit * self.running[job] / sum(self.running.values())))
+
+
+class FragmentTuner:
+    """Picks the number of concurrent fragment downloads per host by hill climbing.
+
+    After every fragmented stream the measured throughput is stored for
+    the level that was used. The next stream or job climbs one level
+    while the climb paid off by FRAGMENT_GAIN_THRESHOLD, goes back when
+    the current level is no better than the one below, and steps down on
+    HTTP 429 or fragment errors, treating that level as a ceiling until
+    levels above are probed again. Levels are kept on disk per host, so
+    the next job starts at the setting that worked last time.
+
+    With a fixed count the tuner always answers that count.
+    """
+
+    def __init__(self, path=None, fixed=None):
+        self.path = Path(path) if path else app_cache_dir() / 'fragment_levels.json'
+        self.fixed = fixed
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.hosts = json.load(f)
+        except (OSError, ValueError):
+            self.hosts = {}
+
+    def level(self, host):
+        """Return the number of concurrent fragments to start a download from host with"""
+        if self.fixed:
+            return self.fixed
+        with self.lock:
+            return self.hosts.get(host, {}).get('level', DEFAULT_FRAGMENT_LEVEL)
+
+    def record(self, host, level, num_bytes, seconds, errors=0):
+        """Record one fragmented stream downloaded at level; returns the level to use next"""
+        if self.fixed:
+            return self.fixed
+
+        with self.lock:
+            state = self.hosts.setdefault(host, {"level": level, "rates": {}, "ceiling": None, "streams": 0})
+            rates = state['rates']
+            index = max(i for i, value in enumerate(FRAGMENT_LEVELS) if value <= max(level, 1))
+            down = FRAGMENT_LEVELS[index - 1] if index > 0 else None
+            up = FRAGMENT_LEVELS[index + 1] if index + 1 < len(FRAGMENT_LEVELS) else None
+
+            state['streams'] += 1
+            if state['streams'] % FRAGMENT_REPROBE_INTERVAL == 0:
+                # Conditions change; forget what was learned above the current level
+                state['ceiling'] = None
+                for value in FRAGMENT_LEVELS[index + 1:]:
+                    rates.pop(str(value), None)
+
+            if errors:
+                state['ceiling'] = FRAGMENT_LEVELS[index]
+                state['level'] = down or FRAGMENT_LEVELS[0]
+            elif seconds > 0:
+                rate = num_bytes / seconds
+                previous = rates.get(str(FRAGMENT_LEVELS[index]))
+                rates[str(FRAGMENT_LEVELS[index])] = rate if previous is None else (previous + rate) / 2
+                rate = rates[str(FRAGMENT_LEVELS[index])]
+                if down and str(down) in rates and rate < rates[str(down)] * FRAGMENT_GAIN_THRESHOLD:
+                    state['level'] = down
+                elif (up and (not state['ceiling'] or up < state['ceiling'])
+                        and (str(up) not in rates or rates[str(up)] >= rate * FRAGMENT_GAIN_THRESHOLD)):
+                    state['level'] = up
+                else:
+                    state['level'] = FRAGMENT_LEVELS[index]
+            self._save()
+            return state['level']
+
+    def _save(self):
+        try:
+            write_file_atomic(self.path, json.dumps(self.hosts))
+        except OSError:
+            pass  # Tuning starts from the default next time
+
+
+class DownloadArchive:
+    """Persistent index of finished downloads in SQLite.
+
+    Downloads are keyed by video key ('extractor:id'), download type and
+    format ID, so a video can be looked up before anything is extracted
+    and every URL form of it matches. URLs whose key is only known after
+    extraction (non-YouTube sites) are remembered as aliases.
+
+    With verify_files, an entry whose output file no longer exists is
+    dropped on lookup so the video is downloaded again.
+    """
+
+    def __init__(self, path=None, verify_files=False):
+        self.path = Path(path) if path else app_cache_dir() / 'archive.db'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.verify_files = verify_files
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS downloads ('
+            ' video TEXT NOT NULL, type TEXT NOT NULL, format TEXT NOT NULL, output TEXT, time REAL NOT NULL,'
+            ' PRIMARY KEY (video, type, format)) WITHOUT ROWID'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, video TEXT NOT NULL) WITHOUT ROWID'
+        )
+
+    def _video_key(self, key):
+        if '://' not in key:
+            return key
+        key = canonical_video_key(key)
+        if key.startswith('url:'):
+            row = self.connection.execute('SELECT video FROM urls WHERE url = ?', (key,)).fetchone()
+            return row[0] if row else None
+        return key
+
+    def find(self, key, download_type, format_id=None):
+        """Return (format_id, output) of an archived download, or None.
+
+        key is a video key or a URL; without format_id any format of the
+        download type matches.
+        """
+        with self.lock:
+            if self.connection is None:
+                return None
+            video = self._video_key(key)
+            if video is None:
+                return None
+            if format_id is None:
+                rows = self.connection.execute(
+                    'SELECT format, output FROM downloads WHERE video = ? AND type = ?', (video, download_type)
+                ).fetchall()
+            else:
+                rows = self.connection.execute(
+                    'SELECT format, output FROM downloads WHERE video = ? AND type = ? AND format = ?',
+                    (video, download_type, format_id)
+                ).fetchall()
+
+            for format_found, output in rows:
+                if not self.verify_files or (output and os.path.exists(output)):
+                    return format_found, output
+                self.connection.execute('DELETE FROM downloads WHERE video = ? AND type = ? AND format = ?',
+                                        (video, download_type, format_found))
+            return None
+
+    def add(self, video_key, options, output=None, url=None):
+        """Record a finished download described by download_options()"""
+        with self.lock:
+            if self.connection is None:
+                return
+            try:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO downloads (video, type, format, output, time) VALUES (?, ?, ?, ?, ?)',
+                    (video_key, options.get('download_type') or 'video', options.get('format_id') or '',
+                     output, time.time())
+                )
+                url_key = canonical_video_key(url) if url else None
+                if url_key and url_key != video_key:
+                    self.connection.execute('INSERT OR REPLACE INTO urls (url, video) VALUES (?, ?)',
+                                            (url_key, video_key))
+            except sqlite3.Error:
+                pass  # Not being archived only costs a repeated download later
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+class JobJournal:
+    """Crash-safe, append-only record of download jobs in SQLite.
+
+    Every state change of a job, and its byte count at most every
+    JOURNAL_PROGRESS_INTERVAL seconds, is appended as a new row; the
+    newest row of a job is its current state. WAL mode keeps the appends
+    cheap and the file consistent when the process dies mid-write, so
+    jobs that were queued or running can be resumed on the next start.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else app_cache_dir() / 'journal.db'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.last = {}  # Job key -> (state, time) of its newest row
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' seq INTEGER PRIMARY KEY AUTOINCREMENT, job TEXT NOT NULL, time REAL NOT NULL,'
+            ' state TEXT NOT NULL, url TEXT NOT NULL, title TEXT, format TEXT, output TEXT,'
+            ' options TEXT NOT NULL, bytes_done INTEGER, total_bytes INTEGER)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_job ON entries (job, seq)')
+
+    def record(self, job):
+        """Append the current state of a job; progress-only updates are rate limited"""
+        now = time.time()
+        with self.lock:
+            if self.connection is None:
+                return
+            last = self.last.get(job.key)
+            if last and last[0] == job.status and now - last[1] < JOURNAL_PROGRESS_INTERVAL:
+                return
+            self.last[job.key] = (job.status, now)
+            try:
+                self.connection.execute(
+                    'INSERT INTO entries (job, time, state, url, title, format, output, options,'
+                    ' bytes_done, total_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (job.key, now, job.status, job.url, job.title, job.options.get('format'),
+                     job.filepath or job.options.get('outtmpl'), json.dumps(job.options), job.downloaded_bytes,
+                     job.total_bytes)
+                )
+            except sqlite3.Error:
+                pass  # A broken journal must not break the download itself
+
+    def unfinished(self):
+        """Return the newest entry of every job that was still queued or running"""
+        with self.lock:
+            if self.connection is None:
+                return []
+            rows = self.connection.execute(
+                'SELECT e.job, e.url, e.title, e.options, e.bytes_done, e.total_bytes FROM entries e'
+                ' JOIN (SELECT MAX(seq) AS seq FROM entries GROUP BY job) newest ON e.seq = newest.seq'
+                " WHERE e.state IN ('queued', 'running') ORDER BY e.seq"
+            ).fetchall()
+        return [
+            {"key": key, "url": url, "title": title, "options": json.loads(options),
+             "bytes_done": bytes_done, "total_bytes": total_bytes}
+            for key, url, title, options, bytes_done, total_bytes in rows
+        ]
+
+    def compact(self):
+        """Drop superseded rows and jobs that are over"""
+        with self.lock:
+            if self.connection is None:
+                return
+            self.connection.execute(
+                'DELETE FROM entries WHERE seq NOT IN (SELECT MAX(seq) FROM entries GROUP BY job)')
+            self.connection.execute("DELETE FROM entries WHERE state NOT IN ('queued', 'running')")
+
+    def close(self):
+        """Stop recording; later calls of every method do nothing"""
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+class EventCoalescer:
+    """Thread-safe mailbox between worker threads and a single UI consumer.
+
+    Workers post from any thread; the UI drains it periodically. Only the
+    latest progress update per key survives between two drains, log lines
+    are handed over as one batch and other calls run in posting order.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+        self.updates = {}
+        self.lines = []
+        self.posted = 0
+        self.coalesced = 0
+        self.drains = 0
+
+    def post_call(self, func):
+        """Run func on the consumer side at the next drain"""
+        with self.lock:
+            self.posted += 1
+            self.calls.append(func)
+
+    def post_update(self, key, value):
+        """Post a progress update, replacing any undrained update for the same key"""
+        with self.lock:
+            self.posted += 1
+            if key in self.updates:
+                self.coalesced += 1
+            self.updates[key] = value
+
+    def post_log(self, line, level=logging.INFO):
+        """Post a log line; all lines are delivered together as (level, line) pairs"""
+        with self.lock:
+            self.posted += 1
+            self.lines.append((level, line))
+
+    def drain(self):
+        """Take everything posted since the last drain: (calls, updates, lines)"""
+        with self.lock:
+            calls, updates, lines = self.calls, self.updates, self.lines
+            self.calls, self.updates, self.lines = [], {}, []
+            self.drains += 1
+        return calls, updates, lines
+
+    def stats(self):
+        """Return the posted/coalesced/drain counters"""
+        with self.lock:
+            return {"posted": self.posted, "coalesced": self.coalesced, "drains": self.drains}
+
+
+class Timings:
+    """Collects wall-clock durations of named operations"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Name -> {"count", "total", "last", "max"} in seconds, "bytes" and "failures"
+        self.samples = {}
+
+    @contextmanager
+    def measure(self, name):
+        """Time the body of a with-block under the given name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds, num_bytes=0, ok=True):
+        with self.lock:
+            sample = self.samples.setdefault(name, {"count": 0, "total": 0.0, "last": 0.0, "max": 0.0,
+                                                    "bytes": 0, "failures": 0})
+            sample["count"] += 1
+            sample["total"] += seconds
+            sample["last"] = seconds
+            sample["max"] = max(sample["max"], seconds)
+            sample["bytes"] += num_bytes
+            if not ok:
+                sample["failures"] += 1
+
+    def last(self, name):
+        """Return the most recent duration of an operation in seconds"""
+        with self.lock:
+            return self.samples.get(name, {}).get("last", 0.0)
+
+    def snapshot(self):
+        """Return a copy of all samples"""
+        with self.lock:
+            return {name: dict(sample) for name, sample in self.samples.items()}
+
+    def prometheus(self, metric):
+        """Render the samples in the Prometheus text format, one series per name"""
+        samples = self.snapshot()
+        lines = []
+        for suffix, kind, key, help_text in (
+                ("seconds", "summary", None, "Wall time of each stage"),
+                ("max_seconds", "gauge", "max", "Longest single run of each stage"),
+                ("bytes_total", "counter", "bytes", "Bytes transferred by each stage"),
+                ("failures_total", "counter", "failures", "Runs of each stage that did not succeed")):
+            lines.append(f"# HELP {metric}_{suffix} {help_text}")
+            lines.append(f"# TYPE {metric}_{suffix} {kind}")
+            for name, sample in sorted(samples.items()):
+                label = '{stage="%s"}' % name.replace('\\', '\\\\').replace('"', '\\"')
+                if key is None:
+                    lines.append(f"{metric}_{suffix}_sum{label} {sample['total']:.6f}")
+                    lines.append(f"{metric}_{suffix}_count{label} {sample['count']}")
+                else:
+                    lines.append(f"{metric}_{suffix}{label} {sample[key]}")
+        return "\n".join(lines) + "\n"
+
+
+class LogBuffer:
+    """Fixed-size in-memory log with an optional size-rotated file behind it.
+
+    The memory side keeps the last max_lines entries for display; the file
+    receives every entry regardless of level, so nothing is lost when old
+    lines fall out of the buffer.
+    """
+
+    def __init__(self, max_lines=LOG_BUFFER_LINES, path=None,
+                 max_bytes=LOG_FILE_MAX_BYTES, backups=LOG_FILE_BACKUPS):
+        self.entries = deque(maxlen=max_lines)
+        self.logger = None
+        if path:
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+            except OSError:
+                return
+            handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+            self.logger = logging.getLogger(f'yt_downloader.output.{id(self)}')
+            self.logger.setLevel(logging.DEBUG)
+            self.logger.propagate = False
+            self.logger.addHandler(handler)
+
+    @property
+    def max_lines(self):
+        return self.entries.maxlen
+
+    def append(self, entries):
+        """Record (level, message) pairs and return them as (level, display line)"""
+        timestamp = time.strftime("%H:%M:%S")
+        lines = [(level, f"[{timestamp}] {message}") for level, message in entries]
+        self.entries.extend(lines)
+        if self.logger:
+            for level, message in entries:
+                self.logger.log(level, message)
+        return lines
+
+    def lines(self, min_level=logging.NOTSET):
+        """Return buffered display lines at or above a level"""
+        return [line for level, line in self.entries if level >= min_level]
+
+
+class PlaylistResolver:
+    """Fully extracts flat playlist entries on demand, a few at a time.
+
+    Resolved info goes through the metadata cache, so an entry that was
+    already fetched (or re-selected later) does not hit the network again.
+    """
+
+    def __init__(self, cache, max_workers=PLAYLIST_RESOLVE_WORKERS):
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='resolve')
+
+    def resolve(self, entry, engine_factory, on_resolved, on_error):
+        """Extract one entry in the background and report the full info dict"""
+        def work():
+            url = playlist_entry_url(entry)
+            try:
+                info = self.cache.fetch(url, lambda url: engine_factory().extract_info(url))['info']
+                on_resolved(entry, info)
+            except Exception as e:
+                on_error(entry, e)
+
+        return self.executor.submit(work)
+
+    def shutdown(self):
+        """Drop the entries still waiting for a worker; running extractions finish"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def engine_class_for(mode):
+    """Return the engine class for a mode: 'auto', 'in-process' or 'subprocess'"""
+    if mode != "subprocess" and InProcessEngine.is_available():
+        return InProcessEngine
+    return SubprocessEngine
+
+
+def probe_ytdlp(engine_class, cache_path=None):
+    """Return (version, path) of the yt-dlp used by an engine class.
+
+    The result is remembered on disk together with the path and mtime of
+    the binary (or module), so later starts neither run nor import yt-dlp
+    until it is updated. Raises EngineError if yt-dlp is not installed.
+    """
+    cache_path = Path(cache_path) if cache_path else app_cache_dir() / 'ytdlp_version.json'
+    path = engine_class.locate()
+    if not path:
+        raise EngineError("yt-dlp not found")
+    mtime = os.stat(path).st_mtime
+
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+    entry = cached.get(engine_class.name) or {}
+    if entry.get('path') == path and entry.get('mtime') == mtime:
+        return entry['version'], path
+
+    version = engine_class().version()
+    cached[engine_class.name] = {"path": path, "mtime": mtime, "version": version}
+    try:
+        write_file_atomic(cache_path, json.dumps(cached))
+    except OSError:
+        pass  # Probing again next time is fine
+    return version, path
+
+
+class _EngineLogger:
+    """Forwards YoutubeDL log output to a line callback"""
+
+    def __init__(self, on_log):
+        self.on_log = on_log
+
+    def debug(self, msg):
+        # yt-dlp routes regular screen output through debug()
+        if not msg.startswith('[debug] '):
+            self.on_log(msg)
+
+    def info(self, msg):
+        self.on_log(msg)
+
+    def warning(self, msg):
+        self.on_log(f"WARNING: {msg}")
+
+    def error(self, msg):
+        self.on_log(msg)
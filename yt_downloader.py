@@ -1,21 +1,96 @@
 import customtkinter as ctk
-from PIL import Image, ImageTk
-import requests
-import subprocess
 import threading
-import json
 import os
-import sys
 from pathlib import Path
-import re
-from io import BytesIO
 import tkinter as tk
 from tkinter import messagebox, filedialog
 import time
+import logging
+import sqlite3
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from yt_core import (
+    DEFAULT_PARALLEL_DOWNLOADS,
+    DEFAULT_POSTPROCESS_WORKERS,
+    PROGRESS,
+    UI_DRAIN_INTERVAL_MS,
+    BandwidthGovernor,
+    EngineError,
+    EventCoalescer,
+    FormatPolicy,
+    LogBuffer,
+    Timings,
+    InProcessEngine,
+    DownloadArchive,
+    DownloadJob,
+    DownloadQueue,
+    FragmentTuner,
+    JobJournal,
+    MetadataCache,
+    PlaylistResolver,
+    app_cache_dir,
+    download_options,
+    engine_class_for,
+    entry_video_key,
+    format_bytes,
+    format_duration,
+    formats_from_info,
+    info_video_key,
+    is_playlist_url,
+    is_video_url,
+    log_level_for,
+    parse_format_lines,
+    parse_rate,
+    playlist_entry_url,
+    probe_ytdlp,
+    write_file_atomic,
+)
 
 # Set appearance mode and color theme
 ctk.set_appearance_mode("dark")  # Modes: "system" (default), "dark", "light"
 
+# Number of format rows that exist as widgets; the list scrolls by rebinding them
+FORMAT_ROWS_VISIBLE = 8
+
+# A URL that stays unchanged this long is extracted before Fetch Info is clicked
+PREFETCH_DELAY_MS = 400
+
+# Background operations of the window (probe, info, formats, playlists, reports) run at the same time
+UI_WORKERS = 4
+
+# Set to a file name to profile the UI thread with cProfile until the window closes
+PROFILE_ENV_VAR = "YT_DOWNLOADER_PROFILE"
+
+# Quick download choices: menu label -> FormatPolicy arguments
+QUICK_QUALITIES = {
+    "Best quality": {},
+    "2160p": {"max_height": 2160},
+    "1440p": {"max_height": 1440},
+    "1080p": {"max_height": 1080},
+    "720p": {"max_height": 720},
+    "480p": {"max_height": 480},
+}
+QUICK_CODECS = {
+    "Any codec": {},
+    "H.264 (compatible)": {"codecs": ("avc1", "mp4a"), "container": "mp4"},
+    "AV1 (smaller)": {"codecs": ("av01", "opus")},
+    "VP9": {"codecs": ("vp9", "opus")},
+}
+
+# Subtitles embedded into videos: menu label -> language codes
+SUBTITLE_CHOICES = {
+    "English": ("en",),
+    "Spanish": ("es",),
+    "French": ("fr",),
+    "German": ("de",),
+    "Portuguese": ("pt",),
+    "Japanese": ("ja",),
+    "No subtitles": (),
+    "All languages": ("all",),
+}
+
+
 class ModernYouTubeDownloader:
     def __init__(self):
         self.root = ctk.CTk()
@@ -31,11 +106,53 @@ class ModernYouTubeDownloader:
         self.video_info = {}
         self.formats_data = {}
         self.formats = []  # Added missing formats list
-        self.current_process = None
         self.format_vars = {}  # Store radio button variables
+        self.format_views = {}  # Download type -> prepared row texts for formats_data
+        self.format_views_source = None  # formats_data the cached views were built from
+        self.format_view = []
+        self.format_offset = 0
+        self.ui_timings = Timings()
+        self.metadata_cache = MetadataCache()
+        self.thumbnail_loader = None  # Created with the first thumbnail; imports PIL and requests
+        self.thumbnail_lock = threading.Lock()
+        self.subtitle_fetcher = None  # Created with the first download; imports requests
+        self.job_rows = {}  # Job id -> widgets of its row in the download list
+        self.playlist_entries = []
+        self.playlist_vars = []  # One BooleanVar per playlist entry
+        self.playlist_engine = None
+        self.playlist_title = None
+        self.playlist_resolver = PlaylistResolver(self.metadata_cache)
+        self.prefetch = None  # (url, engine) of the speculative extraction of the entered URL
+        self.prefetch_after = None
+        self.closing = False  # Set once the window closes; late results are dropped
+        # Every operation started from the window runs here instead of on a thread of its own
+        self.workers = ThreadPoolExecutor(max_workers=UI_WORKERS, thread_name_prefix='ui')
+        # Worker threads never touch Tk directly; they post here and
+        # drain_events applies the result a few dozen times per second.
+        self.events = EventCoalescer()
+        # Unfinished jobs in the journal are resumed on the next start
+        self.journal = JobJournal()
+        # Concurrent DASH/HLS fragments, tuned per site from measured throughput
+        self.fragment_tuner = FragmentTuner()
+        # Finished downloads; files deleted since then are downloaded again
+        self.archive = DownloadArchive(verify_files=True)
+        self.download_queue = DownloadQueue(
+            on_update=lambda job: self.events.post_update(job.id, job),
+            on_log=lambda job, line: self.events.post_log(f"[#{job.id}] {line}", log_level_for(line)),
+            journal=self.journal,
+            fragment_tuner=self.fragment_tuner,
+            archive=self.archive,
+            governor=BandwidthGovernor(max_per_host=DEFAULT_PARALLEL_DOWNLOADS)
+        )
+        # The textbox only shows the tail of the log; everything goes to a rotated file
+        self.log_buffer = LogBuffer(path=app_cache_dir() / 'logs' / 'yt_downloader.log')
+        self.log_widget_lines = 0
         
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.check_ytdlp()
+        self.resume_jobs()
+        self.root.after(UI_DRAIN_INTERVAL_MS, self.drain_events)
     
     def setup_ui(self):
         """Setup the main UI components"""
@@ -72,6 +189,7 @@ class ModernYouTubeDownloader:
         self.setup_output_section(self.left_panel)
         
         self.setup_download_type_section(self.right_panel)
+        self.setup_playlist_section(self.right_panel)
         self.setup_format_section(self.right_panel)
         self.setup_download_controls(self.right_panel)
         self.setup_progress_section(self.right_panel)
@@ -101,6 +219,17 @@ class ModernYouTubeDownloader:
         )
         theme_toggle.pack(side="right", padx=20, pady=15)
 
+        # Engine selector: in-process YoutubeDL or one yt-dlp process per operation
+        self.engine_mode = tk.StringVar(value="Auto")
+        engine_menu = ctk.CTkOptionMenu(
+            top_bar,
+            values=["Auto", "In-process", "Subprocess"],
+            variable=self.engine_mode,
+            command=lambda _: self.check_ytdlp(),
+            width=130
+        )
+        engine_menu.pack(side="right", padx=(20, 0), pady=15)
+
     def toggle_theme(self):
         """Switch between dark/light mode"""
         mode = self.theme_mode.get().lower()
@@ -122,7 +251,7 @@ class ModernYouTubeDownloader:
 
         # Input container
         input_container = ctk.CTkFrame(url_frame, fg_color="transparent")
-        input_container.pack(fill="x", padx=20, pady=(0, 20))
+        input_container.pack(fill="x", padx=20, pady=(0, 10))
 
         # URL Entry
         self.url_entry = ctk.CTkEntry(
@@ -134,6 +263,7 @@ class ModernYouTubeDownloader:
             corner_radius=8
         )
         self.url_entry.pack(side="left", fill="x", expand=True, padx=(0, 15))
+        self.url_var.trace_add("write", self.on_url_change)
 
         # Fetch Button
         self.fetch_btn = ctk.CTkButton(
@@ -147,6 +277,37 @@ class ModernYouTubeDownloader:
         )
         self.fetch_btn.pack(side="right")
 
+        # Quick download: a format policy picks the format, no listing needed
+        quick_container = ctk.CTkFrame(url_frame, fg_color="transparent")
+        quick_container.pack(fill="x", padx=20, pady=(0, 20))
+
+        self.quick_quality_var = tk.StringVar(value="1080p")
+        ctk.CTkOptionMenu(
+            quick_container,
+            values=list(QUICK_QUALITIES),
+            variable=self.quick_quality_var,
+            width=130
+        ).pack(side="left", padx=(0, 10))
+
+        self.quick_codec_var = tk.StringVar(value="Any codec")
+        ctk.CTkOptionMenu(
+            quick_container,
+            values=list(QUICK_CODECS),
+            variable=self.quick_codec_var,
+            width=170
+        ).pack(side="left", padx=(0, 10))
+
+        self.quick_btn = ctk.CTkButton(
+            quick_container,
+            text="⚡ Quick Download",
+            command=self.quick_download,
+            height=35,
+            width=150,
+            font=ctk.CTkFont(size=13, weight="bold"),
+            corner_radius=8
+        )
+        self.quick_btn.pack(side="right")
+
     def setup_video_preview_section(self, parent):
         """Setup video preview section"""
         self.preview_frame = ctk.CTkFrame(parent, corner_radius=10)
@@ -247,13 +408,27 @@ class ModernYouTubeDownloader:
         self.output_frame = ctk.CTkFrame(parent, corner_radius=10)
         self.output_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
-        # Section title
+        # Section title and level filter
+        output_header = ctk.CTkFrame(self.output_frame, fg_color="transparent")
+        output_header.pack(fill="x", padx=15, pady=(15, 10))
+
         output_label = ctk.CTkLabel(
-            self.output_frame,
+            output_header,
             text="📝 Output Log",
             font=ctk.CTkFont(size=16, weight="bold")
         )
-        output_label.pack(anchor="w", padx=15, pady=(15, 10))
+        output_label.pack(side="left")
+
+        # Progress lines are hidden by default; the progress bars already show them
+        self.log_level_var = tk.StringVar(value="Info")
+        level_menu = ctk.CTkOptionMenu(
+            output_header,
+            values=["Info", "Progress"],
+            variable=self.log_level_var,
+            command=lambda _: self.refresh_log_widget(),
+            width=100
+        )
+        level_menu.pack(side="right")
 
         # Output text area
         self.output_text = ctk.CTkTextbox(
@@ -264,6 +439,16 @@ class ModernYouTubeDownloader:
         )
         self.output_text.pack(fill="both", expand=True, padx=15, pady=(0, 15))
 
+        # Event delivery counters, to check that progress floods are coalesced
+        self.event_stats_label = ctk.CTkLabel(
+            self.output_frame,
+            text="",
+            font=ctk.CTkFont(size=10),
+            text_color="gray60",
+            anchor="w"
+        )
+        self.event_stats_label.pack(anchor="w", padx=15, pady=(0, 10))
+
     def setup_download_type_section(self, parent):
         """Setup download type selection"""
         self.type_frame = ctk.CTkFrame(parent, corner_radius=10)
@@ -303,6 +488,60 @@ class ModernYouTubeDownloader:
         )
         self.audio_radio.pack(side="left", padx=(0, 10))
 
+        # Only the chosen languages are fetched, not every track the video has
+        self.subtitles_var = tk.StringVar(value="English")
+        subtitles_menu = ctk.CTkOptionMenu(
+            type_container,
+            values=list(SUBTITLE_CHOICES),
+            variable=self.subtitles_var,
+            width=140
+        )
+        subtitles_menu.pack(side="right", padx=(0, 10))
+
+        subtitles_label = ctk.CTkLabel(type_container, text="💬 Subtitles:", font=ctk.CTkFont(size=12))
+        subtitles_label.pack(side="right", padx=(0, 10))
+
+    def setup_playlist_section(self, parent):
+        """Setup playlist entry list, shown instead of the format list for playlists"""
+        self.playlist_frame = ctk.CTkFrame(parent, corner_radius=10)
+        self.playlist_frame.pack(fill="both", expand=True, padx=10, pady=(0, 15))
+        self.playlist_frame.pack_forget()  # Hide initially
+
+        header = ctk.CTkFrame(self.playlist_frame, fg_color="transparent")
+        header.pack(fill="x", padx=15, pady=(15, 10))
+
+        self.playlist_label = ctk.CTkLabel(
+            header,
+            text="📃 Playlist",
+            font=ctk.CTkFont(size=16, weight="bold"),
+            anchor="w"
+        )
+        self.playlist_label.pack(side="left")
+
+        select_none = ctk.CTkButton(header, text="None", width=60,
+                                    command=lambda: self.set_playlist_selection(False))
+        select_none.pack(side="right")
+        select_all = ctk.CTkButton(header, text="All", width=60,
+                                   command=lambda: self.set_playlist_selection(True))
+        select_all.pack(side="right", padx=(0, 10))
+
+        self.playlist_scroll = ctk.CTkScrollableFrame(
+            self.playlist_frame,
+            height=350,
+            corner_radius=8
+        )
+        self.playlist_scroll.pack(fill="both", expand=True, padx=15, pady=(0, 10))
+
+        self.playlist_download_btn = ctk.CTkButton(
+            self.playlist_frame,
+            text="⬇️ Download Selected",
+            command=self.download_playlist_selection,
+            height=50,
+            font=ctk.CTkFont(size=16, weight="bold"),
+            corner_radius=10
+        )
+        self.playlist_download_btn.pack(fill="x", padx=15, pady=(0, 15))
+
     def setup_format_section(self, parent):
         """Setup format selection section"""
         self.format_frame = ctk.CTkFrame(parent, corner_radius=10)
@@ -317,13 +556,64 @@ class ModernYouTubeDownloader:
         )
         format_label.pack(anchor="w", padx=15, pady=(15, 10))
         
-        # Scrollable frame for formats
-        self.format_scroll = ctk.CTkScrollableFrame(
-            self.format_frame, 
-            height=350,
-            corner_radius=8
+        # Virtualized list: a fixed pool of rows plus a scrollbar
+        list_container = ctk.CTkFrame(self.format_frame, corner_radius=8)
+        list_container.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+
+        self.format_scrollbar = ctk.CTkScrollbar(list_container, command=self.on_format_scroll)
+        self.format_scrollbar.pack(side="right", fill="y", padx=(0, 5), pady=5)
+
+        self.format_rows_frame = ctk.CTkFrame(list_container, fg_color="transparent")
+        self.format_rows_frame.pack(side="left", fill="both", expand=True)
+
+        self.format_empty_label = ctk.CTkLabel(
+            self.format_rows_frame,
+            text="",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            text_color="red"
         )
-        self.format_scroll.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+        self.format_rows = [self.create_format_row() for _ in range(FORMAT_ROWS_VISIBLE)]
+
+    def create_format_row(self):
+        """Create one reusable row of the format list"""
+        format_frame = ctk.CTkFrame(self.format_rows_frame, corner_radius=8)
+
+        radio = ctk.CTkRadioButton(
+            format_frame,
+            text="",
+            variable=self.selected_format,
+            value="",
+            width=20
+        )
+        radio.pack(side="left", padx=10, pady=10)
+
+        info_frame = ctk.CTkFrame(format_frame, fg_color="transparent")
+        info_frame.pack(side="left", fill="x", expand=True, padx=10, pady=5)
+
+        id_label = ctk.CTkLabel(
+            info_frame,
+            text="",
+            font=ctk.CTkFont(size=12, weight="bold"),
+            anchor="w"
+        )
+        id_label.pack(anchor="w")
+
+        quality_label = ctk.CTkLabel(
+            info_frame,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color="gray70",
+            anchor="w"
+        )
+        quality_label.pack(anchor="w")
+
+        for widget in (format_frame, info_frame, id_label, quality_label):
+            widget.bind("<MouseWheel>", self.on_format_wheel)
+            widget.bind("<Button-4>", self.on_format_wheel)
+            widget.bind("<Button-5>", self.on_format_wheel)
+
+        return {"frame": format_frame, "radio": radio, "id_label": id_label,
+                "quality_label": quality_label, "visible": False}
 
     def setup_download_controls(self, parent):
         """Setup download controls section"""
@@ -343,20 +633,71 @@ class ModernYouTubeDownloader:
         self.download_btn.pack(fill="x", padx=15, pady=15)
 
     def setup_progress_section(self, parent):
-        """Setup progress section"""
+        """Setup progress section with the per-job download list"""
         self.progress_frame = ctk.CTkFrame(parent, corner_radius=10)
         self.progress_frame.pack(fill="x", padx=15, pady=(15, 10))
         self.progress_frame.pack_forget()  # Hide initially
         
-        # Section title
+        # Section title and worker count
+        header = ctk.CTkFrame(self.progress_frame, fg_color="transparent")
+        header.pack(fill="x", padx=15, pady=(15, 10))
+
         progress_label = ctk.CTkLabel(
-            self.progress_frame, 
+            header, 
             text="📊 Download Progress", 
             font=ctk.CTkFont(size=16, weight="bold")
         )
-        progress_label.pack(anchor="w", padx=15, pady=(15, 10))
+        progress_label.pack(side="left")
+
+        self.parallel_var = tk.StringVar(value=str(DEFAULT_PARALLEL_DOWNLOADS))
+        parallel_menu = ctk.CTkOptionMenu(
+            header,
+            values=[str(n) for n in range(1, 9)],
+            variable=self.parallel_var,
+            command=self.on_parallel_change,
+            width=70
+        )
+        parallel_menu.pack(side="right")
+
+        parallel_label = ctk.CTkLabel(header, text="Parallel downloads:", font=ctk.CTkFont(size=12))
+        parallel_label.pack(side="right", padx=(0, 10))
+
+        # Global bandwidth budget, split across the running jobs
+        self.rate_limit_var = tk.StringVar(value="Unlimited")
+        rate_limit_menu = ctk.CTkOptionMenu(
+            header,
+            values=["Unlimited", "1 MiB/s", "2 MiB/s", "5 MiB/s", "10 MiB/s", "25 MiB/s", "50 MiB/s"],
+            variable=self.rate_limit_var,
+            command=self.on_rate_limit_change,
+            width=110
+        )
+        rate_limit_menu.pack(side="right", padx=(0, 20))
+
+        rate_limit_label = ctk.CTkLabel(header, text="Speed limit:", font=ctk.CTkFont(size=12))
+        rate_limit_label.pack(side="right", padx=(0, 10))
+
+        self.adaptive_fragments_var = tk.BooleanVar(value=True)
+        adaptive_fragments_check = ctk.CTkCheckBox(
+            header,
+            text="⚡ Parallel fragments (adaptive)",
+            variable=self.adaptive_fragments_var,
+            command=self.on_adaptive_fragments_change,
+            font=ctk.CTkFont(size=12)
+        )
+        adaptive_fragments_check.pack(side="right", padx=(0, 20))
+
+        # Merges and conversions on their own pool, so a finished download frees its slot at once
+        self.pipeline_var = tk.BooleanVar(value=False)
+        pipeline_check = ctk.CTkCheckBox(
+            header,
+            text="🧵 Post-process in parallel",
+            variable=self.pipeline_var,
+            command=self.on_pipeline_change,
+            font=ctk.CTkFont(size=12)
+        )
+        pipeline_check.pack(side="right", padx=(0, 20))
         
-        # Progress bar
+        # Overall progress bar across all active jobs
         self.progress_bar = ctk.CTkProgressBar(
             self.progress_frame, 
             height=25,
@@ -372,41 +713,159 @@ class ModernYouTubeDownloader:
             font=ctk.CTkFont(size=12)
         )
         self.progress_text.pack(padx=15, pady=(15, 10))
+
+        # One row per queued/running/finished job
+        self.jobs_scroll = ctk.CTkScrollableFrame(
+            self.progress_frame,
+            height=200,
+            corner_radius=8
+        )
+        self.jobs_scroll.pack(fill="x", padx=15, pady=(0, 10))
+
+        buttons = ctk.CTkFrame(self.progress_frame, fg_color="transparent")
+        buttons.pack(fill="x", padx=15, pady=(5, 10))
         
         # Cancel button
         self.cancel_btn = ctk.CTkButton(
-            self.progress_frame,
-            text="❌ Cancel Download",
+            buttons,
+            text="❌ Cancel All",
             command=self.cancel_download,
             height=40,
             fg_color="red",
             hover_color="darkred",
             corner_radius=8
         )
-        self.cancel_btn.pack(fill="x", padx=15, pady=(15, 10))
+        self.cancel_btn.pack(side="left", fill="x", expand=True, padx=(0, 5))
+
+        clear_btn = ctk.CTkButton(
+            buttons,
+            text="🧹 Clear Finished",
+            command=self.clear_finished_jobs,
+            height=40,
+            corner_radius=8
+        )
+        clear_btn.pack(side="left", fill="x", expand=True, padx=(5, 0))
+
+    def add_job_row(self, job):
+        """Create the list row showing one job"""
+        row = ctk.CTkFrame(self.jobs_scroll, corner_radius=8)
+        row.pack(fill="x", padx=5, pady=4)
+
+        title = ctk.CTkLabel(
+            row,
+            text=f"#{job.id} {job.title}",
+            font=ctk.CTkFont(size=12, weight="bold"),
+            anchor="w"
+        )
+        title.grid(row=0, column=0, sticky="w", padx=10, pady=(6, 0))
+
+        cancel = ctk.CTkButton(
+            row,
+            text="✖",
+            width=30,
+            height=24,
+            fg_color="red",
+            hover_color="darkred",
+            command=lambda: self.cancel_download(job.id)
+        )
+        cancel.grid(row=0, column=1, rowspan=2, padx=10, pady=6)
+
+        bar = ctk.CTkProgressBar(row, height=10)
+        bar.grid(row=1, column=0, sticky="ew", padx=10, pady=(4, 0))
+        bar.set(0)
+
+        status = ctk.CTkLabel(row, text=job.progress_text, font=ctk.CTkFont(size=11),
+                              text_color="gray70", anchor="w")
+        status.grid(row=2, column=0, sticky="w", padx=10, pady=(0, 6))
+
+        row.grid_columnconfigure(0, weight=1)
+        self.job_rows[job.id] = {"frame": row, "bar": bar, "status": status, "cancel": cancel, "done": False}
+
+    def engine_class(self):
+        """Return the engine class matching the selected mode"""
+        mode = self.engine_mode.get()
+        if mode == "In-process" and not InProcessEngine.is_available():
+            self.log_output("⚠️ yt_dlp module not importable, falling back to subprocess engine")
+        return engine_class_for(mode.lower())
+
+    def create_engine(self):
+        """Create an engine for one operation according to the selected mode"""
+        return self.engine_class()()
 
     def check_ytdlp(self):
-        """Check if yt-dlp is available"""
-        try:
-            result = subprocess.run(
-                ['yt-dlp', '--version'], 
-                capture_output=True, 
-                check=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-            )
-            version = result.stdout.decode().strip()
-            self.log_output(f"✅ yt-dlp is available (version: {version})")
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            self.log_output("❌ ERROR: yt-dlp not found. Please install it using: pip install yt-dlp")
-            messagebox.showerror("Error", "yt-dlp not found.\n\nPlease install it using:\npip install yt-dlp")
+        """Check if yt-dlp is available without holding up the window"""
+        engine_class = self.engine_class()
+
+        def probe():
+            try:
+                with self.ui_timings.measure("startup.probe_ytdlp"):
+                    version, path = probe_ytdlp(engine_class)
+                self.events.post_log(
+                    f"✅ yt-dlp is available (version: {version}, engine: {engine_class.name}, {path})")
+            except (EngineError, OSError):
+                self.events.post_log("❌ ERROR: yt-dlp not found. Please install it using: pip install yt-dlp")
+                self.events.post_call(lambda: messagebox.showerror(
+                    "Error", "yt-dlp not found.\n\nPlease install it using:\npip install yt-dlp"))
+
+        self.workers.submit(probe)
 
     def log_output(self, message):
         """Add message to output log"""
-        timestamp = time.strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}\n"
-        self.output_text.insert("end", formatted_message)
+        self.log_lines([(logging.INFO, message)])
+
+    def log_widget_level(self):
+        return PROGRESS if self.log_level_var.get() == "Progress" else logging.INFO
+
+    def log_lines(self, entries):
+        """Add (level, message) pairs to the log with a single textbox insert"""
+        min_level = self.log_widget_level()
+        lines = [line for level, line in self.log_buffer.append(entries) if level >= min_level]
+        if not lines:
+            return
+
+        self.output_text.insert("end", "".join(line + "\n" for line in lines))
+        self.log_widget_lines += len(lines)
+
+        # Trim in bulk once the widget is a quarter over its limit, not line by line
+        max_lines = self.log_buffer.max_lines
+        if self.log_widget_lines > max_lines + max_lines // 4:
+            excess = self.log_widget_lines - max_lines
+            self.output_text.delete("1.0", f"{excess + 1}.0")
+            self.log_widget_lines = max_lines
+
         self.output_text.see("end")
 
+    def refresh_log_widget(self):
+        """Re-render the textbox from the buffer after the level filter changed"""
+        lines = self.log_buffer.lines(self.log_widget_level())
+        self.output_text.delete("1.0", "end")
+        if lines:
+            self.output_text.insert("end", "".join(line + "\n" for line in lines))
+        self.log_widget_lines = len(lines)
+        self.output_text.see("end")
+
+    def drain_events(self):
+        """Apply events posted by worker threads, then schedule the next drain"""
+        try:
+            calls, updates, lines = self.events.drain()
+            if lines:
+                self.log_lines(lines)
+            for call in calls:
+                try:
+                    call()
+                except Exception as e:
+                    self.log_output(f"⚠️ UI update failed: {str(e)}")
+            for job in updates.values():
+                self.on_job_update(job)
+            if calls or updates or lines:
+                stats = self.events.stats()
+                self.event_stats_label.configure(
+                    text=f"UI events: {stats['posted']} posted, {stats['coalesced']} coalesced, "
+                         f"{stats['drains']} drains"
+                )
+        finally:
+            self.root.after(UI_DRAIN_INTERVAL_MS, self.drain_events)
+
     def fetch_video_info(self):
         """Fetch video information and display preview"""
         url = self.url_var.get().strip()
@@ -415,39 +874,236 @@ class ModernYouTubeDownloader:
             return
         
         self.fetch_btn.configure(state="disabled", text="🔄 Fetching...")
+
+        if is_playlist_url(url):
+            self.fetch_playlist(url)
+            return
+
+        # A fresh cache entry fills the preview and format list without any extraction
+        entry = self.metadata_cache.get(url)
+        if entry:
+            self.video_info = entry['info']
+            self.formats_data = entry['formats_data'] or {"video": [], "audio": []}
+            stats = self.metadata_cache.stats()
+            age = int(time.time() - entry['stored_at'])
+            self.log_output(f"⚡ Loaded video info from cache (age {age}s, "
+                            f"{stats['hits']} hits / {stats['misses']} misses)")
+            self.on_video_info_success(has_formats=entry['formats_data'] is not None)
+            return
+
         self.log_output(f"🔍 Fetching video info for: {url}")
         
+        engine = self.create_engine()
+
         def fetch_info():
+            start = time.perf_counter()
             try:
-                cmd = ['yt-dlp', '-j', '--no-warnings', url]
-                result = subprocess.run(
-                    cmd, 
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.PIPE, 
-                    text=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-                )
-                
-                if result.returncode == 0:
-                    self.video_info = json.loads(result.stdout)
-                    self.root.after(0, self.on_video_info_success)
-                else:
-                    self.video_info = None
-                    self.root.after(0, lambda: self.on_video_info_error(result.stderr))
+                # Joins the speculative extraction of this URL if it is still running
+                result = self.metadata_cache.fetch(url, engine.extract_info)
+                info, formats_data = result['info'], result['formats_data']
+                self.ui_timings.record("extract.info", time.perf_counter() - start)
+                if info.get('_type') == 'playlist':
+                    # Not recognised as a playlist URL up front; entries are already extracted
+                    entries = info.get('entries') or []
+                    for entry in entries:
+                        self.metadata_cache.put(playlist_entry_url(entry), entry,
+                                                formats_from_info(entry) if entry.get('formats') else None)
+                    self.events.post_call(lambda: self.show_playlist(url, entries))
+                    return
+                # fetch() built the format table, so the Tk thread only has to render it
+                self.video_info = info
+                if formats_data:
+                    self.formats_data = formats_data
+                self.events.post_call(lambda: self.on_video_info_success(has_formats=formats_data is not None))
             except Exception as e:
+                self.ui_timings.record("extract.info", time.perf_counter() - start, ok=False)
                 self.video_info = None
-                self.root.after(0, lambda: self.on_video_info_error(str(e)))
+                self.events.post_call(lambda err=str(e): self.on_video_info_error(err))
         
-        threading.Thread(target=fetch_info, daemon=True).start()
+        self.workers.submit(fetch_info)
+
+    def on_url_change(self, *args):
+        """Restart the prefetch delay whenever the entered URL changes"""
+        if self.prefetch_after:
+            self.root.after_cancel(self.prefetch_after)
+        self.prefetch_after = self.root.after(PREFETCH_DELAY_MS, self.prefetch_info)
+
+    def prefetch_info(self):
+        """Extract the entered video URL in the background so Fetch Info finds it ready"""
+        self.prefetch_after = None
+        url = self.url_var.get().strip()
+        if self.prefetch and self.prefetch[0] != url:
+            previous_url, engine = self.prefetch
+            self.prefetch = None
+            # Nobody asked for the previous URL after all; stop extracting it
+            if not self.metadata_cache.waiters(previous_url):
+                engine.cancel()
+        if self.prefetch or not is_video_url(url) or is_playlist_url(url):
+            return
+
+        engine = self.create_engine()
+        self.prefetch = (url, engine)
 
-    def on_video_info_success(self):
+        def work():
+            try:
+                with self.ui_timings.measure("extract.prefetch"):
+                    self.metadata_cache.fetch(url, engine.extract_info)
+            except Exception:
+                pass  # Fetch Info reports errors when it is clicked
+
+        self.workers.submit(work)
+
+    def fetch_playlist(self, url):
+        """Enumerate a playlist or channel, adding entries to the list as they arrive"""
+        self.log_output(f"📃 Enumerating playlist: {url}")
+        self.show_playlist(url, [])
+        self.playlist_label.configure(text="📃 Playlist (loading...)")
+
+        if self.playlist_engine:
+            self.playlist_engine.cancel()
+        engine = self.create_engine()
+        self.playlist_engine = engine
+
+        def enumerate_thread():
+            batch = []
+            last_flush = time.monotonic()
+            try:
+                for entry in engine.iter_playlist(url):
+                    batch.append(entry)
+                    # Hand entries to the UI in small batches so the list fills immediately
+                    if len(batch) >= 25 or time.monotonic() - last_flush > 0.2:
+                        self.events.post_call(lambda b=batch: self.add_playlist_entries(engine, b))
+                        batch = []
+                        last_flush = time.monotonic()
+                self.events.post_call(lambda b=batch: self.add_playlist_entries(engine, b))
+                self.events.post_call(lambda: self.on_playlist_enumerated(engine))
+            except Exception as e:
+                self.events.post_call(lambda err=str(e): self.on_video_info_error(err))
+
+        self.workers.submit(enumerate_thread)
+
+    def show_playlist(self, url, entries):
+        """Switch the right panel to the playlist view"""
+        for widget in self.playlist_scroll.winfo_children():
+            widget.destroy()
+        self.playlist_entries = []
+        self.playlist_vars = []
+        self.playlist_title = None
+        self.video_info = {}
+
+        self.format_frame.pack_forget()
+        self.controls_frame.pack_forget()
+        self.preview_frame.pack_forget()
+        self.type_frame.pack(fill="x", padx=10, pady=(10, 15))
+        self.playlist_frame.pack(fill="both", expand=True, padx=10, pady=(0, 15), after=self.type_frame)
+
+        if entries:
+            self.add_playlist_entries(None, entries)
+            self.on_playlist_enumerated(None)
+
+    def add_playlist_entries(self, engine, entries):
+        """Append a batch of flat entries to the playlist view"""
+        if engine is not self.playlist_engine and engine is not None:
+            return  # Stale batch from a previous enumeration
+
+        for entry in entries:
+            index = len(self.playlist_entries)
+            self.playlist_entries.append(entry)
+            var = tk.BooleanVar(value=True)
+            self.playlist_vars.append(var)
+
+            duration = format_duration(entry.get('duration')) if entry.get('duration') else ""
+            text = f"{index + 1}. {entry.get('title') or entry.get('id')}"
+            if duration:
+                text += f"  ({duration})"
+            checkbox = ctk.CTkCheckBox(self.playlist_scroll, text=text, variable=var)
+            checkbox.pack(anchor="w", padx=10, pady=3)
+
+        title = entries[0].get('playlist_title') if entries else None
+        if title:
+            self.playlist_title = title
+        self.playlist_label.configure(
+            text=f"📃 {self.playlist_title or 'Playlist'} "
+                 f"({len(self.playlist_entries)} entries, loading...)"
+        )
+
+    def on_playlist_enumerated(self, engine):
+        """Handle the end of a playlist enumeration"""
+        if engine is not self.playlist_engine and engine is not None:
+            return
+        self.playlist_engine = None
+        self.fetch_btn.configure(state="normal", text="📥 Fetch Info")
+        self.playlist_label.configure(
+            text=f"📃 {self.playlist_title or 'Playlist'} ({len(self.playlist_entries)} entries)"
+        )
+        self.log_output(f"✅ Playlist enumerated: {len(self.playlist_entries)} entries")
+
+    def set_playlist_selection(self, selected):
+        """Select or deselect every playlist entry"""
+        for var in self.playlist_vars:
+            var.set(selected)
+
+    def download_playlist_selection(self):
+        """Resolve the selected entries in parallel and queue each one as it resolves"""
+        if not os.path.exists(self.output_dir.get()):
+            messagebox.showerror("Error", "Output directory does not exist")
+            return
+
+        selected = [entry for entry, var in zip(self.playlist_entries, self.playlist_vars) if var.get()]
+        if not selected:
+            messagebox.showerror("Error", "Please select at least one playlist entry")
+            return
+
+        download_type = self.download_type.get()
+        output_dir = self.output_dir.get()
+        engine_factory = self.engine_class()
+        sub_langs = self.subtitle_languages()
+
+        # Entries already downloaded as this type are not even extracted
+        count = len(selected)
+        selected = [entry for entry in selected if not self.archive.find(entry_video_key(entry), download_type)]
+        if len(selected) < count:
+            self.log_output(f"⏭️ Skipping {count - len(selected)} entries that were already downloaded")
+            if not selected:
+                return
+
+        self.progress_frame.pack(fill="x", pady=(0, 20))
+        self.log_output(f"🔍 Resolving {len(selected)} playlist entries...")
+
+        def on_resolved(entry, info):
+            if self.closing:
+                return  # Resolved while the window closed; the queue was already cancelled
+            job = DownloadJob(
+                info.get('webpage_url') or playlist_entry_url(entry),
+                download_options(download_type, "bestvideo", output_dir, sub_langs=sub_langs),
+                title=info.get('title') or entry.get('title'),
+                engine_factory=engine_factory,
+                info=info
+            )
+            self.download_queue.submit(job)
+
+        def on_error(entry, error):
+            self.events.post_log(f"❌ Could not resolve {entry.get('title') or entry.get('id')}: {error}")
+
+        for entry in selected:
+            self.playlist_resolver.resolve(entry, engine_factory, on_resolved, on_error)
+
+    def on_video_info_success(self, has_formats=False):
         """Handle successful video info fetch"""
         self.fetch_btn.configure(state="normal", text="📥 Fetch Info")
         self.display_video_info()
         self.load_thumbnail()
-        self.fetch_formats()
+
+        # The -j JSON already carries the full format list; only fall back to
+        # a second `yt-dlp -F` extraction when it is missing.
+        if has_formats:
+            self.formats = []
+            self.display_formats()
+        else:
+            self.fetch_formats()
         
         # Show preview and other sections
+        self.playlist_frame.pack_forget()
         self.preview_frame.pack(fill="x", padx=10, pady=(0, 15))
         self.type_frame.pack(fill="x", padx=10, pady=(10, 15))
         self.format_frame.pack(fill="both", expand=True, padx=10, pady=(0, 15))
@@ -476,7 +1132,7 @@ class ModernYouTubeDownloader:
         self.title_label.configure(text=title)
         
         if duration:
-            duration_str = self.format_duration(duration)
+            duration_str = format_duration(duration)
             self.duration_label.configure(text=f"⏱ Duration: {duration_str}")
         else:
             self.duration_label.configure(text="")
@@ -490,46 +1146,38 @@ class ModernYouTubeDownloader:
         """Load and display video thumbnail"""
         if not self.video_info:
             return
-            
-        try:
-            thumbnail_url = self.video_info.get('thumbnail')
-            if thumbnail_url:
-                def load_thumb():
-                    try:
-                        response = requests.get(thumbnail_url, timeout=10)
-                        if response.status_code == 200:
-                            # Load and resize image
-                            image = Image.open(BytesIO(response.content))
-                            # Maintain aspect ratio
-                            image.thumbnail((320, 180), Image.Resampling.LANCZOS)
-                            photo = ImageTk.PhotoImage(image)
-                            
-                            # Update thumbnail label
-                            self.root.after(0, lambda: self.thumbnail_label.configure(image=photo, text=""))
-                            self.root.after(0, lambda: setattr(self.thumbnail_label, 'image', photo))
-                        else:
-                            self.root.after(0, lambda: self.thumbnail_label.configure(text="❌ Thumbnail unavailable"))
-                    except Exception as e:
-                        self.root.after(0, lambda: self.log_output(f"⚠️ Could not load thumbnail: {str(e)}"))
-                        self.root.after(0, lambda: self.thumbnail_label.configure(text="❌ Thumbnail failed to load"))
-                
-                threading.Thread(target=load_thumb, daemon=True).start()
-        except Exception as e:
-            self.log_output(f"⚠️ Thumbnail error: {str(e)}")
 
-    def format_duration(self, seconds):
-        """Format duration from seconds to readable format"""
-        if not seconds:
-            return "Unknown"
-        
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        seconds = int(seconds % 60)
-        
-        if hours > 0:
-            return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        else:
-            return f"{minutes:02d}:{seconds:02d}"
+        info = self.video_info
+        requested = time.perf_counter()
+
+        def on_loaded(image, error):
+            self.ui_timings.record("thumbnail", time.perf_counter() - requested, ok=image is not None)
+            if image is None:
+                self.events.post_log(f"⚠️ Could not load thumbnail: {error}")
+                self.events.post_call(lambda: self.thumbnail_label.configure(text="❌ Thumbnail failed to load"))
+                return
+            self.events.post_call(lambda: self.show_thumbnail(info, image))
+
+        def start():
+            with self.thumbnail_lock:
+                if self.thumbnail_loader is None:
+                    # PIL and requests are only imported once a thumbnail is needed
+                    from yt_thumbnails import ThumbnailLoader
+                    self.thumbnail_loader = ThumbnailLoader()
+            self.thumbnail_loader.load(info, on_loaded)
+
+        self.workers.submit(start)
+
+    def show_thumbnail(self, info, image):
+        """Display a loaded thumbnail unless another video was fetched meanwhile"""
+        if info is not self.video_info:
+            return
+        from PIL import ImageTk
+
+        # PhotoImage must be created on the Tk thread
+        photo = ImageTk.PhotoImage(image)
+        self.thumbnail_label.configure(image=photo, text="")
+        self.thumbnail_label.image = photo
 
     def fetch_formats(self):
         """Fetch available formats"""
@@ -539,236 +1187,28 @@ class ModernYouTubeDownloader:
         
         self.log_output("🔍 Fetching available formats...")
         
+        engine = self.create_engine()
+
         def fetch_formats_thread():
             try:
-                cmd = ['yt-dlp', '-F', '--no-warnings', url]
-                result = subprocess.run(
-                    cmd, 
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.PIPE, 
-                    text=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-                )
-                
-                if result.returncode == 0:
-                    self.formats = result.stdout.splitlines()
-                    self.root.after(0, self.parse_formats)  # Call parse_formats without arguments
-                    self.root.after(0, self.display_formats)
-                else:
-                    self.formats = []
-                    self.root.after(0, lambda: self.log_output(f"❌ Error fetching formats: {result.stderr}"))
+                with self.ui_timings.measure("extract.formats"):
+                    self.formats = engine.list_formats(url)
+                self.events.post_call(self.parse_formats)  # Call parse_formats without arguments
+                self.events.post_call(self.display_formats)
             except Exception as e:
                 self.formats = []
-                self.root.after(0, lambda: self.log_output(f"❌ Error fetching formats: {str(e)}"))
+                self.events.post_log(f"❌ Error fetching formats: {str(e)}")
         
-        threading.Thread(target=fetch_formats_thread, daemon=True).start()
+        self.workers.submit(fetch_formats_thread)
 
     def parse_formats(self):
-        """Parse the format output from yt-dlp -F command"""
-        self.formats_data = {"video": [], "audio": []}
-        
-        if not self.formats:
-            return
-        
-        for line in self.formats:
-            # Skip header lines and empty lines
-            if not line.strip() or line.startswith("format") or re.match(r"^\s*ID\s+EXT", line) or line.startswith("["):
-                continue
-            
-            # Parse the line - yt-dlp format: ID EXT RESOLUTION FPS FILESIZE TBR PROTO VCODEC ACODEC MORE_INFO
-            parts = line.split()
-            if len(parts) < 3:
-                continue
-            
-            format_id = parts[0]
-            ext = parts[1]
-            
-            # Extract various format details
-            resolution = self.extract_resolution_from_line(line)
-            filesize = self.extract_filesize_from_line(line)
-            fps = self.extract_fps_from_line(line)
-            vcodec = self.extract_vcodec_from_line(line)
-            acodec = self.extract_acodec_from_line(line)
-            abr = self.extract_abr_from_line(line)
-            
-            format_info = {
-                "id": format_id,
-                "ext": ext,
-                "resolution": resolution,
-                "filesize": filesize,
-                "fps": fps,
-                "vcodec": vcodec,
-                "acodec": acodec,
-                "abr": abr,
-                "codec": vcodec if vcodec != "none" else acodec,
-                "full": line,
-            }
-            
-            # Improved audio/video classification
-            is_audio_only = (
-                vcodec == "none" or 
-                "audio only" in line.lower() or 
-                resolution == "audio only" or
-                ext in ['m4a', 'mp3', 'aac', 'ogg', 'opus', 'wav'] or
-                (resolution == "N/A" and acodec != "none" and acodec != "unknown")
-            )
-            
-            is_video_only = (
-                acodec == "none" or 
-                "video only" in line.lower() or
-                (resolution != "audio only" and resolution != "N/A" and acodec == "none")
-            )
-            
-            # Classify formats
-            if is_audio_only:
-                self.formats_data["audio"].append(format_info)
-            elif is_video_only or (resolution != "audio only" and resolution != "N/A"):
-                self.formats_data["video"].append(format_info)
-            else:
-                # If unclear, check if it has both video and audio
-                if acodec != "none" and vcodec != "none":
-                    self.formats_data["video"].append(format_info)
-                elif acodec != "none":
-                    self.formats_data["audio"].append(format_info)
-        
-        # Sort formats
-        self.formats_data["video"].sort(key=lambda x: self.get_resolution_sort_key(x["resolution"]), reverse=True)
-        self.formats_data["audio"].sort(key=lambda x: self.extract_bitrate_value(x["abr"]), reverse=True)
-
-
-    def extract_bitrate_value(self, bitrate_str):
-        """Extract numeric bitrate value for sorting"""
-        if not bitrate_str or bitrate_str == "N/A":
-            return 0
-        
-        # Extract numeric value from strings like "128k", "192k", etc.
-        match = re.search(r'(\d+)', bitrate_str)
-        if match:
-            return int(match.group(1))
-        
-        return 0
-
-    def extract_resolution_from_line(self, line):
-        """Extract resolution from format line"""
-        # Look for patterns like 1920x1080, 720p, etc.
-        resolution_match = re.search(r'\b(\d{3,4}x\d{3,4})\b', line)
-        if resolution_match:
-            return resolution_match.group(1)
-        
-        # Look for patterns like 720p, 1080p
-        p_match = re.search(r'\b(\d{3,4}p)\b', line)
-        if p_match:
-            return p_match.group(1)
-        
-        # Check if it's audio only
-        if "audio only" in line.lower() or re.search(r'\bvcodec\s*:\s*none\b', line):
-            return "audio only"
-        
-        return "N/A"
-
-    def extract_filesize_from_line(self, line):
-        """Extract filesize from format line"""
-        # Look for patterns like 123.45MiB, 1.23GiB, etc.
-        size_match = re.search(r'\b(\d+(?:\.\d+)?(?:KiB|MiB|GiB|TiB|KB|MB|GB|TB))\b', line)
-        if size_match:
-            return size_match.group(1)
-        
-        # Look for patterns like ~123MB
-        approx_match = re.search(r'~(\d+(?:\.\d+)?(?:KB|MB|GB|TB))', line)
-        if approx_match:
-            return f"~{approx_match.group(1)}"
-        
-        return "N/A"
-
-    def extract_fps_from_line(self, line):
-        """Extract FPS from format line"""
-        fps_match = re.search(r'\b(\d+(?:\.\d+)?)fps\b', line)
-        if fps_match:
-            return f"{fps_match.group(1)}fps"
-        return "N/A"
-
-    def extract_vcodec_from_line(self, line):
-        """Extract video codec from format line"""
-        # Common video codecs
-        codecs = ['h264', 'h265', 'vp9', 'vp8', 'av01', 'avc1', 'hevc', 'none']
-        for codec in codecs:
-            if codec in line.lower():
-                return codec
-        return "unknown"
-
-    def extract_acodec_from_line(self, line):
-        """Extract audio codec from format line"""
-        # Common audio codecs
-        codecs = ['aac', 'mp3', 'opus', 'vorbis', 'mp4a', 'none']
-        for codec in codecs:
-            if codec in line.lower():
-                return codec
-        return "unknown"
-
-    def extract_abr_from_line(self, line):
-        """Extract audio bitrate from format line"""
-        # Look for patterns like 128k, 192k, etc.
-        abr_match = re.search(r'\b(\d+)k\b', line)
-        if abr_match:
-            return f"{abr_match.group(1)}k"
-        return "N/A"
-
-    def get_resolution_sort_key(self, resolution):
-        """Convert resolution to numeric value for sorting"""
-        if resolution == "audio only":
-            return 0
-        if resolution == "N/A":
-            return 1
-        
-        # Extract numeric value from resolution
-        match = re.search(r'(\d+)', resolution)
-        if match:
-            return int(match.group(1))
-        
-        return 0
-    
-    def display_formats(self):
-        """Display formats based on selected download type"""
-        for widget in self.format_scroll.winfo_children():
-            widget.destroy()
-
-        download_type = self.download_type.get()
-        formats = self.formats_data.get(download_type, [])
-
-        if not formats:
-            no_label = ctk.CTkLabel(
-                self.format_scroll,
-                text=f"❌ No {download_type} formats found",
-                font=ctk.CTkFont(size=14, weight="bold"),
-                text_color="red"
-            )
-            no_label.pack(pady=20)
-            return
-
-        for i, format_info in enumerate(formats):
-            format_frame = ctk.CTkFrame(self.format_scroll, corner_radius=8)
-            format_frame.pack(fill="x", padx=5, pady=5)
-
-            radio = ctk.CTkRadioButton(
-                format_frame,
-                text="",
-                variable=self.selected_format,
-                value=format_info['id'],
-                width=20
-            )
-            radio.pack(side="left", padx=10, pady=10)
-
-            info_frame = ctk.CTkFrame(format_frame, fg_color="transparent")
-            info_frame.pack(side="left", fill="x", expand=True, padx=10, pady=5)
-
-            id_label = ctk.CTkLabel(
-                info_frame,
-                text=f"ID: {format_info['id']} ({format_info['ext']})",
-                font=ctk.CTkFont(size=12, weight="bold"),
-                anchor="w"
-            )
-            id_label.pack(anchor="w")
+        """Parse the format output from yt-dlp -F command (fallback when -j has no formats)"""
+        self.formats_data = parse_format_lines(self.formats)
 
+    def build_format_view(self, download_type):
+        """Prepare (id, title, details) texts for every format of a type"""
+        view = []
+        for format_info in self.formats_data.get(download_type, []):
             # Build quality text
             quality_parts = []
             if download_type == 'video':
@@ -788,36 +1228,94 @@ class ModernYouTubeDownloader:
                 quality_parts.append(f"Size: {format_info['filesize']}")
 
             quality_text = " | ".join(quality_parts) if quality_parts else "No details available"
+            view.append((format_info['id'], f"ID: {format_info['id']} ({format_info['ext']})", quality_text))
+        return view
 
-            quality_label = ctk.CTkLabel(
-                info_frame,
-                text=quality_text,
-                font=ctk.CTkFont(size=11),
-                text_color="gray70",
-                anchor="w"
-            )
-            quality_label.pack(anchor="w")
+    def display_formats(self):
+        """Display formats based on selected download type"""
+        download_type = self.download_type.get()
 
-        # Auto-select first format
-        if formats:
-            self.selected_format.set(formats[0]['id'])
+        # Views are built once per format table; toggling the type only swaps them
+        if self.format_views_source is not self.formats_data:
+            self.format_views = {}
+            self.format_views_source = self.formats_data
+        cached = download_type in self.format_views
 
-        self.log_output(f"✅ Loaded {len(formats)} {download_type} formats")
+        timing = "format_list.toggle" if cached else "format_list.build"
+        with self.ui_timings.measure(timing):
+            if not cached:
+                self.format_views[download_type] = self.build_format_view(download_type)
+            self.format_view = self.format_views[download_type]
+            self.format_offset = 0
 
+            # Keep the current choice if it belongs to this type, else auto-select the first format
+            ids = [format_id for format_id, _, _ in self.format_view]
+            if ids and self.selected_format.get() not in ids:
+                self.selected_format.set(ids[0])
 
-    def create_format_option(self, fmt, is_audio=False):
-        rb = ctk.CTkRadioButton(
-            self.format_frame,
-            text="",
-            variable=self.selected_format,
-            value=fmt["id"]
-        )
-        rb.pack(anchor="w", padx=10)
+            self.render_format_rows()
 
-        details = f"{fmt['resolution']} | {fmt['size']} | {fmt['codec']} | {fmt['ext']}"
-        label = ctk.CTkLabel(self.format_frame, text=details, anchor="w")
-        label.pack(anchor="w", padx=40)
+        if not self.format_view:
+            return
+        elapsed_ms = self.ui_timings.last(timing) * 1000
+        if cached:
+            self.log_lines([(PROGRESS, f"Switched to {len(self.format_view)} {download_type} formats "
+                                       f"({elapsed_ms:.1f} ms)")])
+        else:
+            self.log_output(f"✅ Loaded {len(self.format_view)} {download_type} formats ({elapsed_ms:.1f} ms)")
 
+    def render_format_rows(self):
+        """Bind the pooled row widgets to the visible slice of the current view"""
+        total = len(self.format_view)
+        self.format_offset = max(0, min(self.format_offset, total - FORMAT_ROWS_VISIBLE))
+        selected = self.selected_format.get()
+
+        if total:
+            self.format_empty_label.pack_forget()
+        else:
+            self.format_empty_label.configure(text=f"❌ No {self.download_type.get()} formats found")
+            self.format_empty_label.pack(pady=20)
+
+        for i, row in enumerate(self.format_rows):
+            index = self.format_offset + i
+            if index < total:
+                format_id, title, details = self.format_view[index]
+                row["radio"].configure(value=format_id)
+                if format_id == selected:
+                    row["radio"].select(from_variable_callback=True)
+                else:
+                    row["radio"].deselect(from_variable_callback=True)
+                row["id_label"].configure(text=title)
+                row["quality_label"].configure(text=details)
+                if not row["visible"]:
+                    row["frame"].pack(fill="x", padx=5, pady=5)
+                    row["visible"] = True
+            elif row["visible"]:
+                row["frame"].pack_forget()
+                row["visible"] = False
+
+        if total > FORMAT_ROWS_VISIBLE:
+            self.format_scrollbar.set(self.format_offset / total,
+                                      (self.format_offset + FORMAT_ROWS_VISIBLE) / total)
+        else:
+            self.format_scrollbar.set(0, 1)
+
+    def on_format_scroll(self, action, value, unit=None):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', steps, 'units')"""
+        if action == 'moveto':
+            self.format_offset = int(float(value) * len(self.format_view) + 0.5)
+        else:
+            self.format_offset += int(value)
+        self.render_format_rows()
+
+    def on_format_wheel(self, event):
+        """Scroll the format list by one row per wheel step"""
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            self.format_offset -= 1
+        else:
+            self.format_offset += 1
+        self.render_format_rows()
+        return "break"
 
     def on_download_type_change(self):
         """Handle download type change"""
@@ -839,133 +1337,262 @@ class ModernYouTubeDownloader:
             messagebox.showerror("Error", "Output directory does not exist")
             return
         
-        # Reset progress state
-        self.progress_bar.set(0)
-        self.progress_text.configure(text="Starting download...")
-        
-        # Show progress frame and disable download button
-        self.download_btn.configure(state="disabled", text="⏳ Downloading...")
-        self.progress_frame.pack(fill="x", pady=(0, 20))
-        
         url = self.url_var.get().strip()
         format_id = self.selected_format.get()
         output_dir = self.output_dir.get()
-        
-        self.log_output(f"🚀 Starting download - Format: {format_id}")
-        
-        def download_thread():
+        title = (self.video_info or {}).get('title') or url
+
+        found = self.archive.find(info_video_key(self.video_info) if self.video_info else url,
+                                  self.download_type.get(), format_id)
+        if found and not messagebox.askyesno(
+                "Already downloaded", f"This format was already downloaded to:\n{found[1]}\n\nDownload it again?"):
+            return
+
+        self.progress_frame.pack(fill="x", pady=(0, 20))
+
+        job = DownloadJob(
+            url,
+            download_options(self.download_type.get(), format_id, output_dir,
+                             sub_langs=self.subtitle_languages()),
+            title=title,
+            engine_factory=self.engine_class(),
+            info=self.video_info or None
+        )
+        self.log_output(f"🚀 Queued download #{job.id} - Format: {format_id}")
+        self.download_queue.submit(job)
+
+    def quick_download(self):
+        """Pick a format by policy and queue the download without listing formats"""
+        url = self.url_var.get().strip()
+        if not url:
+            messagebox.showerror("Error", "Please enter a valid YouTube URL")
+            return
+        if is_playlist_url(url):
+            messagebox.showerror("Error", "Use Fetch Info to pick the playlist entries to download")
+            return
+        if not os.path.exists(self.output_dir.get()):
+            messagebox.showerror("Error", "Output directory does not exist")
+            return
+
+        policy = FormatPolicy(**QUICK_QUALITIES[self.quick_quality_var.get()],
+                              **QUICK_CODECS[self.quick_codec_var.get()])
+        download_type = self.download_type.get()
+        output_dir = self.output_dir.get()
+        engine_factory = self.engine_class()
+        sub_langs = self.subtitle_languages()
+        self.progress_frame.pack(fill="x", pady=(0, 20))
+        self.log_output(f"⚡ Quick download ({policy.describe()}): {url}")
+
+        def work():
+            start = time.perf_counter()
             try:
-                # Build command
-                cmd = ['yt-dlp']
-
-                if self.download_type.get() == "video":
-                    # Use selected video format ID + best audio
-                    # This handles cases where format IDs are not numeric
-                    selected_format = format_id
-                    format_string = f"{selected_format}+bestaudio/best"
-                    cmd += ['-f', format_string]
-                else:  # audio download
-                    cmd += ['-f', 'bestaudio', '--extract-audio', '--audio-format', 'mp3']
-                
-                # Common options
-                cmd += [
-                    '--embed-subs',
-                    '--sub-langs', 'all',
-                    '--embed-metadata',
-                    '--embed-thumbnail',
-                    '-o', os.path.join(output_dir, '%(title)s.%(ext)s'),
-                   url
-                ]
-
-                
-                # Start download process
-                self.current_process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-                )
-                
-                # Read output
-                for line in iter(self.current_process.stdout.readline, ''):
-                    if line:
-                        self.root.after(0, lambda l=line: self.log_output(l.strip()))
-                        # Update progress if possible
-                        if '%' in line:
-                            try:
-                                percent = re.search(r'(\d+(?:\.\d+)?)%', line)
-                                if percent:
-                                    progress = float(percent.group(1)) / 100
-                                    self.root.after(0, lambda p=progress: self.progress_bar.set(p))
-                                    self.root.after(0, lambda l=line: self.progress_text.configure(text=l.strip()))
-                            except:
-                                pass
-                
-                self.current_process.stdout.close()
-                return_code = self.current_process.wait()
-                
-                if return_code == 0:
-                    self.root.after(0, self.download_success)
-                else:
-                    self.root.after(0, self.download_failed)
-                    
+                entry = self.metadata_cache.fetch(url, lambda url: engine_factory().extract_info(url))
+                info, formats_data = entry['info'], entry['formats_data']
             except Exception as e:
-                self.root.after(0, lambda: self.download_error(str(e)))
-            finally:
-                # Always cleanup
-                self.root.after(0, self.cleanup_download)
-        
-        threading.Thread(target=download_thread, daemon=True).start()
+                self.events.post_log(f"❌ Could not fetch {url}: {e}")
+                return
+
+            choice = policy.select(formats_data, download_type)
+            if choice is None:
+                self.events.post_log(f"❌ No format of {info.get('title') or url} fits {policy.describe()}")
+                return
+            found = self.archive.find(info_video_key(info), download_type, choice['format_id'])
+            if found:
+                self.events.post_log(f"⏭️ Already downloaded: {found[1]}")
+                return
+
+            job = DownloadJob(
+                info.get('webpage_url') or url,
+                download_options(download_type, choice['format_id'], output_dir, choice['audio_id'], sub_langs),
+                title=info.get('title') or url,
+                engine_factory=engine_factory,
+                info=info
+            )
+            job.add_stage("resolve", time.perf_counter() - start)
+            self.events.post_log(f"🎯 Picked {choice['reason']}")
+            self.download_queue.submit(job)
+
+        self.workers.submit(work)
+
+    def subtitle_languages(self):
+        """Return the chosen subtitle languages, creating the subtitle fetcher on first use"""
+        if self.subtitle_fetcher is None:
+            from yt_subtitles import SubtitleFetcher
+            self.subtitle_fetcher = SubtitleFetcher()
+            self.download_queue.set_subtitle_fetcher(self.subtitle_fetcher)
+        return SUBTITLE_CHOICES[self.subtitles_var.get()]
+
+    def on_parallel_change(self, value):
+        """Change the number of parallel downloads, from any site or from one"""
+        # The GUI has one selector for both limits, so a playlist from one
+        # site runs as many downloads in parallel as the selector shows
+        self.download_queue.set_max_workers(int(value))
+        self.download_queue.set_max_per_host(int(value))
+        self.log_output(f"⚙️ Parallel downloads: {value}")
+
+    def on_rate_limit_change(self, value):
+        """Apply a new global speed limit to running and future downloads"""
+        rate_limit = None if value == "Unlimited" else parse_rate(value.split()[0] + "M")
+        self.download_queue.set_rate_limit(rate_limit)
+        self.log_output(f"🚦 Speed limit: {value}")
+
+    def on_adaptive_fragments_change(self):
+        """Turn tuned concurrent fragment downloads on or off for jobs started from now on"""
+        enabled = self.adaptive_fragments_var.get()
+        self.download_queue.set_fragment_tuner(self.fragment_tuner if enabled else None)
+        self.log_output(f"⚡ Parallel fragments: {'adaptive' if enabled else 'off'}")
+
+    def on_pipeline_change(self):
+        """Run post-processing of jobs started from now on as a separate pipeline stage, or inline"""
+        enabled = self.pipeline_var.get()
+        self.download_queue.set_postprocess_workers(DEFAULT_POSTPROCESS_WORKERS if enabled else 0)
+        if enabled:
+            self.log_output(f"🧵 Post-processing on {DEFAULT_POSTPROCESS_WORKERS} separate workers")
+        else:
+            self.log_output("🧵 Post-processing inside each download")
+
+    def on_job_update(self, job):
+        """Reflect a job's state in its row and the overall progress display"""
+        row = self.job_rows.get(job.id)
+        if row is None:
+            if not job.is_active:
+                return
+            self.add_job_row(job)
+            row = self.job_rows[job.id]
+
+        row["bar"].set(job.progress)
+        row["status"].configure(text=job.progress_text)
+        if not job.is_active and not row["done"]:
+            row["done"] = True
+            row["cancel"].configure(state="disabled")
+            if job.status == "finished":
+                self.download_success(job)
+            elif job.status == "failed":
+                if job.error:
+                    self.download_error(job, job.error)
+                else:
+                    self.download_failed(job)
+            elif job.status == "cancelled":
+                self.log_output(f"❌ Download #{job.id} cancelled by user")
+            self.workers.submit(self.write_job_report, job)
 
-    def download_success(self):
-        """Handle successful download completion"""
-        self.progress_bar.set(1)
-        self.progress_text.configure(text="✅ Download completed successfully!")
-        self.log_output("✅ Download completed successfully!")
-        messagebox.showinfo("Success", "Download completed successfully!")
+        self.update_overall_progress()
 
-    def download_failed(self):
+    def write_job_report(self, job):
+        """Append the stage summary of an ended job and refresh the metrics file"""
+        try:
+            (app_cache_dir() / 'logs').mkdir(parents=True, exist_ok=True)
+            with open(app_cache_dir() / 'logs' / 'jobs.jsonl', 'a', encoding='utf-8') as f:
+                f.write(json.dumps(job.summary()) + "\n")
+            write_file_atomic(app_cache_dir() / 'metrics.prom',
+                              self.download_queue.prometheus() + self.ui_timings.prometheus("ytdl_ui"))
+        except OSError as e:
+            self.events.post_log(f"⚠️ Could not write job metrics: {e}")
+
+    def update_overall_progress(self):
+        """Show the average progress of all queued and running jobs"""
+        active = self.download_queue.active_jobs()
+        if not active:
+            return
+        pipeline = self.download_queue.pipeline()
+        self.progress_bar.set(sum(job.progress for job in active) / len(active))
+        text = f"{pipeline['download']['active']} downloading, {pipeline['download']['queued']} queued"
+        postprocess = pipeline['postprocess']
+        if postprocess['active'] or postprocess['queued']:
+            text += f" • ⚙️ {postprocess['active']} post-processing, {postprocess['queued']} waiting"
+        speed = self.download_queue.throughput()
+        if speed:
+            text += f" • {format_bytes(speed)}/s"
+        self.progress_text.configure(text=text)
+
+    def download_success(self, job):
+        """Handle successful download completion"""
+        self.log_output(f"✅ Download #{job.id} completed successfully!")
+        if self.download_queue.is_idle():
+            self.progress_bar.set(1)
+            self.progress_text.configure(text="✅ Download completed successfully!")
+            messagebox.showinfo("Success", "Download completed successfully!")
+            self.root.after(3000, self.reset_progress_display)
+
+    def download_failed(self, job):
         """Handle failed download"""
-        self.progress_text.configure(text="❌ Download failed")
-        self.log_output("❌ Download failed")
+        self.log_output(f"❌ Download #{job.id} failed")
+        if self.download_queue.is_idle():
+            self.progress_text.configure(text="❌ Download failed")
+            self.root.after(3000, self.reset_progress_display)
 
-    def download_error(self, error_msg):
+    def download_error(self, job, error_msg):
         """Handle download error"""
-        self.log_output(f"❌ Download error: {error_msg}")
-        self.progress_text.configure(text="❌ Download failed")
-
-    def cleanup_download(self):
-        """Clean up after download completion"""
-        self.download_btn.configure(state="normal", text="⬇️ Start Download")
-        self.current_process = None
-        # Reset progress after a short delay
-        self.root.after(3000, self.reset_progress_display)
+        self.log_output(f"❌ Download #{job.id} error: {error_msg}")
+        if self.download_queue.is_idle():
+            self.progress_text.configure(text="❌ Download failed")
+            self.root.after(3000, self.reset_progress_display)
 
     def reset_progress_display(self):
         """Reset progress display after download"""
-        if self.current_process is None:  # Only reset if no download is running
+        if self.download_queue.is_idle():  # Only reset if no download is running
             self.progress_bar.set(0)
             self.progress_text.configure(text="Ready to download...")
 
-    def cancel_download(self):
-        """Cancel the current download"""
-        if self.current_process:
-            try:
-                self.current_process.terminate()
-                self.current_process.wait(timeout=5)  # Wait up to 5 seconds for process to terminate
-            except subprocess.TimeoutExpired:
-                self.current_process.kill()  # Force kill if it doesn't terminate
-            except Exception as e:
-                self.log_output(f"Error cancelling download: {str(e)}")
-            finally:
-                self.current_process = None
-                self.progress_text.configure(text="❌ Download cancelled")
-                self.log_output("❌ Download cancelled by user")
-                self.download_btn.configure(state="normal", text="⬇️ Start Download")
-    
+    def cancel_download(self, job_id=None):
+        """Cancel one download, or every queued and running download"""
+        try:
+            if job_id is None:
+                self.download_queue.cancel_all()
+            else:
+                self.download_queue.cancel(job_id)
+        except Exception as e:
+            self.log_output(f"Error cancelling download: {str(e)}")
+
+    def clear_finished_jobs(self):
+        """Remove rows of jobs that are no longer queued or running"""
+        for job_id in self.download_queue.remove_finished():
+            row = self.job_rows.pop(job_id, None)
+            if row:
+                row["frame"].destroy()
+
+    def resume_jobs(self):
+        """Re-queue downloads that were unfinished when the app last stopped.
+
+        yt-dlp picks up the .part files it left behind, so only the missing
+        bytes are downloaded again.
+        """
+        try:
+            entries = self.journal.unfinished()
+            self.journal.compact()
+        except sqlite3.Error as e:
+            self.log_output(f"⚠️ Could not read the job journal: {e}")
+            return
+        if not entries:
+            return
+
+        self.progress_frame.pack(fill="x", pady=(0, 20))
+        self.log_output(f"🔁 Resuming {len(entries)} unfinished download(s) from the last session")
+        engine_class = self.engine_class()
+        for entry in entries:
+            job = DownloadJob(entry["url"], entry["options"], title=entry["title"],
+                              engine_factory=engine_class, key=entry["key"])
+            if entry["bytes_done"]:
+                self.log_output(f"   #{job.id} {job.title}: {format_bytes(entry['bytes_done'])} already downloaded")
+            self.download_queue.submit(job)
+
+    def on_close(self):
+        """Stop running downloads but keep them in the journal for the next start"""
+        # Closed first on purpose: the cancellations below must not be journaled, or the
+        # jobs would not be resumed. A closed journal ignores the late job callbacks.
+        self.closing = True
+        self.journal.close()
+        self.archive.close()
+        self.download_queue.cancel_all()
+        # Pool threads are joined at exit, so stop the extractions that could still take long
+        if self.playlist_engine:
+            self.playlist_engine.cancel()
+        if self.prefetch:
+            self.prefetch[1].cancel()
+        self.workers.shutdown(wait=False, cancel_futures=True)
+        self.playlist_resolver.shutdown()
+        self.root.destroy()
+
     def run(self):
         """Start the application"""
         self.root.mainloop()
@@ -973,8 +1600,19 @@ class ModernYouTubeDownloader:
 def main():
     """Main function to run the application"""
     try:
+        profile_path = os.environ.get(PROFILE_ENV_VAR)
+        if profile_path:
+            import cProfile
+            # Tk runs every callback on this thread, so only the UI is profiled
+            profiler = cProfile.Profile()
+            profiler.enable()
         app = ModernYouTubeDownloader()
-        app.run()
+        try:
+            app.run()
+        finally:
+            if profile_path:
+                profiler.disable()
+                profiler.dump_stats(profile_path)
     except Exception as e:
         print(f"Error starting application: {str(e)}")
         messagebox.showerror("Error", f"Error starting application: {str(e)}")
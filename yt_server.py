@@ -0,0 +1,490 @@
+"""Local HTTP job API.
+
+Serves the download queue on 127.0.0.1 so other tools can submit and
+watch downloads without the GUI. Jobs go through the same DownloadJob,
+DownloadQueue and FormatPolicy machinery as the GUI and yt_cli.py; one
+asyncio loop serves any number of progress watchers.
+
+    python yt_server.py --port 8770 -o ~/Downloads
+
+    POST   /jobs               {"url": ..., "type": "video" | "audio", "format": ID,
+                                "policy": {"max_height": 1080, "codecs": ["avc1"], ...},
+                                "sub_langs": ["en", "pt-BR"]}
+    GET    /jobs               all jobs
+    GET    /jobs/<id>          one job
+    GET    /jobs/<id>/summary  wall time, bytes and status of each stage of a job
+    DELETE /jobs/<id>          cancel a job
+    GET    /jobs/<id>/events   progress of one job as Server-Sent Events
+    GET    /events             progress of every job as Server-Sent Events
+    GET    /metrics            queue state and stage timings in the Prometheus text format
+
+Pass --yt-dlp to run a different yt-dlp executable, e.g. a stub that
+needs no network.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from yt_core import (
+    DEFAULT_MAX_PER_HOST,
+    DEFAULT_PARALLEL_DOWNLOADS,
+    DEFAULT_POSTPROCESS_WORKERS,
+    DEFAULT_SUBTITLE_LANGUAGES,
+    BandwidthGovernor,
+    DownloadArchive,
+    DownloadJob,
+    DownloadQueue,
+    FormatPolicy,
+    FragmentTuner,
+    MetadataCache,
+    PlaylistResolver,
+    SubprocessEngine,
+    download_options,
+    engine_class_for,
+    formats_from_info,
+    info_video_key,
+    is_playlist_url,
+    parse_languages,
+    parse_rate,
+)
+
+DEFAULT_PORT = 8770
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 64 * 1024
+
+# Ended jobs kept for GET /jobs; older ones are forgotten
+MAX_FINISHED_JOBS = 200
+
+# Comment lines sent to idle event streams so proxies and clients keep them open
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class HttpError(Exception):
+    """Raised by request handlers to answer with an error status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class JobServer:
+    """Owns the download queue and the job snapshots served over HTTP.
+
+    Worker threads only mark jobs as changed; the event loop turns each
+    changed job into one JSON snapshot per loop iteration and wakes the
+    watchers of that job through an asyncio.Event, so a burst of
+    progress ticks costs one serialisation no matter how many clients
+    are watching, and a slow watcher simply skips to the newest state.
+    """
+
+    def __init__(self, output_dir, engine_factory, max_workers=DEFAULT_PARALLEL_DOWNLOADS,
+                 governor=None, archive=None, cache=None, postprocess_workers=0,
+                 sub_langs=DEFAULT_SUBTITLE_LANGUAGES, max_finished=MAX_FINISHED_JOBS):
+        self.output_dir = output_dir
+        self.sub_langs = sub_langs  # Default subtitle languages of submitted jobs
+        self.engine_factory = engine_factory
+        self.archive = archive
+        self.cache = cache or MetadataCache()
+        self.resolver = PlaylistResolver(self.cache, max_workers=max_workers)
+        self.queue = DownloadQueue(
+            max_workers=max_workers,
+            on_update=self.job_changed,
+            governor=governor,
+            fragment_tuner=FragmentTuner(),
+            archive=archive,
+            postprocess_workers=postprocess_workers
+        )
+        self.jobs = {}  # Job id -> DownloadJob, including jobs still being resolved; ended ones up to max_finished
+        self.max_finished = max_finished
+        self.snapshots = {}  # Job id -> latest JSON snapshot
+        self.versions = {}  # Job id -> number of snapshots published
+        self.changed = {}  # Job id -> asyncio.Event set when its next snapshot is published
+        self.any_changed = None  # Same for every job, used by /events
+        self.loop = None
+        self.lock = threading.Lock()
+        self.dirty = {}
+
+    def start(self, loop):
+        self.loop = loop
+        self.any_changed = asyncio.Event()
+
+    # Called from any thread
+
+    def job_changed(self, job):
+        """Mark a job as changed; the loop publishes it on its next iteration"""
+        with self.lock:
+            schedule = not self.dirty
+            self.dirty[job.id] = job
+        if schedule:
+            self.loop.call_soon_threadsafe(self._publish)
+
+    # Called on the event loop
+
+    def _publish(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, {}
+        for job_id, job in dirty.items():
+            if job_id not in self.jobs:
+                continue  # Forgotten while the change was pending
+            self.snapshots[job_id] = json.dumps(job_snapshot(job))
+            self.versions[job_id] = self.versions.get(job_id, 0) + 1
+            event = self.changed.pop(job_id, None)
+            if event:
+                event.set()
+        self.any_changed.set()
+        self.any_changed = asyncio.Event()
+        self._forget_finished()
+
+    def _forget_finished(self):
+        """Drop the oldest ended jobs beyond max_finished from the server and the queue"""
+        ended = [job_id for job_id, job in self.jobs.items() if not job.is_active]
+        forgotten = ended[:max(0, len(ended) - self.max_finished)]
+        for job_id in forgotten:
+            del self.jobs[job_id]
+            self.snapshots.pop(job_id, None)
+            self.versions.pop(job_id, None)
+            event = self.changed.pop(job_id, None)
+            if event:
+                event.set()
+        if forgotten:
+            self.queue.remove_finished(set(forgotten))
+
+    def submit(self, request):
+        """Create a job for a submit request and resolve it in the background"""
+        url = request.get('url')
+        if not isinstance(url, str) or '://' not in url:
+            raise HttpError(400, "'url' must be an absolute URL")
+        if is_playlist_url(url):
+            raise HttpError(400, "playlists are not supported; submit their entries")
+        download_type = request.get('type', 'video')
+        if download_type not in ('video', 'audio'):
+            raise HttpError(400, "'type' must be 'video' or 'audio'")
+        output_dir = request.get('output_dir') or self.output_dir
+        if not os.path.isdir(output_dir):
+            raise HttpError(400, f"output directory does not exist: {output_dir}")
+        try:
+            policy = policy_from_json(request.get('policy') or {})
+        except (TypeError, ValueError) as e:
+            raise HttpError(400, f"invalid policy: {e}")
+        sub_langs = request.get('sub_langs', self.sub_langs)
+        if not isinstance(sub_langs, (list, tuple)) or not all(isinstance(lang, str) for lang in sub_langs):
+            raise HttpError(400, "'sub_langs' must be a list of language codes")
+
+        format_id = request.get('format')
+        job = DownloadJob(url, download_options(download_type, format_id or "bestvideo", output_dir,
+                                                sub_langs=sub_langs),
+                          engine_factory=self.engine_factory)
+        job.progress_text = "Resolving..."
+        self.jobs[job.id] = job
+        self.job_changed(job)
+        started = time.perf_counter()
+
+        def on_resolved(entry, info):
+            # Includes the wait for a free resolver thread
+            job.add_stage("resolve", time.perf_counter() - started)
+            self._queue_resolved(job, info, download_type, format_id, policy, output_dir, sub_langs)
+
+        def on_error(entry, error):
+            job.add_stage("resolve", time.perf_counter() - started, status="failed")
+            job.status = "failed"
+            job.error = str(error)
+            job.progress_text = f"Error: {error}"
+            self.job_changed(job)
+
+        self.resolver.resolve({'url': url}, self.engine_factory, on_resolved, on_error)
+        return job
+
+    def _queue_resolved(self, job, info, download_type, format_id, policy, output_dir, sub_langs):
+        """Pick the format of a resolved job and hand it to the queue (resolver thread)"""
+        job.info = info
+        job.title = info.get('title') or job.url
+        audio_id = None
+        if not format_id:
+            choice = policy.select(formats_from_info(info), download_type)
+            if choice:
+                format_id, audio_id = choice['format_id'], choice['audio_id']
+                job.progress_text = f"Picked {choice['reason']}"
+            elif info.get('formats'):
+                job.status = "failed"
+                job.error = f"no format fits the policy ({policy.describe()})"
+                job.progress_text = f"Error: {job.error}"
+                self.job_changed(job)
+                return
+        job.options = download_options(download_type, format_id or "bestvideo", output_dir, audio_id, sub_langs)
+
+        found = self.archive.find(info_video_key(info), download_type, format_id) if self.archive else None
+        if job.cancelled.is_set():
+            job.status = "cancelled"
+            job.progress_text = "Cancelled"
+        elif found:
+            job.status = "finished"
+            job.progress = 1.0
+            job.filepath = found[1]
+            job.progress_text = "Already downloaded"
+        else:
+            if sub_langs:
+                self._use_subtitle_fetcher()
+            self.queue.submit(job)
+            return
+        self.job_changed(job)
+
+    def _use_subtitle_fetcher(self):
+        """Create the subtitle fetcher once the first job asks for subtitles"""
+        with self.lock:
+            if self.queue.subtitles is None:
+                # Imported here: requests adds a noticeable part to the startup time
+                from yt_subtitles import SubtitleFetcher
+                self.queue.set_subtitle_fetcher(SubtitleFetcher())
+
+    def cancel(self, job):
+        if job.id in self.queue.jobs:
+            self.queue.cancel(job.id)
+        elif job.is_active:
+            # Still resolving; _queue_resolved sees the flag
+            job.cancel()
+
+    async def watch(self, job_id):
+        """Yield the snapshots of one job as they change, ending once it is done"""
+        seen = 0
+        while True:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return  # Forgotten after it ended
+            if self.versions.get(job_id, 0) == seen:
+                event = self.changed.setdefault(job_id, asyncio.Event())
+                try:
+                    await asyncio.wait_for(event.wait(), SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield None
+                continue
+            seen = self.versions[job_id]
+            yield self.snapshots[job_id]
+            if not job.is_active:
+                return
+
+    async def watch_all(self):
+        """Yield every changed job snapshot, forever"""
+        seen = dict(self.versions)
+        # Collected before yielding: jobs may be forgotten while the client reads
+        for snapshot in [self.snapshots[job_id] for job_id in seen]:
+            yield snapshot
+        while True:
+            try:
+                await asyncio.wait_for(self.any_changed.wait(), SSE_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            changed = [job_id for job_id, version in self.versions.items() if seen.get(job_id) != version]
+            seen = {job_id: self.versions[job_id] for job_id in self.versions}
+            for snapshot in [self.snapshots[job_id] for job_id in changed]:
+                yield snapshot
+
+
+def job_snapshot(job):
+    """Return the JSON-serialisable state of a job served by the API"""
+    snapshot = job.to_dict()
+    snapshot["format"] = job.options.get('format')
+    return snapshot
+
+
+def policy_from_json(data):
+    """Build a FormatPolicy from the 'policy' object of a submit request.
+
+    Raises ValueError (or TypeError for unknown fields) on invalid input,
+    so a bad policy is rejected at submit instead of failing the job later.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("expected an object")
+    data = dict(data)
+    if isinstance(data.get('max_filesize'), str):
+        data['max_filesize'] = parse_rate(data['max_filesize'])
+    for name, types in (('max_height', int), ('max_fps', (int, float)), ('max_filesize', int)):
+        value = data.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, types) or value <= 0):
+            raise ValueError(f"'{name}' must be a positive number")
+    codecs = data.get('codecs', [])
+    if not isinstance(codecs, list) or not all(isinstance(codec, str) for codec in codecs):
+        raise ValueError("'codecs' must be a list of codec names")
+    if data.get('container') not in (None, 'mp4', 'webm'):
+        raise ValueError("'container' must be 'mp4' or 'webm'")
+    return FormatPolicy(**data)
+
+
+async def read_request(reader):
+    """Read one HTTP request; returns (method, path, body) or None at EOF"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            value = value.strip()
+            if not value.isdigit():
+                raise HttpError(400, "invalid Content-Length")
+            length = int(value)
+    if length > MAX_BODY_SIZE:
+        raise HttpError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0].rstrip('/') or '/', body
+
+
+def response_bytes(status, payload, content_type="application/json"):
+    body = payload.encode('utf-8') if isinstance(payload, str) else json.dumps(payload).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def stream_events(writer, snapshots):
+    """Send snapshots from an async iterator as Server-Sent Events"""
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                 b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    async for snapshot in snapshots:
+        if snapshot is None:
+            writer.write(b": keepalive\n\n")
+        else:
+            writer.write(b"event: job\ndata: " + snapshot.encode('utf-8') + b"\n\n")
+        await writer.drain()
+
+
+async def handle_connection(server, reader, writer):
+    """Serve one request per connection; event streams stay open until their job is done"""
+    try:
+        try:
+            request = await read_request(reader)
+            if request is None:
+                return
+            method, path, body = request
+            parts = path.strip('/').split('/')
+
+            if parts == ['jobs'] and method == 'POST':
+                try:
+                    data = json.loads(body or b'{}')
+                except ValueError:
+                    raise HttpError(400, "body must be JSON")
+                if not isinstance(data, dict):
+                    raise HttpError(400, "body must be a JSON object")
+                job = server.submit(data)
+                writer.write(response_bytes(202, job_snapshot(job)))
+            elif parts == ['jobs'] and method == 'GET':
+                writer.write(response_bytes(200, [job_snapshot(job) for job in list(server.jobs.values())]))
+            elif parts == ['metrics'] and method == 'GET':
+                writer.write(response_bytes(200, server.queue.prometheus(),
+                                            "text/plain; version=0.0.4; charset=utf-8"))
+            elif parts == ['events'] and method == 'GET':
+                await stream_events(writer, server.watch_all())
+            elif len(parts) in (2, 3) and parts[0] == 'jobs':
+                job = server.jobs.get(int(parts[1])) if parts[1].isdigit() else None
+                if job is None:
+                    raise HttpError(404, "no such job")
+                if len(parts) == 3 and parts[2] == 'events' and method == 'GET':
+                    await stream_events(writer, server.watch(job.id))
+                elif len(parts) == 3 and parts[2] == 'summary' and method == 'GET':
+                    writer.write(response_bytes(200, job.summary()))
+                elif len(parts) == 2 and method == 'GET':
+                    writer.write(response_bytes(200, job_snapshot(job)))
+                elif len(parts) == 2 and method == 'DELETE':
+                    server.cancel(job)
+                    writer.write(response_bytes(202, job_snapshot(job)))
+                else:
+                    raise HttpError(405 if len(parts) == 2 else 404, "unsupported request")
+            else:
+                raise HttpError(404, "unknown endpoint")
+        except HttpError as e:
+            writer.write(response_bytes(e.status, {"error": str(e)}))
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass  # Client went away
+    finally:
+        writer.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Serve the download queue as a local HTTP API with Server-Sent-Events progress."
+    )
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on (127.0.0.1 only)")
+    parser.add_argument('-o', '--output-dir', default=str(Path.home() / "Downloads"),
+                        help="Default output directory")
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_PARALLEL_DOWNLOADS,
+                        help="Number of parallel downloads")
+    parser.add_argument('-r', '--limit-rate', type=parse_rate, metavar='RATE',
+                        help="Bandwidth budget for all jobs together, e.g. 500K or 4.2M")
+    parser.add_argument('--max-per-host', type=int, default=DEFAULT_MAX_PER_HOST, metavar='N',
+                        help="Maximum number of parallel downloads from one site")
+    parser.add_argument('--postprocess-workers', type=int, nargs='?', const=DEFAULT_POSTPROCESS_WORKERS, default=0,
+                        metavar='N', help="Merge and convert on N separate workers while downloads continue "
+                                          "(without N: one per CPU core, at least 2; 0: inside each download)")
+    parser.add_argument('--sub-langs', type=parse_languages, default=','.join(DEFAULT_SUBTITLE_LANGUAGES),
+                        metavar='LANGS', help="Default subtitle languages of jobs, e.g. en,pt-BR; 'none' or 'all' "
+                                              "(default: %(default)s)")
+    parser.add_argument('--engine', choices=['auto', 'in-process', 'subprocess'], default='auto',
+                        help="How yt-dlp is driven")
+    parser.add_argument('--yt-dlp', metavar='PATH',
+                        help="yt-dlp executable to run (implies --engine subprocess)")
+    parser.add_argument('--no-cache', action='store_true', help="Do not use the metadata cache")
+    parser.add_argument('--no-archive', action='store_true',
+                        help="Download videos again even if the archive lists them as downloaded")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.isdir(args.output_dir):
+        build_parser().error(f"output directory does not exist: {args.output_dir}")
+
+    if args.yt_dlp:
+        engine_factory = functools.partial(SubprocessEngine, args.yt_dlp)
+    else:
+        engine_factory = engine_class_for(args.engine)
+    server = JobServer(
+        args.output_dir,
+        engine_factory,
+        max_workers=max(1, args.jobs),
+        governor=BandwidthGovernor(args.limit_rate, max(1, args.max_per_host)),
+        archive=None if args.no_archive else DownloadArchive(),
+        cache=MetadataCache(enabled=not args.no_cache),
+        postprocess_workers=max(0, args.postprocess_workers),
+        sub_langs=args.sub_langs
+    )
+
+    async def serve():
+        server.start(asyncio.get_running_loop())
+        listener = await asyncio.start_server(functools.partial(handle_connection, server),
+                                              '127.0.0.1', args.port)
+        print(f"🌐 Serving the job API on http://127.0.0.1:{args.port}", flush=True)
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        server.queue.cancel_all()
+        server.queue.wait(timeout=10)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
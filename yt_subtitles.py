@@ -0,0 +1,171 @@
+"""Subtitle fetching for downloads: picks the tracks a language policy asks
+for from an already extracted info dict, downloads them in parallel over a
+pooled HTTP session and keeps them in an on-disk cache keyed by video ID.
+
+yt-dlp then receives the tracks inline and only embeds them, instead of
+requesting every subtitle and caption of the video itself.
+"""
+
+import hashlib
+import re
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from yt_core import DiskLRU, app_cache_dir, format_bytes, info_video_key
+
+SUBTITLE_WORKERS = 4
+SUBTITLE_CACHE_MAX_VIDEOS = 200
+SUBTITLE_TIMEOUT = 15
+
+# Formats ffmpeg can embed, best first; YouTube also offers json3, srv1-3 and ttml
+SUBTITLE_FORMATS = ('vtt', 'srt', 'ass')
+
+# Subtitle hosts answer bursts with 429; back off and honour Retry-After
+SUBTITLE_RETRIES = 3
+SUBTITLE_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def subtitle_session(pool_size=SUBTITLE_WORKERS):
+    """Create a requests session that keeps connections open and retries throttled requests"""
+    session = requests.Session()
+    retry = Retry(total=SUBTITLE_RETRIES, backoff_factor=1, status_forcelist=SUBTITLE_RETRY_STATUSES,
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def pick_format(formats):
+    """Return the entry of a track's format list that ffmpeg embeds best"""
+    formats = [f for f in formats or [] if f.get('url') or f.get('data') is not None]
+    for ext in SUBTITLE_FORMATS:
+        matches = [f for f in formats if f.get('ext') == ext]
+        if matches:
+            return matches[-1]
+    return formats[-1] if formats else None
+
+
+def select_tracks(info, languages):
+    """Return one track per requested language that the video has.
+
+    Uploaded subtitles win over automatic captions: first the exact
+    language code, then regional variants such as en-US. Automatic
+    captions are only used in the original language ('en' or 'en-orig'),
+    never machine translations into other languages. Each track is a dict
+    with 'lang', 'ext', 'url', 'data' and 'automatic'.
+    """
+    subtitles = info.get('subtitles') or {}
+    captions = info.get('automatic_captions') or {}
+    original = info.get('language')
+
+    tracks = []
+    for language in languages:
+        candidates = [(subtitles, language, False)]
+        candidates += [(subtitles, key, False) for key in sorted(subtitles) if key.startswith(language + '-')]
+        if not original or original.split('-')[0] == language:
+            candidates += [(captions, language + '-orig', True), (captions, language, True)]
+        for source, key, automatic in candidates:
+            fmt = pick_format(source.get(key))
+            if fmt:
+                # Name captions after the language itself, 'en-orig' is not a language tag
+                tracks.append({"lang": language if automatic else key, "ext": fmt.get('ext') or 'vtt', "url": fmt.get('url'),
+                               "data": fmt.get('data'), "http_headers": fmt.get('http_headers'),
+                               "automatic": automatic})
+                break
+    return tracks
+
+
+class SubtitleFetcher:
+    """Downloads the subtitle tracks of videos on a small thread pool.
+
+    prepare() blocks until the tracks of one video are available and
+    returns a copy of its info dict that carries them inline. Tracks are
+    stored on disk per video, so downloading the same video again (at
+    another quality, or after a failed attempt) fetches nothing.
+    """
+
+    def __init__(self, directory=None, max_videos=SUBTITLE_CACHE_MAX_VIDEOS):
+        self.directory = Path(directory) if directory else app_cache_dir() / 'subtitles'
+        self.cache = DiskLRU(self.directory, max_videos)  # One entry per video
+        self.session = None
+        self.executor = ThreadPoolExecutor(max_workers=SUBTITLE_WORKERS, thread_name_prefix='subtitle')
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_downloaded = 0
+
+    def _video_dir(self, info):
+        return self.directory / hashlib.sha1(info_video_key(info).encode('utf-8')).hexdigest()
+
+    def _path(self, video_dir, track):
+        kind = 'auto' if track['automatic'] else 'manual'
+        name = re.sub(r'[^\w.-]', '_', track['lang'])
+        return video_dir / f"{name}.{kind}.{track['ext']}"
+
+    def prepare(self, info, languages, on_log=None):
+        """Fetch the tracks for languages; return (info, languages, bytes downloaded).
+
+        The returned info dict holds only the selected tracks, with their
+        text inline, and the returned languages name exactly those tracks
+        for yt-dlp's --sub-langs. Tracks that cannot be fetched are logged
+        and left out. 'all' leaves everything to yt-dlp.
+        """
+        if 'all' in languages:
+            return info, list(languages), 0
+        tracks = select_tracks(info, languages)
+        video_dir = self._video_dir(info)
+        futures = [self.executor.submit(self.get, video_dir, track, info.get('http_headers'))
+                   for track in tracks]
+
+        subtitles = {}
+        num_bytes = 0
+        for track, future in zip(tracks, futures):
+            try:
+                data, downloaded = future.result()
+            except (OSError, requests.RequestException) as e:
+                if on_log:
+                    on_log(f"⚠️ Skipping {track['lang']} subtitles: {e}")
+                continue
+            num_bytes += downloaded
+            subtitles[track['lang']] = [{"ext": track['ext'], "data": data}]
+
+        if subtitles:
+            self.cache.touch(video_dir)
+        info = dict(info, subtitles=subtitles, automatic_captions={})
+        return info, [re.escape(lang) for lang in subtitles], num_bytes
+
+    def get(self, video_dir, track, http_headers=None):
+        """Return (text, bytes downloaded) of a track, downloading it if needed"""
+        if track['data'] is not None:
+            return track['data'], 0
+
+        path = self._path(video_dir, track)
+        try:
+            data = path.read_bytes()
+            with self.lock:
+                self.hits += 1
+            return data.decode('utf-8', 'replace'), 0
+        except OSError:
+            pass
+
+        with self.lock:
+            self.misses += 1
+            if self.session is None:
+                self.session = subtitle_session()
+        headers = dict(http_headers or {}, **(track['http_headers'] or {}))
+        response = self.session.get(track['url'], headers=headers, timeout=SUBTITLE_TIMEOUT)
+        response.raise_for_status()
+        with self.lock:
+            self.bytes_downloaded += len(response.content)
+        self.cache.store(path, response.content)
+        return response.content.decode('utf-8', 'replace'), len(response.content)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "downloaded": format_bytes(self.bytes_downloaded)}
@@ -0,0 +1,170 @@
+"""Thumbnail loading for the preview: picks the smallest adequate source,
+downloads it over a pooled HTTP session and keeps the resized image in an
+on-disk cache keyed by video ID.
+"""
+
+import hashlib
+import re
+import threading
+from io import BytesIO
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+
+from yt_core import DiskLRU, app_cache_dir, format_bytes, info_video_key
+
+# Size of the preview in the GUI
+THUMBNAIL_SIZE = (320, 180)
+
+THUMBNAIL_WORKERS = 4
+THUMBNAIL_CACHE_MAX_ENTRIES = 500
+THUMBNAIL_TIMEOUT = 10
+
+# Sources tried before giving up, e.g. when maxresdefault does not exist
+THUMBNAIL_MAX_ATTEMPTS = 3
+
+# YouTube lists many thumbnails without dimensions; their names give them away
+YOUTUBE_THUMBNAIL_SIZES = {
+    'default': (120, 90),
+    'mqdefault': (320, 180),
+    'hqdefault': (480, 360),
+    'sddefault': (640, 480),
+    'hq720': (1280, 720),
+    'maxresdefault': (1280, 720),
+}
+YOUTUBE_THUMBNAIL_RE = re.compile(r'/vi(?:_webp)?/[^/]+/([a-z0-9]+?)(?:_live)?\.(?:jpg|webp)')
+
+
+def thumbnail_dimensions(thumbnail):
+    """Return (width, height) of a thumbnail entry, or None if unknown"""
+    if thumbnail.get('width') and thumbnail.get('height'):
+        return thumbnail['width'], thumbnail['height']
+    match = YOUTUBE_THUMBNAIL_RE.search(thumbnail.get('url') or '')
+    if match:
+        return YOUTUBE_THUMBNAIL_SIZES.get(match.group(1))
+    return None
+
+
+def thumbnail_candidates(info, size=THUMBNAIL_SIZE):
+    """Return thumbnail URLs of an info dict, best choice first.
+
+    The smallest image that still covers size comes first, then larger
+    ones, then smaller ones and finally entries of unknown size.
+    """
+    adequate, too_small, unknown = [], [], []
+    for thumbnail in info.get('thumbnails') or []:
+        if not thumbnail.get('url'):
+            continue
+        dimensions = thumbnail_dimensions(thumbnail)
+        if dimensions is None:
+            unknown.append((thumbnail.get('preference') or 0, thumbnail['url']))
+        elif dimensions[0] >= size[0] and dimensions[1] >= size[1]:
+            adequate.append((dimensions[0] * dimensions[1], thumbnail['url']))
+        else:
+            too_small.append((dimensions[0] * dimensions[1], thumbnail['url']))
+
+    urls = [url for _, url in sorted(adequate)]
+    urls += [url for _, url in sorted(too_small, reverse=True)]
+    urls += [url for _, url in sorted(unknown, reverse=True)]
+    if info.get('thumbnail'):
+        urls.append(info['thumbnail'])
+    return list(dict.fromkeys(urls))
+
+
+def http_session(pool_size=THUMBNAIL_WORKERS):
+    """Create a requests session that keeps connections open between requests"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ThumbnailLoader:
+    """Loads resized thumbnails on a small thread pool.
+
+    load() returns at once; the callback later receives a PIL image that
+    already has the preview size, or None and an error message. Results
+    are stored on disk, so a video's thumbnail is downloaded only once.
+    """
+
+    def __init__(self, directory=None, size=THUMBNAIL_SIZE, max_entries=THUMBNAIL_CACHE_MAX_ENTRIES):
+        self.directory = Path(directory) if directory else app_cache_dir() / 'thumbnails'
+        self.size = size
+        self.cache = DiskLRU(self.directory, max_entries)
+        self.session = http_session()
+        self.executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS,
+                                           thread_name_prefix='thumbnail')
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_downloaded = 0
+
+    def _path(self, info):
+        key = f"{info_video_key(info)}:{self.size[0]}x{self.size[1]}"
+        return self.directory / (hashlib.sha1(key.encode('utf-8')).hexdigest() + '.jpg')
+
+    def load(self, info, callback):
+        """Load the thumbnail of an info dict; callback(image, error) runs on a worker thread"""
+        def work():
+            try:
+                callback(self.get(info), None)
+            except Exception as e:
+                callback(None, str(e))
+
+        return self.executor.submit(work)
+
+    def get(self, info):
+        """Return the resized thumbnail of an info dict, downloading it if needed"""
+        path = self._path(info)
+        try:
+            image = Image.open(path)
+            image.load()
+            self.cache.touch(path)
+            with self.lock:
+                self.hits += 1
+            return image
+        except OSError:
+            pass
+
+        with self.lock:
+            self.misses += 1
+        image = self.download(thumbnail_candidates(info, self.size))
+        self._store(path, image)
+        return image
+
+    def download(self, urls):
+        """Download and resize the first of urls that works"""
+        errors = []
+        for url in urls[:THUMBNAIL_MAX_ATTEMPTS]:
+            try:
+                response = self.session.get(url, timeout=THUMBNAIL_TIMEOUT)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                errors.append(str(e))
+                continue
+            with self.lock:
+                self.bytes_downloaded += len(response.content)
+            return self.decode(response.content)
+        raise OSError(errors[-1] if errors else "No thumbnail available")
+
+    def decode(self, data):
+        """Decode image bytes straight to about the preview size"""
+        image = Image.open(BytesIO(data))
+        # Let the JPEG decoder scale down by 1/2, 1/4 or 1/8 while decoding
+        image.draft('RGB', self.size)
+        # Maintain aspect ratio; reduce() does the coarse part of the scaling
+        image.thumbnail(self.size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        return image.convert('RGB')
+
+    def _store(self, path, image):
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=90)
+        self.cache.store(path, buffer.getvalue())
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "downloaded": format_bytes(self.bytes_downloaded)}